@@ -0,0 +1,60 @@
+"""add order number allocator and unique order numbers
+
+Revision ID: i5j6k7l8m9n0
+Revises: h4i5j6k7l8m9
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'i5j6k7l8m9n0'
+down_revision: Union[str, None] = 'h4i5j6k7l8m9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+
+    # Client-supplied numbers were never checked, so suffix any duplicates
+    # (keeping the oldest order's number) before adding the unique index
+    duplicates = bind.execute(sa.text("""
+        SELECT id, order_number FROM orders
+        WHERE order_number IN (
+            SELECT order_number FROM orders GROUP BY order_number HAVING COUNT(*) > 1
+        )
+        ORDER BY order_number, created_at
+    """)).fetchall()
+    seen = {}
+    for order_id, order_number in duplicates:
+        seen[order_number] = seen.get(order_number, 0) + 1
+        if seen[order_number] > 1:
+            bind.execute(
+                sa.text("UPDATE orders SET order_number = :number WHERE id = :id"),
+                {"number": f"{order_number}-{seen[order_number]}", "id": order_id}
+            )
+
+    op.create_index('ix_orders_order_number', 'orders', ['order_number'], unique=True)
+
+    # Block allocator counter (used when not on PostgreSQL)
+    op.create_table('id_counters',
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('next_value', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+    op.execute("INSERT INTO id_counters (name, next_value) VALUES ('order_number', 1)")
+
+    if bind.dialect.name == 'postgresql':
+        op.execute("CREATE SEQUENCE IF NOT EXISTS order_number_seq START 1")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("DROP SEQUENCE IF EXISTS order_number_seq")
+    op.drop_table('id_counters')
+    op.drop_index('ix_orders_order_number', table_name='orders')
@@ -0,0 +1,30 @@
+"""add optimistic concurrency version columns
+
+Revision ID: j6k7l8m9n0o1
+Revises: i5j6k7l8m9n0
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'j6k7l8m9n0o1'
+down_revision: Union[str, None] = 'i5j6k7l8m9n0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+VERSIONED_TABLES = ('clients', 'orders', 'payments')
+
+
+def upgrade() -> None:
+    for table in VERSIONED_TABLES:
+        op.add_column(table, sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade() -> None:
+    for table in VERSIONED_TABLES:
+        op.drop_column(table, 'version')
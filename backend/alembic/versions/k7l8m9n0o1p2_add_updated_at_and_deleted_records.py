@@ -0,0 +1,47 @@
+"""add updated_at columns and deleted_records tombstones for delta sync
+
+Revision ID: k7l8m9n0o1p2
+Revises: j6k7l8m9n0o1
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'k7l8m9n0o1p2'
+down_revision: Union[str, None] = 'j6k7l8m9n0o1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SYNCED_TABLES = ('clients', 'orders', 'payments')
+
+
+def upgrade() -> None:
+    for table in SYNCED_TABLES:
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), nullable=True))
+        # Existing rows count as last changed when they were created
+        op.execute(f"UPDATE {table} SET updated_at = created_at")
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('updated_at', existing_type=sa.DateTime(), nullable=False)
+        op.create_index(f'ix_{table}_updated_at', table, ['updated_at'])
+
+    op.create_table('deleted_records',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('entity', sa.String(length=20), nullable=False),
+        sa.Column('entity_id', sa.Uuid(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_deleted_records_deleted_at', 'deleted_records', ['deleted_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_deleted_records_deleted_at', table_name='deleted_records')
+    op.drop_table('deleted_records')
+    for table in SYNCED_TABLES:
+        op.drop_index(f'ix_{table}_updated_at', table_name=table)
+        op.drop_column(table, 'updated_at')
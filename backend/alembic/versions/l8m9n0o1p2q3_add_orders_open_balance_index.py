@@ -0,0 +1,29 @@
+"""add partial index on unpaid orders for the aging report
+
+Revision ID: l8m9n0o1p2q3
+Revises: k7l8m9n0o1p2
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'l8m9n0o1p2q3'
+down_revision: Union[str, None] = 'k7l8m9n0o1p2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_orders_open_balance', 'orders', ['client_id', 'order_date', 'balance'],
+        postgresql_where=sa.text('balance > 0'), sqlite_where=sa.text('balance > 0')
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_orders_open_balance', table_name='orders')
@@ -0,0 +1,28 @@
+"""add client/date composite indexes for per-client reports
+
+Revision ID: m9n0o1p2q3r4
+Revises: l8m9n0o1p2q3
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'm9n0o1p2q3r4'
+down_revision: Union[str, None] = 'l8m9n0o1p2q3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_orders_client_id_order_date', 'orders', ['client_id', 'order_date'])
+    op.create_index('ix_payments_client_id_payment_date', 'payments', ['client_id', 'payment_date'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_payments_client_id_payment_date', table_name='payments')
+    op.drop_index('ix_orders_client_id_order_date', table_name='orders')
@@ -0,0 +1,34 @@
+"""add covering date indexes for multi-period profit and loss
+
+Revision ID: n0o1p2q3r4s5
+Revises: m9n0o1p2q3r4
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'n0o1p2q3r4s5'
+down_revision: Union[str, None] = 'm9n0o1p2q3r4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_orders_order_date_category', 'orders',
+        ['order_date', 'order_category', 'total_amount']
+    )
+    op.create_index(
+        'ix_expenses_expense_date_category', 'expenses',
+        ['expense_date', 'category', 'order_category', 'amount']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_expenses_expense_date_category', table_name='expenses')
+    op.drop_index('ix_orders_order_date_category', table_name='orders')
@@ -0,0 +1,33 @@
+"""create sheets_outbox table for the background Google Sheets sync
+
+Revision ID: o1p2q3r4s5t6
+Revises: n0o1p2q3r4s5
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'o1p2q3r4s5t6'
+down_revision: Union[str, None] = 'n0o1p2q3r4s5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('sheets_outbox',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('sheet', sa.String(length=30), nullable=False),
+        sa.Column('entity_id', sa.Uuid(), nullable=False),
+        sa.Column('action', sa.String(length=10), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('sheets_outbox')
@@ -0,0 +1,32 @@
+"""create sheet_rows table (record to spreadsheet row index)
+
+Revision ID: p2q3r4s5t6u7
+Revises: o1p2q3r4s5t6
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'p2q3r4s5t6u7'
+down_revision: Union[str, None] = 'o1p2q3r4s5t6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('sheet_rows',
+        sa.Column('sheet', sa.String(length=30), nullable=False),
+        sa.Column('entity_id', sa.Uuid(), nullable=False),
+        sa.Column('row_number', sa.Integer(), nullable=False),
+        sa.Column('checksum', sa.String(length=32), nullable=False),
+        sa.PrimaryKeyConstraint('sheet', 'entity_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('sheet_rows')
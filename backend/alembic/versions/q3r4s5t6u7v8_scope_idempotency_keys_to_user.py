@@ -0,0 +1,33 @@
+"""scope idempotency keys to the user
+
+Revision ID: q3r4s5t6u7v8
+Revises: p2q3r4s5t6u7
+Create Date: 2026-10-20 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'q3r4s5t6u7v8'
+down_revision: Union[str, None] = 'p2q3r4s5t6u7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Two users sending the same Idempotency-Key get separate rows
+    op.drop_constraint('idempotency_keys_pkey', 'idempotency_keys', type_='primary')
+    op.create_primary_key('idempotency_keys_pkey', 'idempotency_keys', ['user_id', 'key'])
+
+
+def downgrade() -> None:
+    # Keys used by more than one user cannot share the old primary key
+    op.execute(
+        "DELETE FROM idempotency_keys a USING idempotency_keys b "
+        "WHERE a.key = b.key AND a.created_at < b.created_at"
+    )
+    op.drop_constraint('idempotency_keys_pkey', 'idempotency_keys', type_='primary')
+    op.create_primary_key('idempotency_keys_pkey', 'idempotency_keys', ['key'])
@@ -0,0 +1,27 @@
+"""add claimed_at to sheets_outbox
+
+Revision ID: r4s5t6u7v8w9
+Revises: q3r4s5t6u7v8
+Create Date: 2026-10-20 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'r4s5t6u7v8w9'
+down_revision: Union[str, None] = 'q3r4s5t6u7v8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Lease taken by a drain while it calls Google Sheets outside the transaction
+    op.add_column('sheets_outbox', sa.Column('claimed_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('sheets_outbox', 'claimed_at')
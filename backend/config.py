@@ -1,11 +1,14 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import model_validator
 from functools import lru_cache
-from typing import List, Union
+from typing import List, Optional, Union
 
 class Settings(BaseSettings):
     # Database
     database_url: str
+    # create_all on startup instead of requiring the Alembic head. Unset means on for
+    # SQLite URLs only; for PostgreSQL run `alembic upgrade head` before starting the app
+    auto_create_tables: Optional[bool] = None
     
     # JWT
     secret_key: str = "your-secret-key-change-this-in-production"
@@ -21,6 +24,32 @@ class Settings(BaseSettings):
     
     # Application
     debug: bool = False
+
+    # Logging (one line per record on stdout, written by a background thread)
+    log_level: str = "INFO"
+    log_levels: str = ""  # Per-logger overrides, e.g. "routers.payments=DEBUG,sqlalchemy.engine=INFO"
+    log_format: str = "json"  # "json" or "text"
+    log_debug_sample_rate: float = 1.0  # Share of requests whose DEBUG lines are kept
+    log_queue_size: int = 10000  # Records waiting for the writer thread; more are dropped
+
+    # Prometheus metrics (GET /metrics)
+    metrics_token: str = ""  # If set, scrapers must send "Authorization: Bearer <token>"
+    prometheus_multiproc_dir: str = ""  # Directory shared by all workers; empty it before starting them
+
+    # Per-request SQL statistics (X-DB-Queries and X-DB-Time headers when debug is on)
+    n_plus_one_threshold: int = 10  # One statement run this many times in a request is logged as N+1; 0 disables
+
+    # Statement statistics and slow query log (GET /api/v1/admin/queries)
+    slow_query_ms: float = 200  # Slower statements are logged and EXPLAINed; 0 turns statement timing off
+    slow_query_explain_analyze: bool = False  # PostgreSQL: EXPLAIN ANALYZE, which runs the SELECT again
+    slow_query_max_statements: int = 500  # Distinct statements tracked per worker
+
+    # Request profiling (X-Profile: 1 from an admin; GET /api/v1/admin/profiles)
+    profiling_enabled: bool = False  # Off: the profiling middleware is not installed at all
+    profile_sample_rate: float = 0.0  # Share of all requests profiled while profiling is enabled
+    profile_interval_ms: float = 2  # Time between stack samples
+    profile_dir: str = "./profiles"  # Shared by all workers
+    profile_max_stored: int = 100  # Older profiles are deleted
     allowed_origins: Union[List[str], str] = [
         "http://localhost:5173",
         "http://localhost:5174",
@@ -33,6 +62,12 @@ class Settings(BaseSettings):
 
     model_config = SettingsConfigDict(env_file=".env", case_sensitive=False, extra='ignore')
 
+    @model_validator(mode='after')
+    def default_auto_create_tables(self) -> 'Settings':
+        if self.auto_create_tables is None:
+            self.auto_create_tables = self.database_url.startswith("sqlite")
+        return self
+
     @model_validator(mode='after')
     def assemble_cors_origins(self) -> 'Settings':
         if isinstance(self.allowed_origins, str):
@@ -66,6 +101,47 @@ class Settings(BaseSettings):
     invoice_dir: str = "./invoices"
     max_upload_size: int = 10485760
 
+    # Idempotency-Key replay window for POST /orders and POST /payments
+    idempotency_key_ttl_hours: int = 24
+
+    # Server-allocated order numbers, e.g. ORD-2026-000123
+    order_number_format: str = "ORD-{year}-{seq:06d}"
+    order_number_block_size: int = 20  # Numbers claimed per worker at a time (non-PostgreSQL)
+
+    # Change events (GET /api/v1/events)
+    event_broker: str = "memory"  # "memory" (single worker) or "redis" (fan-out via redis_url)
+    event_history_size: int = 500  # Recent events kept for Last-Event-ID catch-up
+    event_max_pending: int = 200  # Queued events per stream before it is told to resync
+    event_heartbeat_seconds: int = 15
+    stream_token_expire_seconds: int = 60  # Lifetime of the single-purpose token in an EventSource URL
+
+    # Delta sync (GET /api/v1/sync)
+    sync_cursor_overlap_seconds: int = 5  # Re-send recent changes so slow transactions are not missed
+    sync_tombstone_retention_days: int = 30  # Older cursors get a full snapshot instead of a delta
+
+    # POST /api/v1/batch
+    batch_max_requests: int = 20
+
+    # Precomputed GET /api/v1/dashboard/stats
+    dashboard_snapshot_seconds: int = 60  # Refresh interval; 0 computes on every request
+    dashboard_snapshot_debounce_seconds: float = 2  # Wait after a write so bursts cause one refresh
+
+    # /api/v1/analytics extract; also rebuilt after any change event
+    analytics_cache_seconds: int = 600
+
+    # Cached reports (e.g. category profitability); also cleared by any change event
+    report_cache_seconds: int = 300
+    report_cache_max_entries: int = 128
+
+    # Background Google Sheets sync through the sheets_outbox table
+    sheets_sync_enabled: bool = False
+    sheets_backend: str = "google"  # "google" or "fake" (in memory, for tests and development)
+    sheets_sync_interval_seconds: int = 10  # Drain at least this often
+    sheets_sync_high_water_mark: int = 200  # Drain right away once this many changes are queued
+    sheets_sync_batch_size: int = 500  # Outbox rows per drain
+    sheets_sync_max_backoff_seconds: int = 300
+    sheets_sync_lease_seconds: int = 300  # A claimed batch not pushed within this is retried by another drain
+
 @lru_cache()
 def get_settings():
     return Settings()
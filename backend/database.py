@@ -1,13 +1,48 @@
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Optional
+
 from sqlmodel import SQLModel, create_engine, Session
 from config import get_settings
 
 settings = get_settings()
 
-engine = create_engine(settings.database_url, echo=True)
+# SQL statements are logged by setting the sqlalchemy.engine logger to INFO (see log_levels)
+engine = create_engine(settings.database_url)
+
+# Set by POST /batch so its sub-requests share one session
+shared_session: ContextVar[Optional[Session]] = ContextVar("shared_session", default=None)
 
 def create_db_and_tables():
     SQLModel.metadata.create_all(engine)
 
+def check_schema_is_current():
+    """
+    Refuse to start unless the database is migrated to the latest Alembic revision.
+
+    Reads the revision files and the ``alembic_version`` table without
+    touching the schema itself, which is much cheaper than ``create_all``.
+    """
+    from alembic.config import Config
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+
+    config = Config(str(Path(__file__).parent / "alembic.ini"))
+    config.set_main_option("script_location", str(Path(__file__).parent / "alembic"))
+    expected = set(ScriptDirectory.from_config(config).get_heads())
+    with engine.connect() as connection:
+        current = set(MigrationContext.configure(connection).get_current_heads())
+    if current != expected:
+        raise RuntimeError(
+            f"Database schema is at {sorted(current) or 'no revision'}, expected {sorted(expected)}. "
+            "Run `alembic upgrade head` from the backend directory, or set AUTO_CREATE_TABLES=true "
+            "for a throwaway development database."
+        )
+
 def get_session():
+    session = shared_session.get()
+    if session is not None:
+        yield session
+        return
     with Session(engine) as session:
-        yield session
\ No newline at end of file
+        yield session
@@ -3,19 +3,37 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.security import OAuth2PasswordBearer
 from contextlib import asynccontextmanager
-from database import create_db_and_tables
+from database import check_schema_is_current, create_db_and_tables
 from models import *  # Import all models
 from config import get_settings
+from utils.logs import RequestContextMiddleware, configure_logging
+from services.events import event_broker
+from services.dashboard_snapshot import dashboard_snapshot
+from services.sheets_sync import sheets_sync_worker
+from services.metrics import MetricsMiddleware, mark_process_dead
+from services.query_stats import QueryStatsMiddleware
+from services.profiling import ProfilingMiddleware
 
 settings = get_settings()
 
+configure_logging()
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    create_db_and_tables()
+    if settings.auto_create_tables:
+        create_db_and_tables()
+    else:
+        check_schema_is_current()
+    await event_broker.start()
+    await dashboard_snapshot.start()
+    await sheets_sync_worker.start()
     yield
     # Shutdown
-    pass
+    await sheets_sync_worker.stop()
+    await dashboard_snapshot.stop()
+    await event_broker.stop()
+    mark_process_dead()
 
 app = FastAPI(
     title="School Copy API",
@@ -36,6 +54,19 @@ app.add_middleware(
     expose_headers=["*"]
 )
 
+# Admin-requested and sampled request profiles (GET /api/v1/admin/profiles)
+if settings.profiling_enabled:
+    app.add_middleware(ProfilingMiddleware)
+
+# Request ids for log lines and the X-Request-ID response header
+app.add_middleware(RequestContextMiddleware)
+
+# SQL statements and database time per request; N+1 detection
+app.add_middleware(QueryStatsMiddleware)
+
+# Latency and in-flight requests per route, for GET /metrics
+app.add_middleware(MetricsMiddleware)
+
 @app.get("/")
 async def root():
     return {"message": "School Copy API is running"}
@@ -85,7 +116,7 @@ def custom_openapi():
 app.openapi = custom_openapi
 
 # Import and register routers
-from routers import auth, schools, products, orders, payments, expenses, dashboard, leaders, settings as settings_router
+from routers import auth, schools, products, orders, payments, expenses, dashboard, leaders, events, sync, batch, analytics, sheets, metrics, admin, settings as settings_router
 
 app.include_router(auth.router, prefix="/api/v1")
 app.include_router(schools.router, prefix="/api/v1")
@@ -96,6 +127,13 @@ app.include_router(payments.router, prefix="/api/v1")
 app.include_router(expenses.router, prefix="/api/v1")
 app.include_router(dashboard.router, prefix="/api/v1")
 app.include_router(settings_router.router, prefix="/api/v1")
+app.include_router(events.router, prefix="/api/v1")
+app.include_router(sync.router, prefix="/api/v1")
+app.include_router(batch.router, prefix="/api/v1")
+app.include_router(analytics.router, prefix="/api/v1")
+app.include_router(sheets.router, prefix="/api/v1")
+app.include_router(admin.router, prefix="/api/v1")
+app.include_router(metrics.router)  # GET /metrics, where Prometheus expects it
 
 if __name__ == "__main__":
     import uvicorn
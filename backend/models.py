@@ -1,4 +1,5 @@
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import Column, Index, Integer, Sequence, event, text
 from pydantic import Field as PydanticField
 from typing import Optional, List
 from datetime import datetime
@@ -56,16 +57,26 @@ class Client(ClientBase, table=True):
     
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    # Bumped on every UPDATE; GET /sync returns rows changed since a cursor
+    updated_at: datetime = Field(default_factory=datetime.utcnow, index=True, sa_column_kwargs={"onupdate": datetime.utcnow})
+    # Optimistic concurrency: checked in the UPDATE's WHERE clause and bumped on every write
+    version: int = Field(default=1, sa_column=Column("version", Integer, nullable=False, server_default="1"))
     
     orders: List["Order"] = Relationship(back_populates="client")
     payments: List["Payment"] = Relationship(back_populates="client")
 
+    __mapper_args__ = {"version_id_col": version.sa_column}
+
 class ClientCreate(ClientBase):
     pass
 
+class ClientUpdate(ClientBase):
+    version: Optional[int] = None  # Expected version; 409 if the record changed since it was read
+
 class ClientRead(ClientBase):
     id: UUID
     created_at: datetime
+    version: int = 1
     # Optional summary statistics (populated by specific endpoints)
     total_orders: Optional[int] = None
     total_order_amount: Optional[float] = None
@@ -152,8 +163,12 @@ class OrderItemRead(SQLModel):
         populate_by_name = True
 
 # Order Models
+# Server-side order number sequence (PostgreSQL); other databases use the
+# id_counters block allocator in services/order_numbers.py.
+order_number_seq = Sequence("order_number_seq", metadata=SQLModel.metadata)
+
 class OrderBase(SQLModel):
-    order_number: str
+    order_number: str = Field(index=True, unique=True)
     client_id: UUID = Field(foreign_key="clients.id")
     total_amount: float
     status: OrderStatus = OrderStatus.PENDING
@@ -164,6 +179,8 @@ class Order(OrderBase, table=True):
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     order_date: datetime = Field(default_factory=datetime.utcnow)
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    # Bumped on every UPDATE; GET /sync returns rows changed since a cursor
+    updated_at: datetime = Field(default_factory=datetime.utcnow, index=True, sa_column_kwargs={"onupdate": datetime.utcnow})
     
     # Payment tracking
     paid_amount: float = Field(default=0.0)
@@ -179,6 +196,9 @@ class Order(OrderBase, table=True):
     pages: Optional[int] = Field(default=None)
     paper: Optional[str] = Field(default=None)
     
+    # Optimistic concurrency: checked in the UPDATE's WHERE clause and bumped on every write
+    version: int = Field(default=1, sa_column=Column("version", Integer, nullable=False, server_default="1"))
+    
     # Ensure client relationship is properly loaded
     client: "Client" = Relationship(
         back_populates="orders",
@@ -193,8 +213,21 @@ class Order(OrderBase, table=True):
         sa_relationship_kwargs={"lazy": "selectin", "cascade": "all, delete-orphan"}
     )
 
+    __table_args__ = (
+        # Receivables aging: only unpaid orders, covering the grouped columns
+        Index(
+            "ix_orders_open_balance", "client_id", "order_date", "balance",
+            postgresql_where=text("balance > 0"), sqlite_where=text("balance > 0")
+        ),
+        # Per-client reports: index range scan over one client's date window
+        Index("ix_orders_client_id_order_date", "client_id", "order_date"),
+        # Period P&L: date range scan covering the grouped and summed columns
+        Index("ix_orders_order_date_category", "order_date", "order_category", "total_amount"),
+    )
+    __mapper_args__ = {"version_id_col": version.sa_column}
+
 class OrderCreate(SQLModel):
-    orderNumber: str
+    orderNumber: Optional[str] = None  # Allocated server-side when omitted or blank
     leaderId: UUID
     totalAmount: Optional[float] = None  # Now optional, calculated from items
     status: str = "Pending"
@@ -211,6 +244,8 @@ class OrderCreate(SQLModel):
     # Legacy single-item fields (for backward compatibility)
     pages: Optional[int] = None
     paper: Optional[str] = None
+    # Expected version on update; 409 if the order changed since it was read
+    version: Optional[int] = None
 
 class OrderRead(SQLModel):
     id: UUID
@@ -228,6 +263,7 @@ class OrderRead(SQLModel):
     pages: Optional[int] = PydanticField(None, alias="pages")
     paper: Optional[str] = PydanticField(None, alias="paper")
     items: List[OrderItemRead] = []  # Include order items
+    version: int = 1
 
     class Config:
         from_attributes = True
@@ -238,6 +274,13 @@ class OrderRead(SQLModel):
             OrderStatus: lambda s: s.value if hasattr(s, 'value') else str(s)
         }
 
+class IdCounter(SQLModel, table=True):
+    """Named counter from which workers claim blocks of ids (e.g. order numbers)."""
+    __tablename__ = "id_counters"
+
+    name: str = Field(primary_key=True, max_length=50)
+    next_value: int = Field(default=1)
+
 # Payment Models
 class PaymentBase(SQLModel):
     amount: float = Field(gt=0)
@@ -253,6 +296,10 @@ class Payment(PaymentBase, table=True):
     client_id: UUID = Field(foreign_key="clients.id")
     payment_date: datetime = Field(default_factory=datetime.utcnow)
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    # Bumped on every UPDATE; GET /sync returns rows changed since a cursor
+    updated_at: datetime = Field(default_factory=datetime.utcnow, index=True, sa_column_kwargs={"onupdate": datetime.utcnow})
+    # Optimistic concurrency: checked in the UPDATE's WHERE clause and bumped on every write
+    version: int = Field(default=1, sa_column=Column("version", Integer, nullable=False, server_default="1"))
     
     order: Optional[Order] = Relationship(back_populates="payments")
     client: "Client" = Relationship(
@@ -260,6 +307,12 @@ class Payment(PaymentBase, table=True):
         sa_relationship_kwargs={"lazy": "joined"}
     )
 
+    __table_args__ = (
+        # Per-client reports: index range scan over one client's date window
+        Index("ix_payments_client_id_payment_date", "client_id", "payment_date"),
+    )
+    __mapper_args__ = {"version_id_col": version.sa_column}
+
     class Config:
         arbitrary_types_allowed = True
 
@@ -289,6 +342,7 @@ class PaymentUpdate(SQLModel):
     method: Optional[str] = None
     paymentDate: Optional[str] = None
     referenceNumber: Optional[str] = None
+    version: Optional[int] = None  # Expected version; 409 if the payment changed since it was read
 
     class Config:
         json_schema_extra = {
@@ -318,6 +372,7 @@ class PaymentRead(SQLModel):
     orderId: Optional[UUID] = PydanticField(None, alias="order_id")
     referenceNumber: Optional[str] = PydanticField(None, alias="reference_number")
     client: Optional[ClientInfo] = None
+    version: int = 1
 
     class Config:
         from_attributes = True
@@ -342,6 +397,10 @@ class ExpenseBase(SQLModel):
 
 class Expense(ExpenseBase, table=True):
     __tablename__ = "expenses"
+    __table_args__ = (
+        # Period P&L: date range scan covering the grouped and summed columns
+        Index("ix_expenses_expense_date_category", "expense_date", "category", "order_category", "amount"),
+    )
     
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     expense_date: datetime = Field(default_factory=datetime.utcnow)
@@ -377,6 +436,20 @@ class ExpenseRead(SQLModel):
             ExpenseCategory: lambda v: v.value
         }
 
+class ExpenseCategoryTotal(SQLModel):
+    category: str
+    amount: float
+    count: int
+
+class ExpensePage(SQLModel):
+    """One page of GET /expenses/?totals=true plus totals over every matching expense."""
+    items: List[ExpenseRead]
+    total: int
+    skip: int
+    limit: int
+    total_amount: float
+    by_category: List[ExpenseCategoryTotal]
+
 # User Model for Authentication
 class UserBase(SQLModel):
     email: str
@@ -436,3 +509,92 @@ class SettingsRead(SettingsBase):
 
     class Config:
         from_attributes = True
+
+# Idempotency Model
+class IdempotencyKey(SQLModel, table=True):
+    """Stored outcome of a POST made with an ``Idempotency-Key`` header.
+
+    A row is reserved before the write runs (``status_code`` is NULL while in
+    progress) and filled with the response once it succeeds, so a retry with
+    the same key replays the original response instead of writing again.
+    Keys are per user, so two users choosing the same key never collide.
+    """
+    __tablename__ = "idempotency_keys"
+
+    user_id: UUID = Field(foreign_key="users.id", primary_key=True)
+    key: str = Field(primary_key=True, max_length=255)
+    scope: str = Field(max_length=100)  # e.g. "POST /orders"
+    request_hash: str = Field(max_length=64)
+    status_code: Optional[int] = Field(default=None, nullable=True)
+    response_body: Optional[str] = Field(default=None, nullable=True)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    expires_at: datetime = Field(index=True)
+
+# Batch requests
+class BatchItem(SQLModel):
+    id: Optional[str] = None  # Echoed back so the client can match responses
+    path: str  # e.g. "/dashboard/stats?period=month", relative to /api/v1
+
+class BatchRequest(SQLModel):
+    requests: List[BatchItem]
+
+# Tombstones for delta sync
+class DeletedRecord(SQLModel, table=True):
+    """Marker left behind when a leader, order or payment is deleted.
+
+    ``GET /sync`` reports these so clients can drop rows they cached. Written
+    by an ``after_delete`` mapper event, so every ORM delete path is covered.
+    """
+    __tablename__ = "deleted_records"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    entity: str = Field(max_length=20)  # "leaders", "orders" or "payments"
+    entity_id: UUID
+    deleted_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+SYNCED_ENTITIES = {Client: "leaders", Order: "orders", Payment: "payments"}
+
+def _record_deletion(mapper, connection, target):
+    connection.execute(
+        DeletedRecord.__table__.insert().values(
+            entity=SYNCED_ENTITIES[mapper.class_],
+            entity_id=target.id,
+            deleted_at=datetime.utcnow()
+        )
+    )
+
+for _model in SYNCED_ENTITIES:
+    event.listen(_model, "after_delete", _record_deletion)
+
+# Outbox for the Google Sheets sync
+class SheetsOutbox(SQLModel, table=True):
+    """A change waiting to be mirrored into the spreadsheet.
+
+    Inserted by mapper events in the same transaction as the change, so a row
+    exists exactly when the change committed. ``services.sheets_sync`` drains
+    the table in id order in the background and deletes what it has pushed.
+    A drain claims its batch by setting ``claimed_at`` and commits before
+    calling Sheets; another drain may take the batch over once the claim is
+    older than ``sheets_sync_lease_seconds``.
+    """
+    __tablename__ = "sheets_outbox"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    sheet: str = Field(max_length=30)  # Tab name, e.g. "Orders"
+    entity_id: UUID
+    action: str = Field(max_length=10)  # "upsert" or "delete"
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    claimed_at: Optional[datetime] = Field(default=None, nullable=True)  # Set while a drain is pushing it
+
+class SheetRow(SQLModel, table=True):
+    """Where a record sits in its spreadsheet tab, and a checksum of what was written there.
+
+    Lets the sync update rows in place and skip unchanged ones without
+    reading the sheet. Rebuilt from the sheet by a full reconciliation.
+    """
+    __tablename__ = "sheet_rows"
+
+    sheet: str = Field(primary_key=True, max_length=30)
+    entity_id: UUID = Field(primary_key=True)
+    row_number: int
+    checksum: str = Field(max_length=32)
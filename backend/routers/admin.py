@@ -0,0 +1,72 @@
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import FileResponse
+
+from config import get_settings
+from models import User
+from services.profiling import profile_store
+from services.slow_queries import slow_query_log
+from utils.auth import get_current_user
+
+settings = get_settings()
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+
+def require_admin(current_user: User = Depends(get_current_user)) -> User:
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can view diagnostics"
+        )
+    return current_user
+
+
+@router.get("/queries")
+def get_query_stats(
+    limit: int = Query(20, ge=1, le=500),
+    sort: Literal["total", "mean", "max", "calls"] = "total",
+    slow_only: bool = False,
+    current_user: User = Depends(require_admin)
+):
+    """
+    SQL statements run by this worker, ranked by total time (or ``sort``),
+    with the parameters, route and plan of their last slow run.
+    """
+    return {
+        "since": slow_query_log.since.isoformat(),
+        "slow_query_ms": settings.slow_query_ms,
+        "statements": slow_query_log.top(limit, sort, slow_only),
+    }
+
+
+@router.delete("/queries", status_code=status.HTTP_204_NO_CONTENT)
+def reset_query_stats(current_user: User = Depends(require_admin)):
+    """Start collecting statement statistics from scratch."""
+    slow_query_log.reset()
+
+
+@router.get("/profiles")
+def list_profiles(current_user: User = Depends(require_admin)):
+    """
+    Stored request profiles, newest first. Send a request with
+    ``X-Profile: 1`` (needs ``profiling_enabled``) to add one.
+    """
+    return {
+        "enabled": settings.profiling_enabled,
+        "sample_rate": settings.profile_sample_rate,
+        "profiles": profile_store.list(),
+    }
+
+
+@router.get("/profiles/{profile_id}")
+def download_profile(profile_id: str, current_user: User = Depends(require_admin)):
+    """A stored profile in speedscope format; open it at https://www.speedscope.app."""
+    path = profile_store.path(profile_id)
+    if path is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found"
+        )
+    return FileResponse(path, media_type="application/json", filename=f"profile-{profile_id}.speedscope.json")
@@ -0,0 +1,46 @@
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+
+from models import User
+from utils.auth import get_current_user
+
+router = APIRouter(prefix="/analytics", tags=["Analytics"])
+
+
+def analytics():
+    """The analytics service, imported on first use so NumPy does not load at startup."""
+    from services.analytics import analytics_service
+    return analytics_service
+
+
+@router.get("/cohorts")
+def get_retention_cohorts(
+    months: int = Query(12, ge=1, le=60),
+    since: Optional[date] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Client retention by month of first order (cohorts starting on or after ``since``)."""
+    return {"months": months, "cohorts": analytics().retention_cohorts(months, since)}
+
+
+@router.get("/order-value")
+def get_order_value_trend(
+    months: int = Query(24, ge=1, le=240),
+    current_user: User = Depends(get_current_user)
+):
+    """Monthly order count, revenue and average order value."""
+    return {"series": analytics().order_value_trend(months)}
+
+
+@router.get("/payment-lag")
+def get_payment_lag(current_user: User = Depends(get_current_user)):
+    """Distribution of days between an order and its payments."""
+    return analytics().payment_lag()
+
+
+@router.get("/seasonality")
+def get_seasonality(current_user: User = Depends(get_current_user)):
+    """Seasonal revenue index per calendar month."""
+    return analytics().seasonality()
@@ -0,0 +1,150 @@
+import asyncio
+import logging
+from typing import List, Tuple
+from urllib.parse import urlsplit
+
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import Response
+from sqlmodel import Session
+
+from config import get_settings
+from database import engine, shared_session
+from models import BatchRequest, User
+from utils.auth import authenticated_user, get_current_user
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/batch", tags=["Batch"])
+
+API_PREFIX = "/api/v1"
+
+# Streaming or recursive endpoints that cannot be answered inside a batch
+EXCLUDED_PREFIXES = ("/batch", "/events")
+
+# Request headers not passed on to sub-requests (they describe the batch body)
+DROPPED_HEADERS = {b"content-length", b"content-type", b"accept-encoding"}
+
+
+def parse_batch_path(path: str) -> Tuple[str, str]:
+    """Split a sub-request path into (path under /api/v1, query string)."""
+    parts = urlsplit(path)
+    if parts.scheme or parts.netloc or not parts.path.startswith("/"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Batch paths must be absolute API paths, got {path!r}"
+        )
+    sub_path = parts.path
+    if sub_path == API_PREFIX or sub_path.startswith(API_PREFIX + "/"):
+        sub_path = sub_path[len(API_PREFIX):] or "/"
+    if any(sub_path == prefix or sub_path.startswith(prefix + "/") for prefix in EXCLUDED_PREFIXES):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{parts.path} cannot be used inside a batch"
+        )
+    return sub_path, parts.query
+
+
+@router.post("")
+async def run_batch(
+    batch: BatchRequest,
+    request: Request,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Run several GET requests in one round trip.
+
+    Body: ``{"requests": [{"id": "stats", "path": "/dashboard/stats"}, ...]}``.
+    Responds with ``{"responses": [{"id", "status", "body"}, ...]}`` in request
+    order; a failing sub-request only affects its own entry. The caller is
+    authenticated once and all sub-requests share one database session.
+    SQLAlchemy sessions must not be used from two threads at once, so the
+    sub-requests run one after another; the saving is the round trips and
+    the per-request token check, user lookup and session setup.
+    """
+    if len(batch.requests) > settings.batch_max_requests:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A batch can hold at most {settings.batch_max_requests} requests"
+        )
+    targets = [parse_batch_path(item.path) for item in batch.requests]
+
+    session = Session(engine)
+    user_token = authenticated_user.set(current_user)
+    session_token = shared_session.set(session)
+    try:
+        results = []
+        for sub_path, query in targets:
+            result = await _dispatch(request, sub_path, query)
+            if result[0] >= 400 and session.in_transaction():
+                # Do not let a failed sub-request's transaction leak into the next one
+                session.rollback()
+            results.append(result)
+    finally:
+        shared_session.reset(session_token)
+        authenticated_user.reset(user_token)
+        session.close()
+
+    entries: List[bytes] = []
+    for item, (status_code, content_type, body) in zip(batch.requests, results):
+        if not body:
+            body_json = b"null"
+        elif content_type.startswith("application/json"):
+            body_json = body  # Already JSON; splice it in without re-parsing
+        else:
+            body_json = orjson.dumps(body.decode("utf-8", "replace"))
+        entries.append(
+            b'{"id":' + orjson.dumps(item.id) + b',"status":' + str(status_code).encode()
+            + b',"body":' + body_json + b"}"
+        )
+    return Response(content=b'{"responses":[' + b",".join(entries) + b"]}", media_type="application/json")
+
+
+async def _dispatch(request: Request, sub_path: str, query: str) -> Tuple[int, str, bytes]:
+    """Run one GET through the app in-process; returns (status, content type, body)."""
+    path = API_PREFIX + sub_path
+    scope = {
+        "type": "http",
+        "asgi": request.scope.get("asgi", {"version": "3.0"}),
+        "http_version": request.scope.get("http_version", "1.1"),
+        "method": "GET",
+        "scheme": request.scope.get("scheme", "http"),
+        "server": request.scope.get("server"),
+        "client": request.scope.get("client"),
+        "root_path": request.scope.get("root_path", ""),
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "headers": [(name, value) for name, value in request.scope["headers"] if name not in DROPPED_HEADERS],
+        "state": {},
+    }
+    response = {"status": status.HTTP_500_INTERNAL_SERVER_ERROR, "content_type": "", "body": []}
+    request_sent = False
+    response_complete = asyncio.Event()
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await response_complete.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            for name, value in message.get("headers", []):
+                if name.lower() == b"content-type":
+                    response["content_type"] = value.decode("latin-1")
+        elif message["type"] == "http.response.body":
+            response["body"].append(message.get("body", b""))
+            if not message.get("more_body", False):
+                response_complete.set()
+
+    try:
+        await request.app(scope, receive, send)
+    except Exception:
+        # The app has already sent its 500 response; keep the batch going
+        logger.exception("Batch sub-request %s failed", path)
+    return response["status"], response["content_type"], b"".join(response["body"])
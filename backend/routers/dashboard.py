@@ -1,108 +1,60 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlmodel import Session, select
-from sqlalchemy.orm import selectinload, joinedload
+from sqlalchemy import and_, case, func
 from database import get_session
-from models import Order, Payment, Expense, User, Client, OrderStatus
+from models import Order, Payment, Expense, ExpenseCategory, ExpenseRead, User, Client, ClientType
 from utils.auth import get_current_user
-from datetime import datetime, timedelta
-from typing import Optional
+from services.dashboard_snapshot import compute_dashboard_stats, dashboard_snapshot
+from services.report_cache import report_cache
+from utils.sql_time import Granularity, bucket_key, iter_buckets, time_bucket
+from routers.orders import fetch_order_list
+from routers.payments import fetch_payment_list
+from datetime import date, datetime, timedelta
+from typing import List, Literal, Optional, Tuple
+from uuid import UUID
 from collections import defaultdict
 
 router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
 
+# Longest range (in days) a time series may span, per granularity
+MAX_SERIES_DAYS = {
+    Granularity.DAY: 366,
+    Granularity.WEEK: 366 * 5,
+    Granularity.MONTH: 366 * 20,
+}
+
 @router.get("/stats")
 def get_dashboard_stats(
+    response: Response,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
+    fresh: bool = False,
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    """Get dashboard statistics."""
+    """
+    Get dashboard statistics.
+
+    Served from the precomputed snapshot, with its age in seconds in the
+    ``X-Snapshot-Age`` header. ``fresh=true`` computes the numbers now (and
+    updates the snapshot).
+    """
     try:
-        # Parse dates if provided
+        # Validate dates if provided
         if start_date:
-            start = datetime.strptime(start_date, "%Y-%m-%d")
-        else:
-            start = datetime.now().replace(day=1)  # First day of current month
-        
+            datetime.strptime(start_date, "%Y-%m-%d")
         if end_date:
-            end = datetime.strptime(end_date, "%Y-%m-%d")
+            datetime.strptime(end_date, "%Y-%m-%d")
+
+        snapshot = None if fresh else dashboard_snapshot.get()
+        if snapshot is None:
+            stats = compute_dashboard_stats(session)
+            dashboard_snapshot.store(stats)
+            age = 0.0
         else:
-            end = datetime.now()
-        
-        # Get all orders with client relationship
-        orders = session.exec(
-            select(Order).options(joinedload(Order.client))
-        ).all()
-        
-        # Get all payments with client relationship
-        payments = session.exec(
-            select(Payment).options(joinedload(Payment.client))
-        ).all()
-        
-        # Get all expenses
-        expenses = session.exec(select(Expense)).all()
-        
-        # Calculate totals
-        total_orders = len(orders)
-        total_revenue = sum(order.total_amount for order in orders)
-        total_payments = sum(payment.amount for payment in payments)
-        total_expenses = sum(expense.amount for expense in expenses)
-        net_profit = total_revenue - total_expenses
-        
-        # Get pending orders
-        pending_orders = [o for o in orders if o.status == OrderStatus.PENDING or (hasattr(o.status, 'value') and o.status.value == "Pending") or str(o.status) == "Pending"]
-        
-        # Get recent orders (last 5) with client info
-        recent_orders_raw = sorted(orders, key=lambda x: x.created_at, reverse=True)[:5]
-        recent_orders = []
-        for order in recent_orders_raw:
-            order_dict = {
-                "id": str(order.id),
-                "orderNumber": order.order_number,
-                "leaderId": str(order.client_id),
-                "totalAmount": order.total_amount,
-                "status": order.status.value if hasattr(order.status, 'value') else str(order.status),
-                "orderDate": order.order_date.isoformat(),
-                "createdAt": order.created_at.isoformat(),
-                "leaderName": order.client.name if order.client else "N/A"
-            }
-            recent_orders.append(order_dict)
-        
-        # Get recent payments (last 5) with client info
-        recent_payments_raw = sorted(payments, key=lambda x: x.created_at, reverse=True)[:5]
-        recent_payments = []
-        for payment in recent_payments_raw:
-            payment_dict = {
-                "id": str(payment.id),
-                "amount": payment.amount,
-                "method": payment.mode.value if hasattr(payment.mode, 'value') else str(payment.mode),
-                "status": payment.status.value if hasattr(payment.status, 'value') else str(payment.status),
-                "paymentDate": payment.payment_date.isoformat(),
-                "createdAt": payment.created_at.isoformat(),
-                "leaderId": str(payment.client_id),
-                "orderId": str(payment.order_id) if payment.order_id else None,
-                "referenceNumber": payment.reference_number,
-                "client": {
-                    "id": str(payment.client.id),
-                    "name": payment.client.name,
-                    "type": payment.client.type.value if hasattr(payment.client.type, 'value') else str(payment.client.type),
-                    "contact": payment.client.contact,
-                    "address": payment.client.address
-                } if payment.client else None
-            }
-            recent_payments.append(payment_dict)
-        
-        return {
-            "totalOrders": total_orders,
-            "totalRevenue": total_revenue,
-            "totalPayments": total_payments,
-            "totalExpenses": total_expenses,
-            "netProfit": net_profit,
-            "pendingOrders": len(pending_orders),
-            "recentOrders": recent_orders,
-            "recentPayments": recent_payments
-        }
+            stats, age = snapshot
+        response.headers["X-Snapshot-Age"] = f"{age:.1f}"
+        return stats
     
     except Exception as e:
         raise HTTPException(
@@ -110,69 +62,153 @@ def get_dashboard_stats(
             detail=f"Error calculating stats: {str(e)}"
         )
 
+# Amount and date columns behind each time-series metric
+SERIES_METRICS = {
+    "revenue": (Order.total_amount, Order.order_date),
+    "payments": (Payment.amount, Payment.payment_date),
+    "expenses": (Expense.amount, Expense.expense_date),
+}
+
+def fetch_series(
+    session: Session,
+    metric: str,
+    granularity: Granularity,
+    start: date,
+    end: date,
+    category: Optional[str] = None,
+    expense_category: Optional[ExpenseCategory] = None
+) -> List[dict]:
+    """
+    Sum a metric per time bucket between ``start`` and ``end`` (inclusive).
+
+    Bucketing and summing happen in one grouped SQL query; buckets with no
+    rows are filled with zeros here so charts get a continuous series.
+    ``category`` filters on the order category (a payment's is its order's).
+    """
+    amount_column, date_column = SERIES_METRICS[metric]
+    bucket = time_bucket(date_column, granularity, session.get_bind().dialect.name).label("bucket")
+    statement = (
+        select(bucket, func.coalesce(func.sum(amount_column), 0.0), func.count())
+        .where(
+            date_column >= datetime.combine(start, datetime.min.time()),
+            date_column < datetime.combine(end + timedelta(days=1), datetime.min.time())
+        )
+        .group_by(bucket)
+    )
+    if category is not None:
+        if metric == "revenue":
+            statement = statement.where(Order.order_category == category)
+        elif metric == "payments":
+            statement = statement.join(Order, Payment.order_id == Order.id).where(Order.order_category == category)
+        else:
+            statement = statement.where(Expense.order_category == category)
+    if expense_category is not None and metric == "expenses":
+        statement = statement.where(Expense.category == expense_category)
+
+    found = {bucket_key(row[0]): (float(row[1]), row[2]) for row in session.exec(statement).all()}
+    return [
+        {"period": period.isoformat(), "value": found.get(period, (0.0, 0))[0], "count": found.get(period, (0.0, 0))[1]}
+        for period in iter_buckets(start, end, granularity)
+    ]
+
+@router.get("/series")
+def get_time_series(
+    metric: Literal["revenue", "payments", "expenses"] = "revenue",
+    granularity: Granularity = Granularity.DAY,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    category: Optional[str] = None,
+    expense_category: Optional[ExpenseCategory] = None,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Revenue, payments or expenses per day, week or month, zero-filled.
+
+    Defaults to the last 30 days. ``category`` filters by order category;
+    ``expense_category`` applies to the expenses metric only.
+    """
+    end = end_date or date.today()
+    start = start_date or end - timedelta(days=29)
+    if start > end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start_date must not be after end_date"
+        )
+    if (end - start).days > MAX_SERIES_DAYS[granularity]:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Range too long for {granularity.value} granularity"
+        )
+
+    series = fetch_series(session, metric, granularity, start, end, category, expense_category)
+    return {
+        "metric": metric,
+        "granularity": granularity.value,
+        "start_date": start.isoformat(),
+        "end_date": end.isoformat(),
+        "category": category,
+        "total": sum(point["value"] for point in series),
+        "series": series
+    }
+
 @router.get("/revenue")
 def get_revenue_stats(
-    days: int = 30,
+    days: int = Query(30, ge=1, le=3660),
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
     """Get revenue statistics for specified days."""
-    end_date = datetime.now()
+    end_date = date.today()
     start_date = end_date - timedelta(days=days)
     
-    orders = session.exec(select(Order)).all()
-    
-    # Filter orders by date range
-    filtered_orders = [
-        order for order in orders
-        if start_date <= order.order_date <= end_date
-    ]
-    
-    daily_revenue = defaultdict(float)
-    for order in filtered_orders:
-        date_key = order.order_date.strftime("%Y-%m-%d")
-        daily_revenue[date_key] += order.total_amount
-    
-    total_revenue = sum(order.total_amount for order in filtered_orders)
+    series = fetch_series(session, "revenue", Granularity.DAY, start_date, end_date)
+    daily_revenue = {point["period"]: point["value"] for point in series}
     
     return {
         "period": f"{days} days",
         "start_date": start_date.strftime("%Y-%m-%d"),
         "end_date": end_date.strftime("%Y-%m-%d"),
-        "total_revenue": total_revenue,
-        "daily_breakdown": dict(daily_revenue)
+        "total_revenue": sum(daily_revenue.values()),
+        "daily_breakdown": daily_revenue
     }
 
 @router.get("/expenses")
 def get_expense_summary(
     days: int = 30,
+    limit: int = Query(20, ge=0, le=100),
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    """Get expense summary for specified days."""
+    """
+    Expense totals by category for the last ``days`` days, with the
+    ``limit`` most recent expenses; page through the rest with GET /expenses/.
+    """
     end_date = datetime.now()
     start_date = end_date - timedelta(days=days)
     
-    expenses = session.exec(select(Expense)).all()
-    
-    # Filter expenses by date range
-    filtered_expenses = [
-        expense for expense in expenses
-        if start_date <= expense.expense_date <= end_date
-    ]
+    in_window = (Expense.expense_date >= start_date, Expense.expense_date <= end_date)
     
     # Group by category
     category_breakdown = defaultdict(float)
-    for expense in filtered_expenses:
-        category_breakdown[expense.category] += expense.amount
-    
-    total_expenses = sum(expense.amount for expense in filtered_expenses)
+    expense_count = 0
+    for category, amount, count in session.exec(
+        select(Expense.category, func.sum(Expense.amount), func.count()).where(*in_window).group_by(Expense.category)
+    ).all():
+        category_breakdown[category.value if hasattr(category, 'value') else str(category)] += float(amount or 0)
+        expense_count += count
+    
+    total_expenses = sum(category_breakdown.values())
+    recent_expenses = session.exec(
+        select(Expense).where(*in_window).order_by(Expense.expense_date.desc(), Expense.id).limit(limit)
+    ).all()
     
     return {
         "period": f"{days} days",
         "total_expenses": total_expenses,
+        "expense_count": expense_count,
         "category_breakdown": dict(category_breakdown),
-        "expenses": filtered_expenses
+        "expenses": [ExpenseRead.model_validate(expense) for expense in recent_expenses]
     }
 
 @router.get("/reports/daily")
@@ -305,44 +341,64 @@ def get_monthly_report(
 
 @router.get("/reports/school/{school_id}")
 def get_school_report(
-    school_id: str,
-    days: int = 30,
+    school_id: UUID,
+    days: int = Query(30, ge=1),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    """Get report for a specific school."""
+    """
+    Get report for a specific school.
+
+    Orders and payments are filtered by client and date in SQL, served by the
+    client/date composite indexes. Totals cover the whole period; ``orders``
+    and ``payments`` are pages of ``limit`` rows starting at ``skip``.
+    """
+    if not session.get(Client, school_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="School not found"
+        )
+    
     end_date = datetime.now()
     start_date = end_date - timedelta(days=days)
     
-    orders = session.exec(select(Order)).all()
-    payments = session.exec(select(Payment)).all()
-    
-    # Filter by school and date
-    school_orders = [
-        o for o in orders
-        if o.client_id == school_id and start_date <= o.order_date <= end_date
-    ]
-    
-    # Get payments for school's orders
-    school_order_ids = [o.id for o in school_orders]
-    school_payments = [
-        p for p in payments
-        if p.order_id in school_order_ids and start_date <= p.payment_date <= end_date
-    ]
-    
-    total_revenue = sum(o.total_amount for o in school_orders)
-    total_payments = sum(p.amount for p in school_payments)
-    balance = total_revenue - total_payments
+    total_orders, total_revenue = session.exec(
+        select(func.count(Order.id), func.coalesce(func.sum(Order.total_amount), 0.0))
+        .where(
+            Order.client_id == school_id,
+            Order.order_date >= start_date,
+            Order.order_date <= end_date
+        )
+    ).one()
+    total_payment_count, total_payments = session.exec(
+        select(func.count(Payment.id), func.coalesce(func.sum(Payment.amount), 0.0))
+        .where(
+            Payment.client_id == school_id,
+            Payment.payment_date >= start_date,
+            Payment.payment_date <= end_date
+        )
+    ).one()
     
     return {
-        "school_id": school_id,
+        "school_id": str(school_id),
         "period": f"{days} days",
-        "total_orders": len(school_orders),
-        "total_revenue": total_revenue,
-        "total_payments": total_payments,
-        "balance": balance,
-        "orders": school_orders,
-        "payments": school_payments
+        "total_orders": total_orders,
+        "total_revenue": float(total_revenue),
+        "total_payments": float(total_payments),
+        "total_payment_count": total_payment_count,
+        "balance": float(total_revenue) - float(total_payments),
+        "skip": skip,
+        "limit": limit,
+        "orders": fetch_order_list(
+            session, skip=skip, limit=limit,
+            client_id=school_id, date_from=start_date, date_to=end_date
+        ),
+        "payments": fetch_payment_list(
+            session, skip=skip, limit=limit,
+            client_id=school_id, date_from=start_date, date_to=end_date
+        )
     }
 
 @router.get("/reports/profit-loss")
@@ -362,21 +418,24 @@ def get_profit_loss_report(
             detail="Invalid date format. Use YYYY-MM-DD"
         )
     
-    orders = session.exec(select(Order)).all()
-    expenses = session.exec(select(Expense)).all()
-    
-    # Filter by date range
-    period_orders = [o for o in orders if start <= o.order_date <= end]
-    period_expenses = [e for e in expenses if start <= e.expense_date <= end]
-    
-    total_revenue = sum(o.total_amount for o in period_orders)
-    total_expenses = sum(e.amount for e in period_expenses)
-    net_profit = total_revenue - total_expenses
-    
+    total_revenue, orders_count = session.exec(
+        select(func.coalesce(func.sum(Order.total_amount), 0), func.count())
+        .where(Order.order_date >= start, Order.order_date <= end)
+    ).one()
+    expense_rows = session.exec(
+        select(Expense.category, func.sum(Expense.amount), func.count())
+        .where(Expense.expense_date >= start, Expense.expense_date <= end)
+        .group_by(Expense.category)
+    ).all()
+
     # Expense breakdown by category
     expense_breakdown = defaultdict(float)
-    for expense in period_expenses:
-        expense_breakdown[expense.category] += expense.amount
+    for category, amount, _ in expense_rows:
+        expense_breakdown[category.value if hasattr(category, 'value') else str(category)] += float(amount or 0)
+    total_revenue = float(total_revenue)
+    total_expenses = sum(expense_breakdown.values())
+    expenses_count = sum(rows for _, _, rows in expense_rows)
+    net_profit = total_revenue - total_expenses
     
     return {
         "start_date": start_date,
@@ -386,7 +445,366 @@ def get_profit_loss_report(
         "net_profit": net_profit,
         "profit_margin_percent": (net_profit / total_revenue * 100) if total_revenue > 0 else 0,
         "expense_breakdown": dict(expense_breakdown),
-        "orders_count": len(period_orders),
-        "expenses_count": len(period_expenses)
+        "orders_count": orders_count,
+        "expenses_count": expenses_count
     }
 
+# Default number of earlier periods compared against the current one
+PNL_PRESET_COUNTS = {"months": 12, "quarters": 4, "years": 1}
+MAX_PNL_PERIODS = 40
+UNASSIGNED_CATEGORY = "Unassigned"
+
+def _shift_month(day: date, months: int) -> date:
+    """First day of the month ``months`` away from ``day``'s month."""
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def pnl_preset_periods(preset: str, count: int, as_of: date) -> List[Tuple[str, date, date]]:
+    """(label, first day, last day) for the current period and ``count`` before it, newest first."""
+    step = {"months": 1, "quarters": 3, "years": 12}[preset]
+    if preset == "months":
+        current = as_of.replace(day=1)
+    elif preset == "quarters":
+        current = date(as_of.year, (as_of.month - 1) // 3 * 3 + 1, 1)
+    else:
+        current = date(as_of.year, 1, 1)
+
+    periods = []
+    for offset in range(count + 1):
+        first = _shift_month(current, -offset * step)
+        last = _shift_month(first, step) - timedelta(days=1)
+        if preset == "months":
+            label = first.strftime("%Y-%m")
+        elif preset == "quarters":
+            label = f"{first.year}-Q{(first.month - 1) // 3 + 1}"
+        else:
+            label = str(first.year)
+        periods.append((label, first, last))
+    return periods
+
+def parse_pnl_period(value: str) -> Tuple[str, date, date]:
+    """Parse a custom ``YYYY-MM-DD..YYYY-MM-DD`` period (both days inclusive)."""
+    try:
+        start_text, end_text = value.split("..")
+        first, last = date.fromisoformat(start_text), date.fromisoformat(end_text)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid period {value!r}. Use YYYY-MM-DD..YYYY-MM-DD"
+        )
+    if first > last:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Period {value!r} ends before it starts"
+        )
+    return value, first, last
+
+def _period_index(date_column, periods: List[Tuple[str, date, date]]):
+    """CASE expression mapping a row's date to the index of its period."""
+    return case(
+        *[
+            (
+                and_(
+                    date_column >= datetime.combine(first, datetime.min.time()),
+                    date_column < datetime.combine(last + timedelta(days=1), datetime.min.time())
+                ),
+                index
+            )
+            for index, (_, first, last) in enumerate(periods)
+        ],
+        else_=None
+    )
+
+@router.get("/reports/profit-loss/compare")
+def compare_profit_loss(
+    preset: Literal["months", "quarters", "years"] = "months",
+    count: Optional[int] = Query(None, ge=1, le=MAX_PNL_PERIODS - 1),
+    period: Optional[List[str]] = Query(None),
+    as_of: Optional[date] = None,
+    by_order_category: bool = False,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Profit and loss for several periods side by side.
+
+    Either a preset (the current month, quarter or year plus ``count``
+    earlier ones, newest first) or explicit ``period=YYYY-MM-DD..YYYY-MM-DD``
+    values, which must not overlap. Revenue is order totals by order date,
+    as in the single-period report. Each ledger is read with one grouped
+    query over the covering date indexes, whatever the number of periods.
+    ``by_order_category`` adds revenue, expenses and margin per order
+    category (expenses without one are reported as "Unassigned").
+    """
+    if period:
+        periods = [parse_pnl_period(value) for value in period]
+        if len(periods) > MAX_PNL_PERIODS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"At most {MAX_PNL_PERIODS} periods can be compared"
+            )
+        ordered = sorted(periods, key=lambda p: p[1])
+        for (label_a, _, last_a), (label_b, first_b, _) in zip(ordered, ordered[1:]):
+            if first_b <= last_a:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Periods {label_a} and {label_b} overlap"
+                )
+    else:
+        periods = pnl_preset_periods(preset, count or PNL_PRESET_COUNTS[preset], as_of or date.today())
+
+    range_start = datetime.combine(min(first for _, first, _ in periods), datetime.min.time())
+    range_end = datetime.combine(max(last for _, _, last in periods) + timedelta(days=1), datetime.min.time())
+
+    order_period = _period_index(Order.order_date, periods).label("period")
+    revenue_rows = session.exec(
+        select(order_period, Order.order_category, func.sum(Order.total_amount), func.count())
+        .where(Order.order_date >= range_start, Order.order_date < range_end)
+        .group_by(order_period, Order.order_category)
+    ).all()
+
+    expense_period = _period_index(Expense.expense_date, periods).label("period")
+    expense_rows = session.exec(
+        select(expense_period, Expense.category, Expense.order_category, func.sum(Expense.amount), func.count())
+        .where(Expense.expense_date >= range_start, Expense.expense_date < range_end)
+        .group_by(expense_period, Expense.category, Expense.order_category)
+    ).all()
+
+    results = [
+        {
+            "label": label,
+            "start_date": first.isoformat(),
+            "end_date": last.isoformat(),
+            "revenue": 0.0,
+            "expenses": 0.0,
+            "orders_count": 0,
+            "expenses_count": 0,
+            "expense_breakdown": defaultdict(float),
+            "revenue_by_order_category": defaultdict(float),
+            "expenses_by_order_category": defaultdict(float),
+        }
+        for label, first, last in periods
+    ]
+
+    for index, order_category, amount, rows in revenue_rows:
+        if index is None:
+            continue  # Between custom periods
+        result = results[index]
+        result["revenue"] += float(amount or 0)
+        result["orders_count"] += rows
+        result["revenue_by_order_category"][order_category or UNASSIGNED_CATEGORY] += float(amount or 0)
+
+    for index, category, order_category, amount, rows in expense_rows:
+        if index is None:
+            continue
+        result = results[index]
+        category_name = category.value if hasattr(category, 'value') else str(category)
+        result["expenses"] += float(amount or 0)
+        result["expenses_count"] += rows
+        result["expense_breakdown"][category_name] += float(amount or 0)
+        result["expenses_by_order_category"][order_category or UNASSIGNED_CATEGORY] += float(amount or 0)
+
+    for result in results:
+        revenue_by_category = result.pop("revenue_by_order_category")
+        expenses_by_category = result.pop("expenses_by_order_category")
+        result["net_profit"] = result["revenue"] - result["expenses"]
+        result["profit_margin_percent"] = (result["net_profit"] / result["revenue"] * 100) if result["revenue"] > 0 else 0
+        result["expense_breakdown"] = dict(result["expense_breakdown"])
+        if by_order_category:
+            margins = {}
+            for order_category in sorted(set(revenue_by_category) | set(expenses_by_category)):
+                revenue = revenue_by_category.get(order_category, 0.0)
+                expenses = expenses_by_category.get(order_category, 0.0)
+                margins[order_category] = {
+                    "revenue": revenue,
+                    "expenses": expenses,
+                    "net_profit": revenue - expenses,
+                    "margin_percent": ((revenue - expenses) / revenue * 100) if revenue > 0 else 0
+                }
+            result["by_order_category"] = margins
+        else:
+            result["revenue_by_order_category"] = dict(revenue_by_category)
+
+    return {
+        "preset": None if period else preset,
+        "periods": results
+    }
+
+def fetch_category_profitability(session: Session, start: date, end: date) -> dict:
+    """
+    Revenue, collections, expenses and margin per order category and month.
+
+    Revenue is order totals by order date, collected is payments by payment
+    date (attributed to their order's category) and expenses by expense
+    date; each is one grouped query over the covering date indexes.
+    """
+    dialect_name = session.get_bind().dialect.name
+    range_start = datetime.combine(start, datetime.min.time())
+    range_end = datetime.combine(end + timedelta(days=1), datetime.min.time())
+
+    order_month = time_bucket(Order.order_date, Granularity.MONTH, dialect_name).label("month")
+    payment_month = time_bucket(Payment.payment_date, Granularity.MONTH, dialect_name).label("month")
+    expense_month = time_bucket(Expense.expense_date, Granularity.MONTH, dialect_name).label("month")
+    ledgers = {
+        "revenue": select(Order.order_category, order_month, func.sum(Order.total_amount))
+            .where(Order.order_date >= range_start, Order.order_date < range_end)
+            .group_by(Order.order_category, order_month),
+        "collected": select(Order.order_category, payment_month, func.sum(Payment.amount))
+            .join(Order, Payment.order_id == Order.id)
+            .where(Payment.payment_date >= range_start, Payment.payment_date < range_end)
+            .group_by(Order.order_category, payment_month),
+        "expenses": select(Expense.order_category, expense_month, func.sum(Expense.amount))
+            .where(Expense.expense_date >= range_start, Expense.expense_date < range_end)
+            .group_by(Expense.order_category, expense_month),
+    }
+
+    months = list(iter_buckets(start, end, Granularity.MONTH))
+    empty = {"revenue": 0.0, "collected": 0.0, "expenses": 0.0}
+    cells = defaultdict(lambda: {month: dict(empty) for month in months})
+    for ledger, statement in ledgers.items():
+        for order_category, month, amount in session.exec(statement).all():
+            cells[order_category or UNASSIGNED_CATEGORY][bucket_key(month)][ledger] += float(amount or 0)
+
+    def with_margin(values: dict) -> dict:
+        margin = values["revenue"] - values["expenses"]
+        return dict(
+            values,
+            margin=margin,
+            margin_percent=(margin / values["revenue"] * 100) if values["revenue"] > 0 else 0
+        )
+
+    categories = []
+    totals = dict(empty)
+    for order_category, by_month in cells.items():
+        category_totals = {ledger: sum(values[ledger] for values in by_month.values()) for ledger in empty}
+        for ledger in empty:
+            totals[ledger] += category_totals[ledger]
+        categories.append({
+            "order_category": order_category,
+            **with_margin(category_totals),
+            "months": [{"period": month.isoformat(), **with_margin(by_month[month])} for month in months]
+        })
+    categories.sort(key=lambda row: row["revenue"], reverse=True)
+
+    return {
+        "start_date": start.isoformat(),
+        "end_date": end.isoformat(),
+        "totals": with_margin(totals),
+        "categories": categories
+    }
+
+@router.get("/reports/category-profitability")
+def get_category_profitability(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Profitability per order category, in total and per month.
+
+    Defaults to the last 12 months including the current one. Results are
+    cached until the next order, payment or expense change.
+    """
+    end = end_date or date.today()
+    start = start_date or _shift_month(end.replace(day=1), -11)
+    if start > end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start_date must not be after end_date"
+        )
+    if (end - start).days > MAX_SERIES_DAYS[Granularity.MONTH]:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Range too long"
+        )
+
+    return report_cache.get_or_compute(
+        ("category-profitability", start, end),
+        lambda: fetch_category_profitability(session, start, end)
+    )
+
+# Receivables aging buckets: (label, min age in days, max age in days or None)
+AGING_BUCKETS = [
+    ("0_30", 0, 30),
+    ("31_60", 31, 60),
+    ("61_90", 61, 90),
+    ("90_plus", 91, None),
+]
+
+@router.get("/reports/aging")
+def get_aging_report(
+    as_of: Optional[date] = None,
+    client_type: Optional[ClientType] = None,
+    top: int = Query(10, ge=1, le=1000),
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Outstanding order balances per leader, bucketed by order age.
+
+    Ages are whole days from ``order_date`` to ``as_of`` (default today).
+    Computed with a single grouped query over unpaid orders, which the
+    partial index ``ix_orders_open_balance`` covers. Returns the bucket totals
+    across all matching leaders and the ``top`` leaders by amount owed.
+    """
+    as_of = as_of or date.today()
+    # Midnight after as_of: an order placed any time on as_of is 0 days old
+    day_end = datetime.combine(as_of, datetime.min.time()) + timedelta(days=1)
+
+    bucket_columns = []
+    for label, min_days, max_days in AGING_BUCKETS:
+        conditions = [Order.order_date < day_end - timedelta(days=min_days)]
+        if max_days is not None:
+            conditions.append(Order.order_date >= day_end - timedelta(days=max_days + 1))
+        bucket_columns.append(
+            func.coalesce(func.sum(case((and_(*conditions), Order.balance), else_=0.0)), 0.0).label(label)
+        )
+
+    outstanding = func.sum(Order.balance).label("outstanding")
+    statement = (
+        select(
+            Client.id,
+            Client.name,
+            Client.type,
+            func.count(Order.id).label("open_orders"),
+            func.min(Order.order_date).label("oldest_order_date"),
+            outstanding,
+            *bucket_columns
+        )
+        .join(Client, Order.client_id == Client.id)
+        .where(Order.balance > 0, Order.order_date < day_end)
+        .group_by(Client.id, Client.name, Client.type)
+        .order_by(outstanding.desc())
+    )
+    if client_type is not None:
+        statement = statement.where(Client.type == client_type)
+
+    rows = session.exec(statement).all()
+
+    labels = [label for label, _, _ in AGING_BUCKETS]
+    totals = {label: 0.0 for label in labels}
+    totals["outstanding"] = 0.0
+    leaders = []
+    for row in rows:
+        buckets = {label: float(getattr(row, label)) for label in labels}
+        for label, amount in buckets.items():
+            totals[label] += amount
+        totals["outstanding"] += float(row.outstanding)
+        leaders.append({
+            "leader_id": str(row[0]),
+            "leader_name": row[1],
+            "leader_type": row[2].value if hasattr(row[2], 'value') else str(row[2]),
+            "open_orders": row.open_orders,
+            "oldest_order_date": row.oldest_order_date.isoformat() if row.oldest_order_date else None,
+            "outstanding": float(row.outstanding),
+            "buckets": buckets
+        })
+
+    return {
+        "as_of": as_of.isoformat(),
+        "client_type": client_type.value if client_type else None,
+        "leader_count": len(leaders),
+        "totals": totals,
+        "top_debtors": leaders[:top]
+    }
@@ -0,0 +1,81 @@
+import asyncio
+import json
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Depends, Header, Request
+from fastapi.responses import StreamingResponse
+
+from config import get_settings
+from models import User
+from services.events import event_broker
+from utils.auth import create_stream_token, get_current_user, get_current_user_for_stream
+
+settings = get_settings()
+
+router = APIRouter(prefix="/events", tags=["Events"])
+
+
+def format_sse(event: Dict[str, Any]) -> str:
+    """Render one event in text/event-stream framing."""
+    lines = []
+    if event.get("seq") is not None:
+        lines.append(f"id: {event['seq']}")
+    lines.append(f"event: {event['type']}")
+    lines.append(f"data: {json.dumps(event, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+@router.post("/token")
+def create_events_token(current_user: User = Depends(get_current_user)):
+    """
+    A short-lived token for opening the event stream from a browser, as
+    ``GET /events?stream_token=...``. It is only good for that, and only
+    for ``expires_in`` seconds; fetch a new one for every (re)connect.
+    """
+    return {
+        "stream_token": create_stream_token(current_user),
+        "expires_in": settings.stream_token_expire_seconds
+    }
+
+
+@router.get("")
+async def stream_events(
+    request: Request,
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+    after: Optional[str] = None,
+    current_user: User = Depends(get_current_user_for_stream)
+):
+    """
+    Stream order, payment and expense changes as server-sent events.
+
+    Event names are ``<entity>.<action>`` (``order.created``, ``payment.deleted``,
+    ...). The data is a JSON object with ``type``, ``id`` (the entity id),
+    ``data`` (the record as its read endpoint returns it, or null for deletes)
+    and ``at``. A ``resync`` event means changes were missed and lists should
+    be refetched. Browsers pass a token from POST /events/token as
+    ``?stream_token=``; since they then reconnect by hand, ``after`` does
+    what Last-Event-ID does.
+    """
+    subscription = event_broker.subscribe(last_event_id or after)
+
+    async def event_stream():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                if await request.is_disconnected():
+                    break
+                try:
+                    event = await asyncio.wait_for(subscription.get(), timeout=settings.event_heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    # Keeps proxies from closing an idle connection
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(event)
+        finally:
+            event_broker.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
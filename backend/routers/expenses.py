@@ -1,24 +1,107 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlmodel import Session, select
-from typing import List
+from sqlalchemy import func
+from typing import List, Optional, Union
 from database import get_session
-from models import Expense, ExpenseCreate, ExpenseRead, User
+from models import Expense, ExpenseCategory, ExpenseCategoryTotal, ExpenseCreate, ExpensePage, ExpenseRead, User
 from utils.auth import get_current_user
-from datetime import datetime, date
+from services.events import event_broker
+from datetime import datetime, date, timedelta
 
 router = APIRouter(prefix="/expenses", tags=["Expenses"])
 
-@router.get("/", response_model=List[ExpenseRead])
+def expense_conditions(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    category: Optional[List[ExpenseCategory]] = None,
+    order_category: Optional[str] = None,
+    payment_method: Optional[str] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None
+) -> list:
+    """WHERE conditions for an expense filter; date bounds are whole days, both inclusive."""
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="date_from must not be after date_to"
+        )
+    conditions = []
+    if date_from:
+        conditions.append(Expense.expense_date >= datetime.combine(date_from, datetime.min.time()))
+    if date_to:
+        # Half-open upper bound so the index range scan covers the whole last day
+        conditions.append(Expense.expense_date < datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+    if category:
+        conditions.append(Expense.category.in_(category))
+    if order_category is not None:
+        conditions.append(Expense.order_category == order_category)
+    if payment_method is not None:
+        conditions.append(Expense.payment_method == payment_method)
+    if min_amount is not None:
+        conditions.append(Expense.amount >= min_amount)
+    if max_amount is not None:
+        conditions.append(Expense.amount <= max_amount)
+    return conditions
+
+@router.get("/", response_model=Union[ExpensePage, List[ExpenseRead]])
 def get_expenses(
-    skip: int = 0,
-    limit: int = 100,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    category: Optional[List[ExpenseCategory]] = Query(None),
+    order_category: Optional[str] = None,
+    payment_method: Optional[str] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=500),
+    totals: bool = False,
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    """Get all expenses."""
-    statement = select(Expense).offset(skip).limit(limit)
-    expenses = session.exec(statement).all()
-    return expenses
+    """
+    Filter expenses, newest first.
+
+    ``category`` may be repeated. Returns the page as a list; with
+    ``totals=true`` it returns an ExpensePage, whose ``total``,
+    ``total_amount`` and ``by_category`` cover all matching expenses, not
+    just the page. Filtering, sorting and paging happen in SQL on the
+    expense_date index.
+    """
+    conditions = expense_conditions(
+        date_from, date_to, category, order_category, payment_method, min_amount, max_amount
+    )
+
+    expenses = session.exec(
+        select(Expense).where(*conditions)
+        .order_by(Expense.expense_date.desc(), Expense.id)
+        .offset(skip).limit(limit)
+    ).all()
+    items = [ExpenseRead.model_validate(expense) for expense in expenses]
+    if not totals:
+        return items
+
+    by_category = [
+        ExpenseCategoryTotal(
+            category=category_value.value if hasattr(category_value, 'value') else str(category_value),
+            amount=float(amount or 0),
+            count=count
+        )
+        for category_value, amount, count in session.exec(
+            select(Expense.category, func.sum(Expense.amount), func.count())
+            .where(*conditions)
+            .group_by(Expense.category)
+            .order_by(func.sum(Expense.amount).desc())
+        ).all()
+    ]
+
+    return ExpensePage(
+        items=items,
+        total=sum(row.count for row in by_category),
+        skip=skip,
+        limit=limit,
+        total_amount=sum(row.amount for row in by_category),
+        by_category=by_category
+    )
 
 @router.get("/{expense_id}", response_model=ExpenseRead)
 def get_expense(expense_id: str, session: Session = Depends(get_session), current_user: User = Depends(get_current_user)):
@@ -79,6 +162,7 @@ def create_expense(
         session.commit()
         session.refresh(db_expense)
         
+        event_broker.publish("expense.created", db_expense.id, ExpenseRead.model_validate(db_expense))
         return db_expense
     except Exception as e:
         session.rollback()
@@ -146,6 +230,7 @@ def update_expense(
         session.commit()
         session.refresh(expense)
         
+        event_broker.publish("expense.updated", expense.id, ExpenseRead.model_validate(expense))
         return expense
     except Exception as e:
         session.rollback()
@@ -179,6 +264,7 @@ def delete_expense(
     
     session.delete(expense)
     session.commit()
+    event_broker.publish("expense.deleted", expense_id)
     return None
 
 @router.get("/date/{date_str}")
@@ -192,11 +278,8 @@ def get_expenses_by_date(date_str: str, session: Session = Depends(get_session),
             detail="Invalid date format. Use YYYY-MM-DD"
         )
     
-    # Get all expenses and filter by date
-    expenses = session.exec(select(Expense)).all()
-    filtered_expenses = [e for e in expenses if e.expense_date.date() == expense_date]
-    
-    return filtered_expenses
+    statement = select(Expense).where(*expense_conditions(date_from=expense_date, date_to=expense_date))
+    return session.exec(statement).all()
 
 @router.get("/category/{category}")
 def get_expenses_by_category(category: str, session: Session = Depends(get_session), current_user: User = Depends(get_current_user)):
@@ -1,12 +1,45 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import func
 from sqlmodel import Session, select
 from typing import List
+from datetime import datetime
+from uuid import UUID
 from database import get_session
-from models import Client, ClientCreate, ClientRead, User, Order, Payment
+from models import Client, ClientCreate, ClientUpdate, ClientRead, User, Order, Payment
+from utils.concurrency import check_version, version_conflict
+from sqlalchemy.orm.exc import StaleDataError
 from utils.auth import get_current_user
 
 router = APIRouter(prefix="/leaders", tags=["Leaders"])
 
+def fetch_leader_list(session: Session, ids: List[UUID] = None) -> List[dict]:
+    """Leaders as plain dicts in the ``ClientRead`` shape, without summary statistics; ``ids`` keeps only those."""
+    statement = select(
+        Client.id,
+        Client.name,
+        Client.type,
+        Client.contact,
+        Client.address,
+        Client.opening_balance,
+        Client.created_at,
+        Client.version,
+    ).order_by(Client.name)
+    if ids is not None:
+        statement = statement.where(Client.id.in_(ids))
+    return [
+        {
+            "id": row[0],
+            "name": row[1],
+            "type": row[2].value if hasattr(row[2], 'value') else row[2],
+            "contact": row[3],
+            "address": row[4],
+            "opening_balance": row[5],
+            "created_at": row[6],
+            "version": row[7],
+        }
+        for row in session.exec(statement).all()
+    ]
+
 @router.get("/", response_model=List[ClientRead])
 def get_leaders(
     skip: int = 0,
@@ -15,27 +48,42 @@ def get_leaders(
     current_user: User = Depends(get_current_user)
 ):
     """Get all leaders (schools and dealers) with summary statistics."""
-    statement = select(Client).offset(skip).limit(limit)
-    leaders = session.exec(statement).all()
+    # Per-client totals in one grouped query each, instead of two queries per leader
+    order_totals = (
+        select(
+            Order.client_id,
+            func.count(Order.id).label("order_count"),
+            func.sum(Order.total_amount).label("order_amount")
+        )
+        .group_by(Order.client_id)
+        .subquery()
+    )
+    payment_totals = (
+        select(Payment.client_id, func.sum(Payment.amount).label("paid_amount"))
+        .group_by(Payment.client_id)
+        .subquery()
+    )
+    statement = (
+        select(Client, order_totals.c.order_count, order_totals.c.order_amount, payment_totals.c.paid_amount)
+        .outerjoin(order_totals, order_totals.c.client_id == Client.id)
+        .outerjoin(payment_totals, payment_totals.c.client_id == Client.id)
+        .offset(skip)
+        .limit(limit)
+    )
+    rows = session.exec(statement).all()
     
     # Enhance each leader with summary statistics
     enhanced_leaders = []
-    for leader in leaders:
+    for leader, order_count, order_amount, paid_amount in rows:
         leader_dict = leader.model_dump()
         
-        # Get all orders for this leader
-        orders = session.exec(select(Order).where(Order.client_id == leader.id)).all()
-        
-        # Get all payments for this leader
-        payments = session.exec(select(Payment).where(Payment.client_id == leader.id)).all()
-        
         # Calculate summary statistics
-        total_orders = sum(float(order.total_amount) for order in orders)
-        total_paid = sum(float(payment.amount) for payment in payments)
+        total_orders = float(order_amount or 0)
+        total_paid = float(paid_amount or 0)
         outstanding_balance = total_orders - total_paid
         
         # Add summary to leader data
-        leader_dict['total_orders'] = len(orders)
+        leader_dict['total_orders'] = order_count or 0
         leader_dict['total_order_amount'] = total_orders
         leader_dict['total_paid'] = total_paid
         leader_dict['outstanding_balance'] = outstanding_balance
@@ -75,11 +123,11 @@ def create_leader(
 @router.put("/{leader_id}", response_model=ClientRead)
 def update_leader(
     leader_id: str,
-    leader_data: ClientCreate,
+    leader_data: ClientUpdate,
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    """Update a leader."""
+    """Update a leader; 409 with the current leader if ``version`` is stale."""
     statement = select(Client).where(Client.id == leader_id)
     leader = session.exec(statement).first()
     
@@ -89,12 +137,19 @@ def update_leader(
             detail="Leader not found"
         )
     
+    check_version(leader_data.version, leader, ClientRead.model_validate)
+    
     # Update fields
-    for key, value in leader_data.dict().items():
+    for key, value in leader_data.dict(exclude={"version"}).items():
         setattr(leader, key, value)
     
     session.add(leader)
-    session.commit()
+    try:
+        session.commit()
+    except StaleDataError:
+        session.rollback()
+        session.refresh(leader)
+        raise version_conflict(ClientRead.model_validate(leader))
     session.refresh(leader)
     
     return leader
@@ -147,10 +202,18 @@ def get_leader_ledger(
         select(Payment).where(Payment.client_id == leader_id).order_by(Payment.payment_date.desc())
     ).all()
     
-    # Fetch unallocated payments (no order_id)
-    unallocated_payments = session.exec(
-        select(Payment).where(Payment.client_id == leader_id, Payment.order_id == None).order_by(Payment.payment_date.desc())
-    ).all()
+    # Unallocated payments (no order_id), newest first like all_payments
+    unallocated_payments = [payment for payment in all_payments if payment.order_id is None]
+    
+    # Payments of this client's orders in one query, grouped by order below
+    payments_by_order = {}
+    for payment in session.exec(
+        select(Payment)
+        .join(Order, Payment.order_id == Order.id)
+        .where(Order.client_id == leader_id)
+        .order_by(Payment.payment_date)
+    ).all():
+        payments_by_order.setdefault(payment.order_id, []).append(payment)
     
     # Calculate summary statistics
     total_order_amount = sum(float(order.total_amount) for order in orders)
@@ -160,13 +223,8 @@ def get_leader_ledger(
     # Build orders list with payment details
     orders_list = []
     for order in orders:
-        # Get payments for this specific order
-        order_payments = session.exec(
-            select(Payment).where(Payment.order_id == order.id).order_by(Payment.payment_date)
-        ).all()
-        
         payments_list = []
-        for payment in order_payments:
+        for payment in payments_by_order.get(order.id, []):
             payments_list.append({
                 "id": str(payment.id),
                 "payment_date": payment.payment_date.isoformat() if payment.payment_date else None,
@@ -228,18 +286,16 @@ def get_leader_payments(
     if not client:
         raise HTTPException(status_code=404, detail="Leader not found")
     
-    # Fetch payments with order information
+    # Fetch payments with their orders in one query
     payments_query = session.exec(
-        select(Payment).where(Payment.client_id == leader_id).order_by(Payment.payment_date.desc())
+        select(Payment, Order)
+        .outerjoin(Order, Payment.order_id == Order.id)
+        .where(Payment.client_id == leader_id)
+        .order_by(Payment.payment_date.desc())
     ).all()
     
     payments = []
-    for payment in payments_query:
-        # Get associated order if exists
-        order = None
-        if payment.order_id:
-            order = session.exec(select(Order).where(Order.id == payment.order_id)).first()
-        
+    for payment, order in payments_query:
         payments.append({
             "id": str(payment.id),
             "payment_date": payment.payment_date.isoformat() if payment.payment_date else None,
@@ -331,9 +387,12 @@ def export_leader_payments(
     if not client:
         raise HTTPException(status_code=404, detail="Leader not found")
     
-    # Fetch payments with order information
+    # Fetch payments with their orders in one query
     payments_query = session.exec(
-        select(Payment).where(Payment.client_id == leader_id).order_by(Payment.payment_date.desc())
+        select(Payment, Order)
+        .outerjoin(Order, Payment.order_id == Order.id)
+        .where(Payment.client_id == leader_id)
+        .order_by(Payment.payment_date.desc())
     ).all()
     
     # Create CSV in memory
@@ -358,12 +417,7 @@ def export_leader_payments(
     # Calculate running totals
     total_paid = 0
     
-    for payment in reversed(list(payments_query)):  # Reverse to calculate chronologically
-        # Get associated order if exists
-        order = None
-        if payment.order_id:
-            order = session.exec(select(Order).where(Order.id == payment.order_id)).first()
-        
+    for payment, order in reversed(list(payments_query)):  # Reverse to calculate chronologically
         total_paid += float(payment.amount)
         
         # Calculate remaining balance
@@ -0,0 +1,26 @@
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, status
+from fastapi.responses import Response
+
+from config import get_settings
+from services.metrics import CONTENT_TYPE_LATEST, render_metrics
+
+settings = get_settings()
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/metrics", include_in_schema=False)
+def get_metrics(authorization: Optional[str] = Header(None)):
+    """Prometheus metrics for all workers, in the text exposition format."""
+    if settings.metrics_token and not secrets.compare_digest(
+        authorization or "", f"Bearer {settings.metrics_token}"
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics token"
+        )
+    # Passed as a header: media_type would append a second charset
+    return Response(content=render_metrics(), headers={"Content-Type": CONTENT_TYPE_LATEST})
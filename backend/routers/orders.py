@@ -1,18 +1,153 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, status
 from uuid import UUID
 from sqlmodel import Session, select
-from typing import List
+from typing import List, Optional
+from datetime import datetime
 from database import get_session
-from models import Order, OrderCreate, OrderRead, Client, User, OrderStatus, Settings, Payment, PaymentMode, PaymentStatus
+from models import Order, OrderCreate, OrderRead, OrderItem, Client, User, OrderStatus, Settings, Payment, PaymentMode, PaymentStatus
 from utils.auth import get_current_user
-from services.invoice_generator import invoice_generator
+from utils.idempotency import run_idempotent
+from services.order_numbers import order_number_allocator
+from services.events import event_broker
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.attributes import flag_modified
+from sqlalchemy.orm.exc import StaleDataError
+from utils.concurrency import check_version, version_conflict
+import logging
 import os
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/orders", tags=["Orders"])
 
-@router.get("", response_model=List[OrderRead])  # Match both /orders and /orders/
-@router.get("/", response_model=List[OrderRead])  # Match both /orders and /orders/
+def _enum_value(value):
+    """Return the plain string for an enum column value."""
+    return value.value if hasattr(value, 'value') else value
+
+def order_conflict(session: Session, order_id) -> HTTPException:
+    """Roll back a write that lost a version race and describe the current order."""
+    session.rollback()
+    current = session.exec(select(Order).where(Order.id == order_id)).first()
+    if not current:
+        return HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Order not found"
+        )
+    return version_conflict(OrderRead.model_validate(current))
+
+# Order ids per items query, kept under SQLite's bound-parameter limit
+ITEMS_IN_CHUNK = 500
+
+def fetch_order_list(
+    session: Session,
+    skip: int = 0,
+    limit: Optional[int] = 100,
+    status_filter: OrderStatus = None,
+    ids: List[UUID] = None,
+    client_id: UUID = None,
+    date_from: datetime = None,
+    date_to: datetime = None
+) -> List[dict]:
+    """Build the orders list response straight from row tuples.
+
+    Produces the same JSON shape as ``OrderRead`` (serialized by alias) without
+    loading ORM objects or constructing a Pydantic model per row. Items are
+    fetched with batched ``IN`` queries instead of one selectin load per order.
+    ``limit=None`` returns every row; ``ids`` keeps only those orders (used
+    by ``GET /sync`` for one page of changes). ``client_id``
+    and the inclusive ``order_date`` range ``date_from``..``date_to`` are
+    served by ``ix_orders_client_id_order_date``.
+    """
+    statement = (
+        select(
+            Order.id,
+            Order.order_number,
+            Order.client_id,
+            Order.total_amount,
+            Order.paid_amount,
+            Order.balance,
+            Order.status,
+            Order.order_date,
+            Order.created_at,
+            Client.name,
+            Order.details,
+            Order.order_category,
+            Order.pages,
+            Order.paper,
+            Order.version,
+        )
+        .outerjoin(Client, Order.client_id == Client.id)  # Use outer join to handle missing clients
+        .order_by(Order.created_at.desc())  # Sort by newest first
+    )
+    if status_filter is not None:
+        statement = statement.where(Order.status == status_filter)
+    if ids is not None:
+        statement = statement.where(Order.id.in_(ids))
+    if client_id is not None:
+        statement = statement.where(Order.client_id == client_id)
+    if date_from is not None:
+        statement = statement.where(Order.order_date >= date_from)
+    if date_to is not None:
+        statement = statement.where(Order.order_date <= date_to)
+
+    rows = session.exec(statement.offset(skip).limit(limit)).all()
+
+    orders = []
+    items_by_order = {}
+    for row in rows:
+        items = []
+        items_by_order[row[0]] = items
+        orders.append({
+            "id": row[0],
+            "order_number": row[1],
+            "client_id": row[2],
+            "total_amount": row[3],
+            "paid_amount": row[4],
+            "balance": row[5],
+            "status": _enum_value(row[6]),
+            "order_date": row[7],
+            "created_at": row[8],
+            "leaderName": row[9],
+            "details": row[10],
+            "order_category": row[11],
+            "pages": row[12],
+            "paper": row[13],
+            "items": items,
+            "version": row[14],
+        })
+
+    order_ids = list(items_by_order)
+    for start in range(0, len(order_ids), ITEMS_IN_CHUNK):
+        item_statement = (
+            select(
+                OrderItem.order_id,
+                OrderItem.id,
+                OrderItem.item_description,
+                OrderItem.quantity,
+                OrderItem.pages,
+                OrderItem.paper,
+                OrderItem.unit_price,
+                OrderItem.total_price,
+            )
+            .where(OrderItem.order_id.in_(order_ids[start:start + ITEMS_IN_CHUNK]))
+            .order_by(OrderItem.created_at)
+        )
+        for item in session.exec(item_statement).all():
+            items_by_order[item[0]].append({
+                "id": item[1],
+                "item_description": item[2],
+                "quantity": item[3],
+                "pages": item[4],
+                "paper": item[5],
+                "unit_price": item[6],
+                "total_price": item[7],
+            })
+
+    return orders
+
+@router.get("", response_model=List[OrderRead], response_class=ORJSONResponse)  # Match both /orders and /orders/
+@router.get("/", response_model=List[OrderRead], response_class=ORJSONResponse)  # Match both /orders and /orders/
 def get_orders(
     skip: int = 0,
     limit: int = 100,
@@ -20,25 +155,21 @@ def get_orders(
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    """Get all orders with optional filters."""
+    """Get all orders with optional filters.
+
+    Rows are shaped into plain dicts and serialized with orjson, skipping the
+    per-row model construction and the ``response_model`` re-validation.
+    """
     try:
-        # Debug logging
-        print(f"Fetching orders with params: skip={skip}, limit={limit}, status={status_filter}")
-        
-        # Construct base query with left join to handle cases where client might be missing
-        statement = (
-            select(Order)
-            .outerjoin(Client)  # Use outer join to handle missing clients
-            .order_by(Order.created_at.desc())  # Sort by newest first
-        )
+        logger.debug("Fetching orders: skip=%s limit=%s status=%s", skip, limit, status_filter)
         
-        # Apply status filter if provided
+        # Validate status filter if provided
+        status_enum = None
         if status_filter:
             try:
                 status_enum = OrderStatus(status_filter)  # Validate status value
-                statement = statement.where(Order.status == status_enum)
             except ValueError:
-                print(f"Invalid status filter received: {status_filter}")
+                logger.info("Invalid status filter received: %s", status_filter)
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail=f"Invalid status filter: {status_filter}"
@@ -46,63 +177,21 @@ def get_orders(
         
         # Execute query with pagination
         try:
-            orders = session.exec(statement.offset(skip).limit(limit)).all()
-            print(f"Found {len(orders)} orders")
-        except Exception as db_error:
-            print(f"Database error: {str(db_error)}")
+            response_orders = fetch_order_list(session, skip=skip, limit=limit, status_filter=status_enum)
+            logger.debug("Found %d orders", len(response_orders))
+        except Exception:
+            logger.exception("Database error while fetching orders")
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Database error occurred while fetching orders"
             )
         
-        # Convert orders to response model
-        response_orders = []
-        for order in orders:
-            try:
-                from models import OrderItemRead
-                
-                # Serialize order items
-                items_read = [
-                    OrderItemRead(
-                        id=item.id,
-                        itemDescription=item.item_description,
-                        quantity=item.quantity,
-                        pages=item.pages,
-                        paper=item.paper,
-                        unitPrice=item.unit_price,
-                        totalPrice=item.total_price
-                    )
-                    for item in order.items
-                ]
-                
-                # Create OrderRead using field names that match the model definition
-                order_data = OrderRead(
-                    id=order.id,
-                    orderNumber=order.order_number,  # Use the frontend field name
-                    leaderId=order.client_id,        # Use the frontend field name
-                    totalAmount=order.total_amount,  # Use the frontend field name
-                    paidAmount=order.paid_amount,    # CRITICAL: Include paid amount
-                    balance=order.balance,            # CRITICAL: Include balance
-                    status=order.status.value if isinstance(order.status, OrderStatus) else str(order.status),
-                    orderDate=order.order_date,      # Use the frontend field name
-                    createdAt=order.created_at,      # Use the frontend field name
-                    leaderName=order.client.name if order.client else None,
-                    details=order.details,           # Include order details
-                    orderCategory=order.order_category,  # Include order category
-                    pages=order.pages,               # Include pages
-                    paper=order.paper,               # Include paper
-                    items=items_read                 # Include order items
-                )
-                response_orders.append(order_data)
-            except Exception as e:
-                print(f"Error processing order {order.id}: {str(e)}")
-                continue
-        
-        return response_orders
+        return ORJSONResponse(content=response_orders)
         
+    except HTTPException:
+        raise
     except Exception as e:
-        # Log the error for debugging
-        print(f"Error fetching orders: {str(e)}")
+        logger.exception("Error fetching orders")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to fetch orders. Please try again later."
@@ -125,10 +214,28 @@ def get_order(order_id: str, session: Session = Depends(get_session), current_us
 @router.post("/", response_model=OrderRead, status_code=status.HTTP_201_CREATED)
 def create_order(
     order_data: OrderCreate,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    """Create a new order with multiple items and optional initial payment."""
+    """
+    Create a new order with multiple items and optional initial payment.
+
+    Retries sent with the same Idempotency-Key header replay the original
+    response instead of creating the order again.
+    """
+    return run_idempotent(
+        idempotency_key,
+        current_user,
+        "POST /orders",
+        order_data,
+        lambda: OrderRead.model_validate(_create_order(order_data, session)),
+        session,
+        status_code=status.HTTP_201_CREATED
+    )
+
+def _create_order(order_data: OrderCreate, session: Session) -> Order:
+    """Create the order, its items and the initial payment."""
     try:
         from models import OrderItem
         
@@ -251,10 +358,21 @@ def create_order(
             )
         
         
+        # Allocate an order number server-side unless the client supplied one
+        if not (order_dict.get('order_number') or '').strip():
+            order_dict['order_number'] = order_number_allocator.allocate(session)
+        
         # Create order
         db_order = Order(**order_dict)
         session.add(db_order)
-        session.flush()  # Get order ID before creating items
+        try:
+            session.flush()  # Get order ID before creating items
+        except IntegrityError:
+            session.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Order number {order_dict['order_number']} already exists"
+            )
         
         # Create order items
         for item_data in items_data:
@@ -269,52 +387,51 @@ def create_order(
             )
             session.add(order_item)
         
-        session.commit()
-        session.refresh(db_order)
-        
-        # Handle initial payment if provided
+        # Initial payment, if any, in the same transaction as the order
+        payment = None
         if initial_payment > 0:
-            try:
-                # Parse payment date
-                from datetime import datetime
-                payment_date = datetime.utcnow()
-                if payment_date_str:
-                    try:
-                        payment_date = datetime.fromisoformat(payment_date_str.split('T')[0])
-                    except ValueError:
-                        pass
+            # Parse payment date
+            from datetime import datetime
+            payment_date = datetime.utcnow()
+            if payment_date_str:
+                try:
+                    payment_date = datetime.fromisoformat(payment_date_str.split('T')[0])
+                except ValueError:
+                    pass
 
-                # Map payment mode
-                mode_map = {
-                    "Cash": PaymentMode.CASH,
-                    "Bank Transfer": PaymentMode.BANK_TRANSFER,
-                    "Cheque": PaymentMode.CHEQUE,
-                    "UPI": PaymentMode.UPI
-                }
-                mode = mode_map.get(payment_mode, PaymentMode.CASH)
+            # Map payment mode
+            mode_map = {
+                "Cash": PaymentMode.CASH,
+                "Bank Transfer": PaymentMode.BANK_TRANSFER,
+                "Cheque": PaymentMode.CHEQUE,
+                "UPI": PaymentMode.UPI
+            }
+            mode = mode_map.get(payment_mode, PaymentMode.CASH)
 
-                payment = Payment(
-                    amount=initial_payment,
-                    mode=mode,
-                    status=PaymentStatus.COMPLETED,
-                    client_id=db_order.client_id,
-                    order_id=db_order.id,
-                    payment_date=payment_date,
-                    reference_number=f"INIT-{db_order.order_number}"
-                )
-                session.add(payment)
-                session.commit()
-                
-                print(f"Created initial payment of {initial_payment} for order {db_order.order_number}")
-            except Exception as e:
-                print(f"Error creating initial payment: {e}")
-                session.rollback()
-                # Roll back the order creation if payment fails
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"Failed to create initial payment: {str(e)}"
-                )
-                
+            payment = Payment(
+                amount=initial_payment,
+                mode=mode,
+                status=PaymentStatus.COMPLETED,
+                client_id=db_order.client_id,
+                order_id=db_order.id,
+                payment_date=payment_date,
+                reference_number=f"INIT-{db_order.order_number}"
+            )
+            session.add(payment)
+        
+        # One commit for the order, its items and the payment: all or nothing.
+        # Flushing first surfaces a failing insert before the commit that
+        # marks the Idempotency-Key completed.
+        session.flush()
+        session.commit()
+        session.refresh(db_order)
+        if payment is not None:
+            logger.info("Created initial payment of %s for order %s", initial_payment, db_order.order_number)
+        
+        event_broker.publish("order.created", db_order.id, OrderRead.model_validate(db_order))
+        if payment is not None:
+            from routers.payments import payment_to_read
+            event_broker.publish("payment.created", payment.id, payment_to_read(session, payment))
         return db_order
     except HTTPException:
         raise
@@ -332,7 +449,12 @@ def update_order(
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    """Update an order with multiple items support and validation."""
+    """
+    Update an order with multiple items support and validation.
+
+    When the payload carries the ``version`` the client read, the update is
+    rejected with 409 and the current order if someone else changed it first.
+    """
     try:
         from models import OrderItem
         
@@ -345,8 +467,11 @@ def update_order(
                 detail="Order not found"
             )
         
+        check_version(order_data.version, order, OrderRead.model_validate)
+        
         # Convert frontend field names to backend field names
         order_dict = order_data.dict(exclude_unset=True)
+        order_dict.pop('version', None)  # Managed by the ORM
         
         # Extract and validate details field
         details = order_dict.pop('details', None)
@@ -398,7 +523,9 @@ def update_order(
         
         # Map frontend camelCase to backend snake_case
         if 'orderNumber' in order_dict:
-            order_dict['order_number'] = order_dict.pop('orderNumber')
+            order_number = order_dict.pop('orderNumber')
+            if order_number and order_number.strip():
+                order_dict['order_number'] = order_number
         if 'leaderId' in order_dict:
             order_dict['client_id'] = order_dict.pop('leaderId')
         if 'totalAmount' in order_dict:
@@ -484,14 +611,26 @@ def update_order(
                 )
                 session.add(order_item)
         
+        # An edit that only replaces items leaves the order row clean; force the
+        # UPDATE so the version still advances and concurrent edits conflict
+        flag_modified(order, "total_amount")
         session.add(order)
         session.commit()
         session.refresh(order)
         
+        event_broker.publish("order.updated", order.id, OrderRead.model_validate(order))
         return order
         
     except HTTPException:
         raise
+    except StaleDataError:
+        raise order_conflict(session, order_id)
+    except IntegrityError:
+        session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Order number {order_dict.get('order_number')} already exists"
+        )
     except Exception as e:
         session.rollback()
         raise HTTPException(
@@ -574,10 +713,10 @@ def delete_order(
             for payment in payments:
                 session.delete(payment)
             
-            print(f"Deleting order {order.order_number} with {len(payments)} associated payment(s)")
+            logger.info("Deleting order %s with %d associated payment(s)", order.order_number, len(payments))
             
         except Exception as e:
-            print(f"Error deleting payments: {e}")
+            logger.exception("Error deleting payments of order %s", order.order_number)
             session.rollback()
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -585,13 +724,19 @@ def delete_order(
             )
         
         # Delete the order
+        deleted_payment_ids = [payment.id for payment in payments]
         session.delete(order)
         session.commit()
         
+        for payment_id in deleted_payment_ids:
+            event_broker.publish("payment.deleted", payment_id)
+        event_broker.publish("order.deleted", oid)
         return None
         
     except HTTPException:
         raise
+    except StaleDataError:
+        raise order_conflict(session, order_id)
     except Exception as e:
         session.rollback()
         raise HTTPException(
@@ -626,9 +771,13 @@ def update_order_status(
     
     order.status = new_status
     session.add(order)
-    session.commit()
+    try:
+        session.commit()
+    except StaleDataError:
+        raise order_conflict(session, order_id)
     session.refresh(order)
     
+    event_broker.publish("order.updated", order.id, OrderRead.model_validate(order))
     return {"message": "Order status updated", "order": order}
 
 @router.get("/school/{school_id}")
@@ -716,15 +865,14 @@ def generate_invoice(
     
 
     # Fetch payment history for this order
-    print(f"DEBUG: Fetching payment history for order_id: {order_id} (Type: {type(order_id)})")
     try:
         # Ensure order_id is UUID for query
         oid = UUID(str(order_id)) if isinstance(order_id, str) else order_id
         history_statement = select(Payment).where(Payment.order_id == oid).order_by(Payment.payment_date)
         history_results = session.exec(history_statement).all()
-        print(f"DEBUG: Found {len(history_results)} payments for order {oid}")
+        logger.debug("Found %d payments for invoice of order %s", len(history_results), oid)
     except Exception as e:
-        print(f"ERROR: Failed to fetch payment history: {e}")
+        logger.exception("Failed to fetch payment history for order %s", order_id)
         history_results = []
     
     payment_history = []
@@ -737,15 +885,14 @@ def generate_invoice(
             "reference_number": p.reference_number
         })
     
-    print(f"DEBUG: Payment history for invoice: {payment_history}")
-    print(f"DEBUG: Order Total Amount: {order_dict['total_amount']} (Type: {type(order_dict['total_amount'])})")
-    
     # Ensure total_amount is float
     try:
         order_dict['total_amount'] = float(order_dict['total_amount'])
     except (ValueError, TypeError):
-        print(f"WARNING: Could not convert total_amount to float: {order_dict['total_amount']}")
+        logger.warning("Could not convert total_amount to float: %r", order_dict['total_amount'])
 
+    # Imported here so reportlab and qrcode load on the first invoice, not at startup
+    from services.invoice_generator import invoice_generator
     invoice_path = invoice_generator.generate_invoice(order_dict, client_dict, settings_dict, payment_history)
     
     if os.path.exists(invoice_path):
@@ -1,19 +1,143 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, status
 from uuid import UUID
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse
 from sqlmodel import Session, select
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 from database import get_session
-from models import Payment, PaymentCreate, PaymentUpdate, PaymentRead, Order, User, PaymentStatus, PaymentMode, Client, Settings, OrderStatus
+from models import Payment, PaymentCreate, PaymentUpdate, PaymentRead, Order, OrderRead, User, PaymentStatus, PaymentMode, Client, Settings, OrderStatus
 from utils.auth import get_current_user
+from utils.idempotency import run_idempotent
 from sqlalchemy.orm import joinedload
-from services.payment_receipt_generator import payment_receipt_generator
+from sqlalchemy.orm.exc import StaleDataError
+from utils.concurrency import check_version, version_conflict
+from routers.orders import order_conflict
+from services.events import event_broker
+import logging
 import os
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/payments", tags=["Payments"])
 
-@router.get("/", response_model=List[PaymentRead], response_model_by_alias=True)
+def _enum_value(value):
+    """Return the plain string for an enum column value."""
+    return value.value if hasattr(value, 'value') else value
+
+def fetch_payment_list(
+    session: Session,
+    skip: int = 0,
+    limit: Optional[int] = 100,
+    order_id: UUID = None,
+    ids: List[UUID] = None,
+    client_id: UUID = None,
+    date_from: datetime = None,
+    date_to: datetime = None
+) -> List[dict]:
+    """Build the payments list response straight from row tuples.
+
+    Produces the same JSON shape as ``PaymentRead`` (serialized by alias) without
+    loading ORM objects or constructing a Pydantic model per row. ``limit=None``
+    returns every row; ``ids`` keeps only those payments (used by ``GET /sync``
+    for one page of changes). ``client_id`` and the inclusive
+    ``payment_date`` range ``date_from``..``date_to`` are served by
+    ``ix_payments_client_id_payment_date``.
+    """
+    statement = (
+        select(
+            Payment.id,
+            Payment.amount,
+            Payment.mode,
+            Payment.status,
+            Payment.payment_date,
+            Payment.created_at,
+            Payment.client_id,
+            Payment.order_id,
+            Payment.reference_number,
+            Payment.version,
+            Client.id,
+            Client.name,
+            Client.type,
+            Client.contact,
+            Client.address,
+        )
+        .outerjoin(Client, Payment.client_id == Client.id)
+    )
+    if order_id is not None:
+        statement = statement.where(Payment.order_id == order_id)
+    if ids is not None:
+        statement = statement.where(Payment.id.in_(ids))
+    if client_id is not None:
+        statement = statement.where(Payment.client_id == client_id)
+    if date_from is not None:
+        statement = statement.where(Payment.payment_date >= date_from)
+    if date_to is not None:
+        statement = statement.where(Payment.payment_date <= date_to)
+
+    # Apply sorting and pagination
+    statement = statement.order_by(Payment.payment_date.asc()).offset(skip).limit(limit)
+
+    payments = []
+    for row in session.exec(statement).all():
+        payments.append({
+            "id": row[0],
+            "amount": row[1],
+            "mode": _enum_value(row[2]),
+            "status": _enum_value(row[3]),
+            "payment_date": row[4],
+            "created_at": row[5],
+            "client_id": row[6],
+            "order_id": row[7],
+            "reference_number": row[8],
+            "client": {
+                "id": row[10],
+                "name": row[11],
+                "type": _enum_value(row[12]),
+                "contact": row[13],
+                "address": row[14],
+            } if row[10] is not None else None,
+            "version": row[9],
+        })
+    return payments
+
+def payment_to_read(session: Session, payment: Payment) -> PaymentRead:
+    """Build the PaymentRead response for a payment, including its client."""
+    client = session.get(Client, payment.client_id) if payment.client_id else None
+    client_info = None
+    if client:
+        client_info = {
+            "id": client.id,
+            "name": client.name,
+            "type": _enum_value(client.type),
+            "contact": client.contact,
+            "address": client.address
+        }
+    return PaymentRead(
+        id=payment.id,
+        amount=payment.amount,
+        method=_enum_value(payment.mode),
+        status=_enum_value(payment.status),
+        paymentDate=payment.payment_date,
+        createdAt=payment.created_at,
+        leaderId=payment.client_id,
+        orderId=payment.order_id,
+        referenceNumber=payment.reference_number,
+        client=client_info,
+        version=payment.version
+    )
+
+def payment_conflict(session: Session, payment_id) -> HTTPException:
+    """Roll back a write that lost a version race and describe the current payment."""
+    session.rollback()
+    current = session.exec(select(Payment).where(Payment.id == payment_id)).first()
+    if not current:
+        return HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Payment not found with ID: {payment_id}"
+        )
+    return version_conflict(payment_to_read(session, current))
+
+@router.get("/", response_model=List[PaymentRead], response_model_by_alias=True, response_class=ORJSONResponse)
 def get_payments(
     skip: int = 0,
     limit: int = 100,
@@ -21,82 +145,36 @@ def get_payments(
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    """Get all payments, optionally filtered by order ID."""
+    """Get all payments, optionally filtered by order ID.
+
+    Rows are shaped into plain dicts and serialized with orjson, skipping the
+    per-row model construction and the ``response_model`` re-validation.
+    """
     try:
-        print(f"\n[Payments API] GET /payments/ called with orderId={orderId}, skip={skip}, limit={limit}")
-        
-        # Build base query
-        statement = (
-            select(Payment, Client)
-            .outerjoin(Client, Payment.client_id == Client.id)
-        )
+        logger.debug("Fetching payments: orderId=%s skip=%s limit=%s", orderId, skip, limit)
 
         # Filter by order_id if provided
+        order_uuid = None
         if orderId:
             try:
                 order_uuid = UUID(orderId)
-                statement = statement.where(Payment.order_id == order_uuid)
-                print(f"[Payments API] Filtering payments by order_id: {order_uuid}")
             except ValueError:
-                print(f"[Payments API] ERROR: Invalid orderId format: {orderId}")
+                logger.info("Invalid orderId format: %s", orderId)
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail=f"Invalid order ID format: {orderId}"
                 )
 
-        # Apply sorting and pagination
-        statement = statement.order_by(Payment.payment_date.asc()).offset(skip).limit(limit)
-
-        results = session.exec(statement).all()
-        payments = []
-
-        print(f"[Payments API] Found {len(results)} payment records from database")
+        payments = fetch_payment_list(session, skip=skip, limit=limit, order_id=order_uuid)
 
-        for payment, client in results:
-            # Build client info object
-            client_info = None
-            if client:
-                client_info = {
-                    "id": client.id,
-                    "name": client.name,
-                    "type": client.type.value if hasattr(client.type, 'value') else str(client.type),
-                    "contact": client.contact,
-                    "address": client.address
-                }
-            
-            # Create PaymentRead object with proper field mapping
-            # The PaymentRead model will handle alias mapping automatically
-            payment_read = PaymentRead(
-                id=payment.id,
-                amount=payment.amount,
-                method=payment.mode.value if hasattr(payment.mode, 'value') else str(payment.mode),
-                status=payment.status.value if hasattr(payment.status, 'value') else str(payment.status),
-                paymentDate=payment.payment_date,
-                createdAt=payment.created_at,
-                leaderId=payment.client_id,
-                orderId=payment.order_id,
-                referenceNumber=payment.reference_number,
-                client=client_info
-            )
-            payments.append(payment_read)
-
-        print(f"[Payments API] ✓ Returning {len(payments)} payments" + (f" for order {orderId}" if orderId else ""))
-        
-        if len(payments) > 0:
-            # Log first payment for debugging - this will show the Python object
-            print(f"[Payments API] First payment ID: {payments[0].id}, Amount: {payments[0].amount}")
-            # Log the serialized version to verify camelCase
-            sample_dict = payments[0].model_dump(by_alias=True)
-            print(f"[Payments API] Sample serialized payment (camelCase): {list(sample_dict.keys())}")
+        logger.debug("Returning %d payments", len(payments))
         
-        return payments
+        return ORJSONResponse(content=payments)
 
     except HTTPException:
         raise
     except Exception as e:
-        print(f"[Payments API] ERROR: Failed to fetch payments: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Failed to fetch payments")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to fetch payments: {str(e)}"
@@ -139,14 +217,15 @@ def get_payment(payment_id: str, session: Session = Depends(get_session), curren
             leaderId=payment.client_id,
             orderId=payment.order_id,
             referenceNumber=payment.reference_number,
-            client=client_info
+            client=client_info,
+            version=payment.version
         )
         
         return payment_read
     except HTTPException:
         raise
     except Exception as e:
-        print(f"[Payments API] ERROR: Failed to fetch payment: {str(e)}")
+        logger.exception("Failed to fetch payment %s", payment_id)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to fetch payment: {str(e)}"
@@ -155,12 +234,33 @@ def get_payment(payment_id: str, session: Session = Depends(get_session), curren
 @router.post("/", response_model=PaymentRead, status_code=status.HTTP_201_CREATED, response_model_by_alias=True)
 def create_payment(
     payment_data: PaymentCreate,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    """Record a new payment with validation to prevent overpayment."""
+    """
+    Record a new payment with validation to prevent overpayment.
+
+    Retries sent with the same Idempotency-Key header replay the original
+    response instead of recording the payment again.
+    """
+    return run_idempotent(
+        idempotency_key,
+        current_user,
+        "POST /payments",
+        payment_data,
+        lambda: _create_payment(payment_data, session),
+        session,
+        status_code=status.HTTP_201_CREATED
+    )
+
+def _create_payment(payment_data: PaymentCreate, session: Session) -> PaymentRead:
+    """Create the payment and apply it to the linked order."""
     try:
-        print(f"Creating payment with data: {payment_data.dict()}")
+        logger.debug(
+            "Creating payment: client=%s order=%s amount=%s method=%s",
+            payment_data.leaderId, payment_data.orderId, payment_data.amount, payment_data.method
+        )
 
         # Validate payment amount is positive
         if payment_data.amount <= 0:
@@ -174,14 +274,11 @@ def create_payment(
         client = session.exec(client_statement).first()
 
         if not client:
-            print(f"Client not found with ID: {payment_data.leaderId}")
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Leader/Client not found with ID: {payment_data.leaderId}"
             )
 
-        print(f"Found client: {client.name}")
-
         # Validate against order balance BEFORE creating payment
         order = None
         if payment_data.orderId:
@@ -210,7 +307,6 @@ def create_payment(
         }
 
         mode = method_mapping.get(method_str, PaymentMode.CASH)
-        print(f"Mapped payment method {payment_data.method} to {mode}")
 
         # Parse payment date with fallback
         try:
@@ -220,11 +316,9 @@ def create_payment(
                 else datetime.utcnow()
             )
         except (ValueError, AttributeError) as e:
-            print(f"Date parsing error: {e}, using current time")
+            logger.info("Unparseable payment date %r, using current time: %s", payment_data.paymentDate, e)
             payment_date = datetime.utcnow()
 
-        print(f"Using payment date: {payment_date}")
-
         # Create payment object with order_id if linked
         db_payment = Payment(
             amount=float(payment_data.amount),
@@ -236,7 +330,6 @@ def create_payment(
             order_id=payment_data.orderId  # Link payment to order
         )
 
-        print("Adding payment to session")
         session.add(db_payment)
 
         # Update Order if linked
@@ -257,10 +350,12 @@ def create_payment(
 
             session.add(order)
 
-        print("Committing transaction")
-        session.commit()
+        try:
+            session.commit()
+        except StaleDataError:
+            # Another write changed the order's totals since we read them
+            raise order_conflict(session, payment_data.orderId)
 
-        print("Refreshing payment object")
         session.refresh(db_payment)
 
         if order:
@@ -286,17 +381,22 @@ def create_payment(
             leaderId=db_payment.client_id,
             orderId=db_payment.order_id,
             referenceNumber=db_payment.reference_number,
-            client=client_info
+            client=client_info,
+            version=db_payment.version
         )
 
-        print(f"Payment created successfully with ID: {db_payment.id}")
+        logger.info(
+            "Payment created", extra={"payment_id": db_payment.id, "order_id": db_payment.order_id, "amount": db_payment.amount}
+        )
+        event_broker.publish("payment.created", db_payment.id, payment_read)
+        if order:
+            event_broker.publish("order.updated", order.id, OrderRead.model_validate(order))
         return payment_read
 
-    except HTTPException as he:
-        print(f"HTTP Exception in payment creation: {str(he)}")
+    except HTTPException:
         raise
     except Exception as e:
-        print(f"Error in payment creation: {str(e)}")
+        logger.exception("Error in payment creation")
         session.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -321,9 +421,8 @@ def update_payment(
     - Ensures data consistency with transaction handling
     """
     try:
-        print(f"\n[Update Payment] Starting update for payment_id: {payment_id}")
-        print(f"[Update Payment] Update data: {payment_data.dict(exclude_none=True)}")
-        
+        logger.debug("Updating payment %s: fields=%s", payment_id, sorted(payment_data.model_fields_set))
+
         # Fetch the existing payment
         statement = select(Payment).where(Payment.id == payment_id)
         payment = session.exec(statement).first()
@@ -334,7 +433,7 @@ def update_payment(
                 detail=f"Payment not found with ID: {payment_id}"
             )
         
-        print(f"[Update Payment] Found payment: amount={payment.amount}, order_id={payment.order_id}")
+        check_version(payment_data.version, payment, lambda p: payment_to_read(session, p))
         
         # Store old amount for order recalculation
         old_amount = float(payment.amount)
@@ -350,8 +449,6 @@ def update_payment(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail=f"Associated order not found with ID: {payment.order_id}"
                 )
-            
-            print(f"[Update Payment] Found order: {order.order_number}, total={order.total_amount}, paid={order.paid_amount}, balance={order.balance}")
         
         # Update payment fields if provided
         if payment_data.amount is not None:
@@ -370,9 +467,6 @@ def update_payment(
                 amount_difference = new_amount - old_amount
                 new_total_paid = order.paid_amount + amount_difference
                 
-                print(f"[Update Payment] Validation: old_amount={old_amount}, new_amount={new_amount}, difference={amount_difference}")
-                print(f"[Update Payment] Validation: current_paid={order.paid_amount}, new_total_paid={new_total_paid}, order_total={order.total_amount}")
-                
                 # Prevent overpayment
                 if new_total_paid > order.total_amount:
                     raise HTTPException(
@@ -381,7 +475,6 @@ def update_payment(
                     )
             
             payment.amount = new_amount
-            print(f"[Update Payment] Updated amount from {old_amount} to {new_amount}")
         
         if payment_data.method is not None:
             # Handle payment method mapping
@@ -395,20 +488,17 @@ def update_payment(
             
             mode = method_mapping.get(method_str, PaymentMode.CASH)
             payment.mode = mode
-            print(f"[Update Payment] Updated method to {mode}")
         
         if payment_data.paymentDate is not None:
             # Parse payment date
             try:
                 payment_date = datetime.fromisoformat(payment_data.paymentDate.split('T')[0])
                 payment.payment_date = payment_date
-                print(f"[Update Payment] Updated payment date to {payment_date}")
             except (ValueError, AttributeError) as e:
-                print(f"[Update Payment] Date parsing error: {e}, keeping original date")
+                logger.info("Unparseable payment date %r, keeping original date: %s", payment_data.paymentDate, e)
         
         if payment_data.referenceNumber is not None:
             payment.reference_number = payment_data.referenceNumber
-            print(f"[Update Payment] Updated reference number to {payment_data.referenceNumber}")
         
         # Update order totals if payment is linked to an order and amount changed
         if order and payment_data.amount is not None:
@@ -418,30 +508,31 @@ def update_payment(
             order.paid_amount += amount_difference
             order.balance = order.total_amount - order.paid_amount
             
-            print(f"[Update Payment] Updated order totals: paid_amount={order.paid_amount}, balance={order.balance}")
-            
             # Update order status based on new payment totals
             if order.balance <= 0:
                 order.status = OrderStatus.PAID
-                print(f"[Update Payment] Order status updated to PAID")
             elif order.paid_amount > 0:
                 order.status = OrderStatus.PARTIALLY_PAID
-                print(f"[Update Payment] Order status updated to PARTIALLY_PAID")
             else:
                 order.status = OrderStatus.PENDING
-                print(f"[Update Payment] Order status updated to PENDING")
             
             session.add(order)
         
         # Save payment changes
         session.add(payment)
-        session.commit()
+        try:
+            session.commit()
+        except StaleDataError:
+            raise payment_conflict(session, payment_id)
         session.refresh(payment)
         
         if order:
             session.refresh(order)
         
-        print(f"[Update Payment] ✓ Payment updated successfully")
+        logger.info(
+            "Payment updated",
+            extra={"payment_id": payment.id, "order_id": payment.order_id, "amount": payment.amount, "previous_amount": old_amount}
+        )
         
         # Fetch client info for response
         client_statement = select(Client).where(Client.id == payment.client_id)
@@ -468,9 +559,13 @@ def update_payment(
             leaderId=payment.client_id,
             orderId=payment.order_id,
             referenceNumber=payment.reference_number,
-            client=client_info
+            client=client_info,
+            version=payment.version
         )
         
+        event_broker.publish("payment.updated", payment.id, payment_read)
+        if order:
+            event_broker.publish("order.updated", order.id, OrderRead.model_validate(order))
         return payment_read
         
     except HTTPException:
@@ -478,9 +573,7 @@ def update_payment(
         raise
     except Exception as e:
         session.rollback()
-        print(f"[Update Payment] ERROR: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Failed to update payment %s", payment_id)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to update payment: {str(e)}"
@@ -503,8 +596,6 @@ def delete_payment(
     - Restricted to admin users only
     """
     try:
-        print(f"\n[Delete Payment] Starting deletion for payment_id: {payment_id}")
-        
         # Check admin permission
         if current_user.role != "admin":
             raise HTTPException(
@@ -522,8 +613,6 @@ def delete_payment(
                 detail=f"Payment not found with ID: {payment_id}"
             )
         
-        print(f"[Delete Payment] Found payment: amount={payment.amount}, order_id={payment.order_id}")
-        
         # Get the associated order if payment is linked to one
         order = None
         if payment.order_id:
@@ -531,8 +620,6 @@ def delete_payment(
             order = session.exec(order_statement).first()
             
             if order:
-                print(f"[Delete Payment] Found order: {order.order_number}, total={order.total_amount}, paid={order.paid_amount}, balance={order.balance}")
-                
                 # Subtract payment amount from order's paid amount
                 order.paid_amount -= payment.amount
                 
@@ -543,32 +630,32 @@ def delete_payment(
                 # Recalculate balance
                 order.balance = order.total_amount - order.paid_amount
                 
-                print(f"[Delete Payment] Updated order totals: paid_amount={order.paid_amount}, balance={order.balance}")
-                
                 # Update order status based on new payment totals
                 if order.paid_amount == 0:
                     order.status = OrderStatus.PENDING
-                    print(f"[Delete Payment] Order status updated to PENDING (no payments)")
                 elif order.balance <= 0:
                     order.status = OrderStatus.PAID
-                    print(f"[Delete Payment] Order status updated to PAID")
                 elif order.paid_amount > 0:
                     order.status = OrderStatus.PARTIALLY_PAID
-                    print(f"[Delete Payment] Order status updated to PARTIALLY_PAID")
                 
                 session.add(order)
             else:
-                print(f"[Delete Payment] WARNING: Associated order not found with ID: {payment.order_id}")
+                logger.warning("Order %s of payment %s not found", payment.order_id, payment_id)
         
         # Delete the payment
         session.delete(payment)
-        session.commit()
+        try:
+            session.commit()
+        except StaleDataError:
+            raise payment_conflict(session, payment_id)
         
-        print(f"[Delete Payment] ✓ Payment deleted successfully")
-        print(f"[Delete Payment] Summary: Deleted payment {payment_id} (amount: {payment.amount})")
-        if order:
-            print(f"[Delete Payment] Order {order.order_number} updated: paid={order.paid_amount}, balance={order.balance}, status={order.status.value}")
+        logger.info(
+            "Payment deleted", extra={"payment_id": payment_id, "order_id": payment.order_id, "amount": payment.amount}
+        )
         
+        event_broker.publish("payment.deleted", payment_id)
+        if order:
+            event_broker.publish("order.updated", order.id, OrderRead.model_validate(order))
         return None
         
     except HTTPException:
@@ -576,9 +663,7 @@ def delete_payment(
         raise
     except Exception as e:
         session.rollback()
-        print(f"[Delete Payment] ERROR: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Failed to delete payment %s", payment_id)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to delete payment: {str(e)}"
@@ -683,7 +768,6 @@ def generate_payment_receipt(
                 
 
                 # Fetch payment history for this order
-                print(f"DEBUG: Fetching payment history for order_id: {payment.order_id} (Type: {type(payment.order_id)})")
                 try:
                     # Ensure order_id is UUID for query
                     oid = payment.order_id
@@ -692,9 +776,9 @@ def generate_payment_receipt(
                     
                     history_statement = select(Payment).where(Payment.order_id == oid).order_by(Payment.payment_date)
                     history_results = session.exec(history_statement).all()
-                    print(f"DEBUG: Found {len(history_results)} payments for order {oid}")
+                    logger.debug("Found %d payments for receipt of order %s", len(history_results), oid)
                 except Exception as e:
-                    print(f"ERROR: Failed to fetch payment history: {e}")
+                    logger.exception("Failed to fetch payment history for order %s", payment.order_id)
                     history_results = []
                 
                 payment_history = []
@@ -707,13 +791,10 @@ def generate_payment_receipt(
                         "reference_number": p.reference_number
                     })
 
-        print(f"Generating receipt for payment {payment_id}")
-        print(f"Payment data: {payment_data}")
-        print(f"Client data: {client_data}")
-        print(f"Company settings: {company_settings}")
-        print(f"Order data: {order_data}")
+        logger.debug("Generating receipt for payment %s", payment_id)
 
-        # Generate the PDF receipt
+        # Generate the PDF receipt (reportlab and qrcode load on the first one, not at startup)
+        from services.payment_receipt_generator import payment_receipt_generator
         receipt_path = payment_receipt_generator.generate_receipt(
             order_data=order_data,
             client_data=client_data,
@@ -728,8 +809,6 @@ def generate_payment_receipt(
                 detail="Failed to generate payment receipt PDF"
             )
 
-        print(f"Receipt generated successfully at: {receipt_path}")
-
         # Return the PDF file
         return FileResponse(
             receipt_path,
@@ -740,13 +819,10 @@ def generate_payment_receipt(
             }
         )
 
-    except HTTPException as he:
-        print(f"HTTP Exception in receipt generation: {str(he)}")
+    except HTTPException:
         raise
     except Exception as e:
-        print(f"Error generating payment receipt: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error generating receipt for payment %s", payment_id)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to generate payment receipt: {str(e)}"
@@ -2,7 +2,9 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlmodel import Session, select
 from typing import List
 from database import get_session
-from models import Client as School, ClientCreate as SchoolCreate, ClientRead as SchoolRead, User
+from models import Client as School, ClientCreate as SchoolCreate, ClientUpdate as SchoolUpdate, ClientRead as SchoolRead, User
+from utils.concurrency import check_version, version_conflict
+from sqlalchemy.orm.exc import StaleDataError
 from utils.auth import get_current_user
 
 router = APIRouter(prefix="/schools", tags=["Schools"])
@@ -50,11 +52,11 @@ def create_school(
 @router.put("/{school_id}", response_model=SchoolRead)
 def update_school(
     school_id: str,
-    school_data: SchoolCreate,
+    school_data: SchoolUpdate,
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    """Update a school."""
+    """Update a school; 409 with the current school if ``version`` is stale."""
     statement = select(School).where(School.id == school_id)
     school = session.exec(statement).first()
     
@@ -64,12 +66,19 @@ def update_school(
             detail="School not found"
         )
     
+    check_version(school_data.version, school, SchoolRead.model_validate)
+    
     # Update fields
-    for key, value in school_data.dict().items():
+    for key, value in school_data.dict(exclude={"version"}).items():
         setattr(school, key, value)
     
     session.add(school)
-    session.commit()
+    try:
+        session.commit()
+    except StaleDataError:
+        session.rollback()
+        session.refresh(school)
+        raise version_conflict(SchoolRead.model_validate(school))
     session.refresh(school)
     
     return school
@@ -0,0 +1,58 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from config import get_settings
+from database import get_session
+from models import SheetRow, SheetsOutbox, User
+from services.sheets_sync import SheetsSyncError, sheets_sync_worker
+from utils.auth import get_current_user
+
+settings = get_settings()
+
+router = APIRouter(prefix="/sheets", tags=["Google Sheets"])
+
+
+@router.get("/status")
+def get_sheets_sync_status(
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """Whether the Sheets sync is on, changes waiting in the outbox and rows indexed per tab."""
+    indexed = session.exec(select(SheetRow.sheet, func.count()).group_by(SheetRow.sheet)).all()
+    return {
+        "enabled": settings.sheets_sync_enabled,
+        "pending_changes": session.exec(select(func.count()).select_from(SheetsOutbox)).one(),
+        "indexed_rows": {sheet: count for sheet, count in indexed}
+    }
+
+
+@router.post("/reconcile")
+def reconcile_sheets(
+    sheet: Optional[List[str]] = Query(None),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Bring the spreadsheet in line with the database, rewriting only rows that differ.
+
+    ``sheet`` (repeatable) limits it to some tabs, e.g. ``?sheet=Orders``.
+    """
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can reconcile Google Sheets"
+        )
+    if not settings.sheets_sync_enabled:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Google Sheets sync is disabled"
+        )
+    try:
+        return {"sheets": sheets_sync_worker.reconcile(sheet)}
+    except SheetsSyncError as e:
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"Google Sheets reconciliation failed: {e}"
+        )
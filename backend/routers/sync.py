@@ -0,0 +1,171 @@
+import base64
+import json
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import and_, delete, or_
+from sqlmodel import Session, select
+
+from config import get_settings
+from database import get_session
+from models import Client, DeletedRecord, Order, Payment, User
+from routers.leaders import fetch_leader_list
+from routers.orders import fetch_order_list
+from routers.payments import fetch_payment_list
+from utils.auth import get_current_user
+
+settings = get_settings()
+
+router = APIRouter(prefix="/sync", tags=["Sync"])
+
+# Old tombstones are purged at most this often per process.
+PURGE_INTERVAL = timedelta(hours=1)
+
+_last_purge = datetime.min
+
+
+# Streams paged through by a sync pass, each ordered by (changed at, id)
+SYNC_STREAMS = {
+    "leaders": (Client.updated_at, Client.id),
+    "orders": (Order.updated_at, Order.id),
+    "payments": (Payment.updated_at, Payment.id),
+    "deleted": (DeletedRecord.deleted_at, DeletedRecord.id),
+}
+
+
+def encode_cursor(since: Optional[datetime], started: Optional[datetime], after: Dict[str, tuple]) -> str:
+    """Opaque cursor: the pass's lower bound, when it started (None before it has) and its position per stream."""
+    payload = {
+        "since": since.isoformat() if since else None,
+        "started": started.isoformat() if started else None,
+        "after": {
+            stream: [changed_at.isoformat(), key if isinstance(key, int) else str(key)]
+            for stream, (changed_at, key) in after.items()
+        },
+    }
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], Optional[datetime], Dict[str, tuple]]:
+    """``(since, started, after)`` of a cursor; a bare timestamp (older clients) starts a new pass."""
+    try:
+        try:
+            return datetime.fromisoformat(cursor), None, {}
+        except ValueError:
+            pass
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        since = datetime.fromisoformat(payload["since"]) if payload["since"] else None
+        after = {}
+        for stream, (changed_at, key) in payload["after"].items():
+            if stream not in SYNC_STREAMS:
+                raise ValueError(stream)
+            after[stream] = (datetime.fromisoformat(changed_at), int(key) if stream == "deleted" else UUID(key))
+        started = datetime.fromisoformat(payload["started"]) if payload["started"] else None
+        return since, started, after
+    except (ValueError, KeyError, TypeError, AttributeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid sync cursor"
+        )
+
+
+def _page_keys(session: Session, stream: str, since: Optional[datetime], after: Optional[tuple], limit: int):
+    """Up to ``limit + 1`` ``(changed at, id)`` keys of a stream, after the keyset position ``after``."""
+    changed_at, key = SYNC_STREAMS[stream]
+    statement = select(changed_at, key).order_by(changed_at, key).limit(limit + 1)
+    if since is not None:
+        statement = statement.where(changed_at > since)
+    if after:
+        position, last_key = after
+        statement = statement.where(or_(changed_at > position, and_(changed_at == position, key > last_key)))
+    return session.exec(statement).all()
+
+
+@router.get("", response_class=ORJSONResponse)
+def sync_changes(
+    since: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=5000),
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Return leaders, orders and payments changed since a cursor, one page at a time.
+
+    Without ``since`` (or with a cursor older than the tombstone retention)
+    a full snapshot starts: its first page has ``full: true`` and the client
+    should clear its cache before applying it. Otherwise pages hold only rows
+    created or updated after the cursor plus the ids deleted since then;
+    apply the rows first, then the deletions. Each page has up to ``limit``
+    rows per list, paged by ``(updated_at, id)``. Pass the returned
+    ``cursor`` on the next call; while ``has_more`` is true, call again
+    straight away to catch up. Rows use the same shapes as the list
+    endpoints (leaders without summary statistics). Recent changes may be
+    sent twice, so apply them as upserts.
+    """
+    now = datetime.utcnow()
+    since_at, started, after = decode_cursor(since) if since else (None, None, {})
+    stale = since_at is not None and since_at < now - timedelta(days=settings.sync_tombstone_retention_days)
+    full = (started is None and since_at is None) or stale
+    if stale or started is None:
+        # A new pass; rows changed while it runs are picked up by its keyset
+        # or by the next pass
+        since_at, started, after = None if stale else since_at, now, {}
+
+    _purge_tombstones(session, now)
+
+    keys = {}
+    has_more = False
+    for stream in SYNC_STREAMS:
+        if stream == "deleted" and since_at is None:
+            keys[stream] = []  # A snapshot has nothing to delete
+            continue
+        page = _page_keys(session, stream, since_at, after.get(stream), limit)
+        has_more = has_more or len(page) > limit
+        keys[stream] = page[:limit]
+        if keys[stream]:
+            after[stream] = tuple(keys[stream][-1])
+
+    deleted = {"leaders": [], "orders": [], "payments": []}
+    if keys["deleted"]:
+        for entity, entity_id in session.exec(
+            select(DeletedRecord.entity, DeletedRecord.entity_id)
+            .where(DeletedRecord.id.in_([key for _, key in keys["deleted"]]))
+            .order_by(DeletedRecord.deleted_at, DeletedRecord.id)
+        ).all():
+            deleted.setdefault(entity, []).append(entity_id)
+
+    if has_more:
+        cursor = encode_cursor(since_at, started, after)
+    else:
+        # Caught up: the next pass overlaps this one so rows written by
+        # transactions still open while it ran are picked up
+        cursor = encode_cursor(started - timedelta(seconds=settings.sync_cursor_overlap_seconds), None, {})
+
+    content = {
+        "cursor": cursor,
+        "full": full,
+        "has_more": has_more,
+        "leaders": _ids_page(fetch_leader_list, session, keys["leaders"]),
+        "orders": _ids_page(fetch_order_list, session, keys["orders"], limit=None),
+        "payments": _ids_page(fetch_payment_list, session, keys["payments"], limit=None),
+        "deleted": deleted,
+    }
+    return ORJSONResponse(content=content)
+
+
+def _ids_page(fetch, session: Session, keys, **kwargs) -> List[dict]:
+    return fetch(session, ids=[key for _, key in keys], **kwargs) if keys else []
+
+
+def _purge_tombstones(session: Session, now: datetime):
+    """Delete tombstones past retention, at most once per PURGE_INTERVAL in this process."""
+    global _last_purge
+    if now - _last_purge < PURGE_INTERVAL:
+        return
+    _last_purge = now
+    cutoff = now - timedelta(days=settings.sync_tombstone_retention_days)
+    session.execute(delete(DeletedRecord).where(DeletedRecord.deleted_at < cutoff))
+    session.commit()
@@ -0,0 +1,181 @@
+"""
+Benchmark the orders/payments list serialization paths.
+
+Compares the previous path (ORM objects -> per-row Pydantic models ->
+FastAPI ``response_model`` validation -> JSONResponse) against the current
+fast path (row tuples -> dicts -> ORJSONResponse) for a list of N rows.
+
+Runs against a throwaway SQLite database by default so it never touches the
+configured DATABASE_URL.
+
+Usage:
+    python scripts/bench_list_serialization.py --rows 1000 --repeat 20
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+# Ensure project root (backend/) is on sys.path so imports work when running this script
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--rows", type=int, default=1000, help="Number of orders and payments to list")
+parser.add_argument("--repeat", type=int, default=20, help="Timed iterations per path")
+parser.add_argument("--database-url", default=None, help="Database to seed and query (default: temporary SQLite file)")
+args = parser.parse_args()
+
+if args.database_url:
+    os.environ["DATABASE_URL"] = args.database_url
+else:
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from sqlmodel import Session, SQLModel, select
+
+from database import engine
+from models import (
+    Client, ClientType, Order, OrderItem, OrderItemRead, OrderRead, OrderStatus,
+    Payment, PaymentMode, PaymentRead, PaymentStatus,
+)
+from routers.orders import fetch_order_list
+from routers.payments import fetch_payment_list
+
+engine.echo = False
+
+
+def seed(rows: int):
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        client = Client(name="Bench School", type=ClientType.SCHOOL, contact="0", address="Bench")
+        session.add(client)
+        session.flush()
+        base = datetime(2025, 1, 1)
+        for i in range(rows):
+            order = Order(
+                order_number=f"BENCH-{i:06d}",
+                client_id=client.id,
+                total_amount=1000.0,
+                paid_amount=250.0,
+                balance=750.0,
+                status=OrderStatus.PARTIALLY_PAID,
+                order_date=base + timedelta(hours=i),
+                created_at=base + timedelta(hours=i),
+            )
+            session.add(order)
+            session.flush()
+            session.add(OrderItem(
+                order_id=order.id, item_description="Copy", quantity=10,
+                pages=100, paper="A4", unit_price=100.0, total_price=1000.0,
+            ))
+            session.add(Payment(
+                amount=250.0, mode=PaymentMode.CASH, status=PaymentStatus.COMPLETED,
+                client_id=client.id, order_id=order.id, payment_date=base + timedelta(hours=i),
+            ))
+        session.commit()
+
+
+def legacy_orders(session: Session, limit: int) -> bytes:
+    """The pre-orjson get_orders path, including FastAPI's response_model pass."""
+    orders = session.exec(select(Order).outerjoin(Client).order_by(Order.created_at.desc()).limit(limit)).all()
+    response_orders = []
+    for order in orders:
+        items_read = [
+            OrderItemRead(
+                id=item.id, itemDescription=item.item_description, quantity=item.quantity,
+                pages=item.pages, paper=item.paper, unitPrice=item.unit_price, totalPrice=item.total_price,
+            )
+            for item in order.items
+        ]
+        response_orders.append(OrderRead(
+            id=order.id, orderNumber=order.order_number, leaderId=order.client_id,
+            totalAmount=order.total_amount, paidAmount=order.paid_amount, balance=order.balance,
+            status=order.status.value if isinstance(order.status, OrderStatus) else str(order.status),
+            orderDate=order.order_date, createdAt=order.created_at,
+            leaderName=order.client.name if order.client else None,
+            details=order.details, orderCategory=order.order_category,
+            pages=order.pages, paper=order.paper, items=items_read,
+        ))
+    content = asyncio.run(serialize_response(field=ORDER_FIELD, response_content=response_orders, is_coroutine=False))
+    return JSONResponse(content).body
+
+
+def legacy_payments(session: Session, limit: int) -> bytes:
+    """The pre-orjson get_payments path, including FastAPI's response_model pass."""
+    results = session.exec(
+        select(Payment, Client).outerjoin(Client, Payment.client_id == Client.id)
+        .order_by(Payment.payment_date.asc()).limit(limit)
+    ).all()
+    payments = []
+    for payment, client in results:
+        client_info = None
+        if client:
+            client_info = {
+                "id": client.id, "name": client.name, "type": client.type.value,
+                "contact": client.contact, "address": client.address,
+            }
+        payments.append(PaymentRead(
+            id=payment.id, amount=payment.amount, method=payment.mode.value, status=payment.status.value,
+            paymentDate=payment.payment_date, createdAt=payment.created_at, leaderId=payment.client_id,
+            orderId=payment.order_id, referenceNumber=payment.reference_number, client=client_info,
+        ))
+    content = asyncio.run(serialize_response(field=PAYMENT_FIELD, response_content=payments, is_coroutine=False))
+    return JSONResponse(content).body
+
+
+def fast_orders(session: Session, limit: int) -> bytes:
+    return ORJSONResponse(fetch_order_list(session, limit=limit)).body
+
+
+def fast_payments(session: Session, limit: int) -> bytes:
+    return ORJSONResponse(fetch_payment_list(session, limit=limit)).body
+
+
+ORDER_FIELD = create_response_field(name="Response_get_orders", type_=List[OrderRead])
+PAYMENT_FIELD = create_response_field(name="Response_get_payments", type_=List[PaymentRead])
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[max(0, int(len(ordered) * pct) - 1)]
+
+
+def measure(fn, rows: int, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        # Fresh session per iteration, as each request gets its own
+        with Session(engine) as session:
+            start = time.perf_counter()
+            body = fn(session, rows)
+            timings.append((time.perf_counter() - start) * 1000)
+    return timings, body
+
+
+def main():
+    if not args.database_url:
+        seed(args.rows)
+
+    print(f"Listing {args.rows} rows, {args.repeat} iterations each\n")
+    print(f"{'path':<20}{'median ms':>12}{'p95 ms':>12}{'speedup':>10}")
+    for name, legacy, fast in (("orders", legacy_orders, fast_orders), ("payments", legacy_payments, fast_payments)):
+        legacy_times, legacy_body = measure(legacy, args.rows, args.repeat)
+        fast_times, fast_body = measure(fast, args.rows, args.repeat)
+        legacy_median = statistics.median(legacy_times)
+        fast_median = statistics.median(fast_times)
+        print(f"{name + ' (legacy)':<20}{legacy_median:>12.2f}{percentile(legacy_times, 0.95):>12.2f}{'':>10}")
+        print(f"{name + ' (fast)':<20}{fast_median:>12.2f}{percentile(fast_times, 0.95):>12.2f}{legacy_median / fast_median:>9.1f}x")
+        if len(legacy_body) and len(fast_body) and abs(len(legacy_body) - len(fast_body)) > len(legacy_body) * 0.01:
+            print(f"  warning: response sizes differ ({len(legacy_body)} vs {len(fast_body)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+"""
+Load test the API with scenarios modelled on real use.
+
+Scenarios (run one after another, each with --users concurrent users for
+--duration seconds after a --warmup that is not measured):
+
+    login          login storm: everyone signs in at once, repeatedly
+    orders         order entry: create an order with 1-4 items, open it
+    payments       payment posting rush: post payments against open orders
+    dashboard      dashboard refresh: stats, leaders, recent orders and payments together
+    invoices       invoice downloads: render and fetch order invoice PDFs
+
+By default a local uvicorn is started on a temporary SQLite database
+seeded with scripts/seed_data.py (--seed-orders orders). Pass
+--database-url to run it on another database (e.g. a local PostgreSQL
+seeded beforehand), or --base-url to target a server that is already
+running. The report is JSON, with requests per second and p50/p95/p99
+latency per endpoint; save it with --output and pass it to --compare on
+a later run to see the change between commits.
+
+Usage:
+    python scripts/load_test.py --users 20 --duration 30 --output before.json
+    python scripts/load_test.py --users 20 --duration 30 --compare before.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = ["login", "orders", "payments", "dashboard", "invoices"]
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--scenario", action="append", choices=SCENARIOS, help="Scenario to run (repeatable; default all)")
+parser.add_argument("--users", type=int, default=10, help="Concurrent virtual users")
+parser.add_argument("--duration", type=float, default=20, help="Measured seconds per scenario")
+parser.add_argument("--warmup", type=float, default=2, help="Unmeasured seconds before each scenario")
+parser.add_argument("--think-ms", type=float, default=0, help="Pause between a user's iterations")
+parser.add_argument("--base-url", default=None, help="Server to test instead of starting one")
+parser.add_argument("--database-url", default=None, help="Database for the local server (default: temporary SQLite)")
+parser.add_argument("--workers", type=int, default=1, help="Uvicorn workers for the local server")
+parser.add_argument("--seed-orders", type=int, default=5000, help="Orders generated into the temporary SQLite database")
+parser.add_argument("--username", default="admin")
+parser.add_argument("--password", default="admin123")
+parser.add_argument("--output", default=None, help="Write the JSON report here instead of stdout")
+parser.add_argument("--compare", default=None, help="Earlier JSON report to compare against")
+parser.add_argument("--seed", type=int, default=1, help="Random seed for the users' choices")
+args = parser.parse_args()
+
+
+def percentile(ordered: List[float], p: float) -> float:
+    """Nearest-rank percentile of a sorted list."""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(p / 100 * len(ordered)) - 1))]
+
+
+class Recorder:
+    """Latency and status of every measured request, by endpoint."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+        self.measuring = False
+
+    def record(self, endpoint: str, seconds: float, status: str):
+        if self.measuring:
+            self.latencies[endpoint].append(seconds)
+            self.statuses[endpoint][status] += 1
+
+    def report(self, elapsed: float) -> Dict:
+        endpoints = {}
+        for endpoint, latencies in sorted(self.latencies.items()):
+            ordered = sorted(latencies)
+            statuses = self.statuses[endpoint]
+            errors = sum(n for status, n in statuses.items() if not status.startswith(("2", "3")))
+            endpoints[endpoint] = {
+                "requests": len(ordered),
+                "errors": errors,
+                "rps": round(len(ordered) / elapsed, 2),
+                "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2),
+                "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+                "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+                "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+                "max_ms": round(ordered[-1] * 1000, 2),
+                "statuses": dict(sorted(statuses.items())),
+            }
+        total = sum(e["requests"] for e in endpoints.values())
+        return {
+            "duration_s": round(elapsed, 2),
+            "requests": total,
+            "errors": sum(e["errors"] for e in endpoints.values()),
+            "rps": round(total / elapsed, 2),
+            "endpoints": endpoints,
+        }
+
+
+class LoadTest:
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self.rng = random.Random(args.seed)
+        self.recorder = Recorder()
+        self.client: Optional[httpx.AsyncClient] = None
+        self.headers: Dict[str, str] = {}
+        self.client_ids: List[str] = []
+        self.open_orders: Dict[str, Tuple[str, float]] = {}  # order id -> (client id, balance)
+        self.order_ids: List[str] = []
+
+    async def request(self, endpoint: str, method: str, path: str, **kwargs) -> Optional[httpx.Response]:
+        """Send one request and record it under ``endpoint`` (method and route template)."""
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, path, **kwargs)
+            status = str(response.status_code)
+        except httpx.HTTPError as e:
+            response, status = None, type(e).__name__
+        self.recorder.record(endpoint, time.perf_counter() - started, status)
+        return response
+
+    async def setup(self):
+        response = await self.client.post("/api/v1/auth/login", data={"username": args.username, "password": args.password})
+        response.raise_for_status()
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        self.client.headers.update(self.headers)
+
+        leaders = (await self.client.get("/api/v1/leaders/")).json()
+        self.client_ids = [leader["id"] for leader in leaders]
+        if not self.client_ids:
+            sys.exit("No clients to order for; seed the database first (scripts/seed_data.py).")
+        orders = (await self.client.get("/api/v1/orders/", params={"limit": 2000})).json()
+        self.order_ids = [order["id"] for order in orders]
+        self.open_orders = {order["id"]: (order["client_id"], order["balance"]) for order in orders if order["balance"] > 1}
+
+    # Scenarios: one iteration of a virtual user
+
+    async def login(self):
+        await self.request("POST /api/v1/auth/login", "POST", "/api/v1/auth/login",
+                           data={"username": args.username, "password": args.password})
+
+    async def orders(self):
+        items = []
+        for _ in range(self.rng.randint(1, 4)):
+            quantity = self.rng.randint(10, 500)
+            unit_price = round(self.rng.uniform(10, 120), 2)
+            items.append({
+                "itemDescription": f"Notebook Class {self.rng.randint(1, 10)}",
+                "quantity": quantity,
+                "pages": self.rng.choice([60, 80, 100, 120, 200]),
+                "paper": self.rng.choice(["60 gsm", "70 gsm", "80 gsm"]),
+                "unitPrice": unit_price,
+                "totalPrice": round(quantity * unit_price, 2),
+            })
+        response = await self.request("POST /api/v1/orders/", "POST", "/api/v1/orders/", json={
+            "leaderId": self.rng.choice(self.client_ids),
+            "items": items,
+            "totalAmount": round(sum(item["totalPrice"] for item in items), 2),
+        })
+        if response is not None and response.status_code == 201:
+            order = response.json()
+            self.order_ids.append(order["id"])
+            self.open_orders[order["id"]] = (order["client_id"], order["total_amount"])
+            await self.request("GET /api/v1/orders/{order_id}", "GET", f"/api/v1/orders/{order['id']}")
+
+    async def payments(self):
+        if not self.open_orders:
+            return
+        order_id = self.rng.choice(list(self.open_orders))
+        client_id, balance = self.open_orders.pop(order_id)
+        amount = round(min(balance, self.rng.uniform(0.2, 0.6) * balance), 2)
+        response = await self.request("POST /api/v1/payments/", "POST", "/api/v1/payments/", json={
+            "amount": amount,
+            "method": self.rng.choice(["Cash", "UPI", "Bank Transfer", "Cheque"]),
+            "leaderId": client_id,
+            "orderId": order_id,
+        }, headers={"Idempotency-Key": uuid.uuid4().hex})
+        if response is not None and response.status_code == 201 and balance - amount > 1:
+            self.open_orders[order_id] = (client_id, round(balance - amount, 2))
+
+    async def dashboard(self):
+        await asyncio.gather(
+            self.request("GET /api/v1/dashboard/stats", "GET", "/api/v1/dashboard/stats"),
+            self.request("GET /api/v1/leaders/", "GET", "/api/v1/leaders/"),
+            self.request("GET /api/v1/orders/", "GET", "/api/v1/orders/", params={"limit": 50}),
+            self.request("GET /api/v1/payments/", "GET", "/api/v1/payments/", params={"limit": 50}),
+        )
+
+    async def invoices(self):
+        if self.order_ids:
+            order_id = self.rng.choice(self.order_ids)
+            await self.request("POST /api/v1/orders/{order_id}/invoice", "POST", f"/api/v1/orders/{order_id}/invoice")
+
+    async def run_scenario(self, name: str) -> Dict:
+        iteration = getattr(self, name)
+        deadline = time.perf_counter() + args.warmup + args.duration
+
+        async def user():
+            while time.perf_counter() < deadline:
+                await iteration()
+                if args.think_ms:
+                    await asyncio.sleep(args.think_ms / 1000)
+
+        self.recorder = Recorder()
+        users = [asyncio.create_task(user()) for _ in range(args.users)]
+        await asyncio.sleep(args.warmup)
+        self.recorder.measuring = True
+        started = time.perf_counter()
+        await asyncio.sleep(max(0.0, deadline - started))
+        self.recorder.measuring = False
+        elapsed = time.perf_counter() - started
+        await asyncio.gather(*users)
+        return self.recorder.report(elapsed)
+
+    async def run(self) -> Dict:
+        limits = httpx.Limits(max_connections=args.users * 4, max_keepalive_connections=args.users * 4)
+        async with httpx.AsyncClient(base_url=self.base_url, limits=limits, timeout=60) as self.client:
+            await self.setup()
+            results = {}
+            for name in args.scenario or SCENARIOS:
+                print(f"Running {name} ({args.users} users, {args.duration:g}s)...", file=sys.stderr)
+                results[name] = await self.run_scenario(name)
+            return results
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workdir: str, database_url: str) -> Tuple[subprocess.Popen, str]:
+    """A uvicorn on a free port, run outside backend/ so its .env is not read; output goes to server.log."""
+    port = free_port()
+    env = dict(
+        os.environ,
+        DATABASE_URL=database_url,
+        AUTO_CREATE_TABLES="true",
+        INVOICE_DIR=os.path.join(workdir, "invoices"),
+        LOG_LEVEL="WARNING",
+        PYTHONPATH=ROOT,
+    )
+    log = open(os.path.join(workdir, "server.log"), "w")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", ROOT, "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(args.workers), "--no-access-log"],
+        cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(300):
+        if server.poll() is not None:
+            sys.exit(f"The server exited during startup; see {log.name}")
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1).status_code == 200:
+                return server, base_url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    server.terminate()
+    sys.exit(f"The server did not start within 30 seconds; see {log.name}")
+
+
+def seed_database(database_url: str):
+    sizes = []
+    if args.seed_orders:
+        sizes = ["--clients", str(max(10, args.seed_orders // 100)), "--orders", str(args.seed_orders),
+                 "--payments", str(args.seed_orders * 2), "--expenses", str(max(10, args.seed_orders // 25))]
+    subprocess.run(
+        [sys.executable, os.path.join(ROOT, "scripts", "seed_data.py"), "--database-url", database_url, *sizes],
+        check=True, stdout=subprocess.DEVNULL,
+    )
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report: Dict, baseline: Dict):
+    """Requests per second and p95 of each endpoint against the baseline, on stderr."""
+    print(f"\nCompared with {baseline['meta'].get('commit')} ({baseline['meta'].get('started_at')}):", file=sys.stderr)
+    for scenario, result in report["scenarios"].items():
+        before = baseline["scenarios"].get(scenario, {}).get("endpoints", {})
+        for endpoint, now in result["endpoints"].items():
+            old = before.get(endpoint)
+            if old is None:
+                continue
+            rps = (now["rps"] - old["rps"]) / old["rps"] * 100 if old["rps"] else 0
+            p95 = (now["p95_ms"] - old["p95_ms"]) / old["p95_ms"] * 100 if old["p95_ms"] else 0
+            print(f"  {scenario:<10} {endpoint:<42} rps {now['rps']:>8.1f} ({rps:+.0f}%)  "
+                  f"p95 {now['p95_ms']:>8.1f} ms ({p95:+.0f}%)", file=sys.stderr)
+
+
+def main():
+    server = None
+    workdir = tempfile.mkdtemp(prefix="load-test-")
+    base_url = args.base_url
+    database = "external"
+    try:
+        if base_url is None:
+            database_url = args.database_url or f"sqlite:///{os.path.join(workdir, 'load.db')}"
+            database = database_url.split(":", 1)[0]
+            if args.database_url is None:
+                print(f"Seeding a temporary SQLite database ({args.seed_orders} orders)...", file=sys.stderr)
+                seed_database(database_url)
+            server, base_url = start_server(workdir, database_url)
+
+        started_at = datetime.now(timezone.utc)
+        scenarios = asyncio.run(LoadTest(base_url).run())
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+            print(f"Server log: {os.path.join(workdir, 'server.log')}", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "started_at": started_at.isoformat(timespec="seconds"),
+            "base_url": base_url,
+            "database": database,
+            "workers": args.workers if server is not None else None,
+            "users": args.users,
+            "duration_s": args.duration,
+            "python": platform.python_version(),
+        },
+        "scenarios": scenarios,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
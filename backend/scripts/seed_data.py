@@ -1,15 +1,98 @@
-import sys
+"""
+Seed the database.
+
+Without sizes, adds the admin and test users, a demo client and a demo
+product if they are missing. With sizes, also generates synthetic
+clients, orders with items, payments and expenses for load and
+performance tests:
+
+    python scripts/seed_data.py --database-url sqlite:///perf.db \\
+        --clients 5000 --orders 500000 --payments 1000000 --expenses 20000
+
+Generated data is deterministic: the same --seed, sizes and --end-date
+give the same rows. A few clients place most orders, orders follow the
+school year and weekdays and grow over time, and older orders are more
+likely to be fully paid. Rows are written with COPY on PostgreSQL and
+executemany elsewhere, bypassing ORM events (so nothing is queued for
+Google Sheets), into a database that has no orders yet. Generating data
+needs an explicit --database-url so it never lands in the configured
+database by accident.
+"""
+import argparse
+import csv
+import io
+import math
 import os
-from sqlmodel import Session, select
+import random
+import sys
+import time
+import uuid
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from enum import Enum
+from typing import Dict, List
 
 # Ensure project root (backend/) is on sys.path so imports work when running this script
 ROOT = os.path.dirname(os.path.dirname(__file__))
 if ROOT not in sys.path:
     sys.path.insert(0, ROOT)
 
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--database-url", default=None, help="Database to seed (required when generating data)")
+parser.add_argument("--clients", type=int, default=0, help="Synthetic clients to generate")
+parser.add_argument("--orders", type=int, default=0, help="Synthetic orders to generate, each with 1-8 items")
+parser.add_argument("--payments", type=int, default=0, help="Synthetic payments to generate")
+parser.add_argument("--expenses", type=int, default=0, help="Synthetic expenses to generate")
+parser.add_argument("--unallocated-share", type=float, default=0.08, help="Share of payments not tied to an order")
+parser.add_argument("--days", type=int, default=730, help="Days of history ending at --end-date")
+parser.add_argument("--end-date", type=date.fromisoformat, default=date.today(), help="Last day of history (YYYY-MM-DD)")
+parser.add_argument("--seed", type=int, default=1, help="Random seed")
+args = parser.parse_args()
+
+GENERATE = any((args.clients, args.orders, args.payments, args.expenses))
+if GENERATE and not args.database_url:
+    parser.error("generating data needs an explicit --database-url")
+if args.database_url:
+    os.environ["DATABASE_URL"] = args.database_url
+
+from sqlalchemy import func, select as sa_select, text
+from sqlmodel import Session, SQLModel, select
+
 from database import engine
 from utils.auth import get_password_hash
-from models import User, Client, Product, ClientType
+from models import (
+    Client, ClientType, Expense, ExpenseCategory, IdCounter, Order, OrderItem, OrderStatus,
+    Payment, PaymentMode, PaymentStatus, Product, User,
+)
+from services.order_numbers import ORDER_NUMBER_COUNTER, order_number_allocator
+
+# Rows buffered before they are written
+BATCH_SIZE = 20000
+
+SCHOOL_NAMES = [
+    "Green Valley", "St. Mary's", "Sunrise", "Al-Noor", "City", "Model", "Crescent", "Oxford",
+    "Beacon", "Garrison", "Iqra", "Bright Future", "Scholars", "Allied", "Dar-e-Arqam", "Westminster",
+    "Cambridge", "Roots", "Falcon", "Jinnah", "Quaid", "Fazaia", "Army", "Islamia",
+]
+SCHOOL_KINDS = ["School", "Public School", "Grammar School", "Academy", "High School", "College"]
+DEALER_KINDS = ["Book Depot", "Stationers", "Traders", "Paper House", "Book Centre"]
+CITIES = ["Lahore", "Karachi", "Islamabad", "Rawalpindi", "Faisalabad", "Multan", "Peshawar", "Sialkot", "Gujranwala", "Quetta"]
+
+ITEMS = ["Notebook", "Copy", "Register", "Diary", "Drawing Book", "Exam Sheets", "Practical Copy", "Rough Copy"]
+PAPERS = {"55 gsm": 0.20, "60 gsm": 0.24, "68 gsm": 0.28, "70 gsm": 0.30, "80 gsm": 0.36, "Bleach Card": 0.45}
+PAGES = [40, 60, 80, 100, 120, 160, 200, 240, 300]
+ORDER_CATEGORIES = {"Standard Order": 60, "Bulk Order": 15, "Custom Order": 12, "Bleach Card Umer": 8, "Other Bleach Card": 5}
+PAYMENT_MODES = {PaymentMode.CASH: 35, PaymentMode.UPI: 30, PaymentMode.BANK_TRANSFER: 25, PaymentMode.CHEQUE: 10}
+EXPENSE_CATEGORIES = {
+    ExpenseCategory.PAPER: 25, ExpenseCategory.PRINTING: 20, ExpenseCategory.MATERIAL: 12, ExpenseCategory.DELIVERY: 12,
+    ExpenseCategory.STAFF: 10, ExpenseCategory.UTILITIES: 8, ExpenseCategory.MISC: 5, ExpenseCategory.PAPER_1: 3,
+    ExpenseCategory.PAPER_2: 2, ExpenseCategory.PRINTING_1: 2, ExpenseCategory.PRINTING_2: 1,
+}
+
+# Orders by month: schools stock up before the spring and autumn terms
+MONTH_WEIGHTS = [0.6, 0.9, 1.6, 1.8, 1.0, 0.7, 1.2, 1.5, 1.0, 0.8, 0.7, 0.6]
+# Monday to Sunday
+WEEKDAY_WEIGHTS = [1.0, 1.0, 1.0, 1.0, 0.9, 0.8, 0.2]
 
 
 def seed():
@@ -81,5 +164,295 @@ def seed():
         print("Seeding complete.")
 
 
+def _copy_value(value):
+    if value is None:
+        return None
+    if isinstance(value, Enum):
+        return value.name  # Enum columns store the member name
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    return value
+
+
+class BulkWriter:
+    """
+    Buffers rows per table and writes them in batches: COPY on PostgreSQL,
+    executemany elsewhere. Any flush writes every table, parents first, so
+    as long as each parent row is added before its children, foreign keys
+    always point at rows already written.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.postgres = connection.dialect.name == "postgresql"
+        self.pending: Dict[str, List[dict]] = defaultdict(list)
+        self.written: Dict[str, int] = defaultdict(int)
+
+    def add(self, table, row: dict):
+        rows = self.pending[table.name]
+        rows.append(row)
+        if len(rows) >= BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        for table in SQLModel.metadata.sorted_tables:
+            rows = self.pending.pop(table.name, None)
+            if not rows:
+                continue
+            if self.postgres:
+                self._copy(table, rows)
+            else:
+                self.connection.execute(table.insert(), rows)
+            self.written[table.name] += len(rows)
+
+    def _copy(self, table, rows: List[dict]):
+        columns = list(rows[0])
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([_copy_value(row[column]) for column in columns])
+        buffer.seek(0)
+        cursor = self.connection.connection.cursor()
+        cursor.copy_expert(f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+        cursor.close()
+
+
+class DataGenerator:
+    """Synthetic business history, drawn from one seeded random generator."""
+
+    def __init__(self, writer: BulkWriter):
+        self.writer = writer
+        self.rng = random.Random(args.seed)
+        self.end = datetime.combine(args.end_date, datetime.min.time()) + timedelta(days=1)
+        self.start = self.end - timedelta(days=args.days)
+        # Relative order volume per day: season, weekday and steady growth
+        weights = []
+        for day in range(args.days):
+            when = self.start + timedelta(days=day)
+            growth = 1 + 0.6 * day / max(1, args.days - 1)
+            weights.append(MONTH_WEIGHTS[when.month - 1] * WEEKDAY_WEIGHTS[when.weekday()] * growth)
+        self.day_weights = self._cumulative(weights)
+        self.client_ids: List[uuid.UUID] = []
+        self.client_weights: List[float] = []
+
+    def _cumulative(self, weights: List[float]) -> List[float]:
+        total, cumulative = 0.0, []
+        for weight in weights:
+            total += weight
+            cumulative.append(total)
+        return cumulative
+
+    def _uuid(self) -> uuid.UUID:
+        return uuid.UUID(int=self.rng.getrandbits(128), version=4)
+
+    def _pick(self, options: dict):
+        return self.rng.choices(list(options), weights=list(options.values()))[0]
+
+    def _timestamps(self, count: int) -> List[datetime]:
+        """``count`` business-hour timestamps following the daily volume, in order."""
+        days = self.rng.choices(range(args.days), cum_weights=self.day_weights, k=count)
+        stamps = [
+            self.start + timedelta(days=day, hours=min(19.99, max(8.0, self.rng.triangular(8, 20, 12))))
+            for day in days
+        ]
+        stamps.sort()
+        return stamps
+
+    def clients(self, count: int):
+        for i in range(count):
+            dealer = self.rng.random() < 0.2
+            city = self.rng.choice(CITIES)
+            if dealer:
+                name = f"{self.rng.choice(SCHOOL_NAMES)} {self.rng.choice(DEALER_KINDS)}, {city}"
+            else:
+                name = f"{self.rng.choice(SCHOOL_NAMES)} {self.rng.choice(SCHOOL_KINDS)}, {city}"
+            created = self.start - timedelta(days=self.rng.uniform(0, 365))
+            client_id = self._uuid()
+            self.client_ids.append(client_id)
+            # A long tail: a few clients place most of the orders, dealers more than schools
+            self.client_weights.append((3.0 if dealer else 1.0) / (i + 1) ** 0.9)
+            self.writer.add(Client.__table__, {
+                "id": client_id,
+                "name": f"{name} #{i + 1}",
+                "type": ClientType.DEALER if dealer else ClientType.SCHOOL,
+                "contact": f"03{self.rng.randrange(10 ** 9):09d}",
+                "address": f"{self.rng.randrange(1, 400)} Main Road, {city}",
+                "opening_balance": round(self.rng.lognormvariate(math.log(20000), 1.0), -2) if self.rng.random() < 0.1 else 0.0,
+                "created_at": created,
+                "updated_at": created,
+                "version": 1,
+            })
+        # Ranks are shuffled so the busiest clients are not the first ones created
+        self.rng.shuffle(self.client_weights)
+
+    def orders(self, count: int, payments: int):
+        clients = self.rng.choices(self.client_ids, weights=self.client_weights, k=count)
+        payment_counts = [0] * count
+        for _ in range(payments):
+            payment_counts[self.rng.randrange(count)] += 1
+
+        for i, ordered_at in enumerate(self._timestamps(count)):
+            order_id = self._uuid()
+            total = 0.0
+            items, payment_rows = [], []
+            for _ in range(min(8, 1 + int(self.rng.expovariate(1 / 1.3)))):
+                paper = self._pick(PAPERS)
+                pages = self.rng.choice(PAGES)
+                quantity = max(10, int(self.rng.lognormvariate(math.log(200), 0.9)))
+                unit_price = round(pages * PAPERS[paper] * self.rng.uniform(0.9, 1.15), 2)
+                item = {
+                    "id": self._uuid(),
+                    "order_id": order_id,
+                    "item_description": f"{self.rng.choice(ITEMS)} Class {self.rng.randrange(1, 11)}",
+                    "quantity": quantity,
+                    "pages": pages,
+                    "paper": paper,
+                    "unit_price": unit_price,
+                    "total_price": round(quantity * unit_price, 2),
+                    "created_at": ordered_at,
+                }
+                items.append(item)
+                total += item["total_price"]
+            total = round(total, 2)
+
+            age = (self.end - ordered_at).days
+            paid, updated = 0.0, ordered_at
+            instalments = payment_counts[i]
+            if instalments:
+                full = self.rng.random() < (0.95 if age > 120 else 0.6 if age > 30 else 0.3)
+                paid = total if full else round(total * self.rng.uniform(0.1, 0.9), 2)
+                shares = [self.rng.random() + 0.2 for _ in range(instalments)]
+                amounts = [round(paid * share / sum(shares), 2) for share in shares[:-1]]
+                amounts.append(round(paid - sum(amounts), 2))
+                paid_at = ordered_at
+                for amount in amounts:
+                    paid_at += timedelta(days=self.rng.expovariate(1 / 15))
+                    if paid_at >= self.end:
+                        paid_at = ordered_at + (self.end - ordered_at) * self.rng.random()
+                    payment_rows.append(self._payment(clients[i], order_id, max(amount, 0.01), paid_at))
+                    updated = max(updated, paid_at)
+
+            if paid >= total:
+                status = OrderStatus.PAID
+            elif paid > 0:
+                status = OrderStatus.PARTIALLY_PAID
+            elif age < 7:
+                status = OrderStatus.PENDING
+            elif age < 21:
+                status = OrderStatus.IN_PRODUCTION
+            else:
+                status = OrderStatus.DELIVERED
+            self.writer.add(Order.__table__, {
+                "id": order_id,
+                "order_number": order_number_allocator.format(i + 1, ordered_at),
+                "client_id": clients[i],
+                "total_amount": total,
+                "paid_amount": paid,
+                "balance": round(total - paid, 2),
+                "status": status,
+                "order_date": ordered_at,
+                "created_at": ordered_at,
+                "updated_at": updated,
+                "details": None,
+                "order_category": self._pick(ORDER_CATEGORIES),
+                "pages": items[0]["pages"],
+                "paper": items[0]["paper"],
+                "version": 1,
+            })
+            # After the order: a flush can happen on any add
+            for item in items:
+                self.writer.add(OrderItem.__table__, item)
+            for payment in payment_rows:
+                self.writer.add(Payment.__table__, payment)
+
+    def unallocated_payments(self, count: int):
+        """Payments on account, not tied to any order."""
+        for paid_at in self._timestamps(count):
+            client_id = self.rng.choices(self.client_ids, weights=self.client_weights)[0]
+            self.writer.add(Payment.__table__, self._payment(
+                client_id, None, round(self.rng.lognormvariate(math.log(5000), 1.0), -1) or 10.0, paid_at
+            ))
+
+    def _payment(self, client_id, order_id, amount: float, paid_at: datetime) -> dict:
+        mode = self._pick(PAYMENT_MODES)
+        pending = mode == PaymentMode.CHEQUE and (self.end - paid_at).days < 5
+        return {
+            "id": self._uuid(),
+            "order_id": order_id,
+            "client_id": client_id,
+            "amount": amount,
+            "mode": mode,
+            "status": PaymentStatus.PENDING if pending else PaymentStatus.COMPLETED,
+            "reference_number": None if mode == PaymentMode.CASH else f"{mode.name[:3]}-{self.rng.randrange(10 ** 8):08d}",
+            "payment_date": paid_at,
+            "created_at": paid_at,
+            "updated_at": paid_at,
+            "version": 1,
+        }
+
+    def expenses(self, count: int):
+        for spent_at in self._timestamps(count):
+            category = self._pick(EXPENSE_CATEGORIES)
+            self.writer.add(Expense.__table__, {
+                "id": self._uuid(),
+                "category": category,
+                "amount": round(self.rng.lognormvariate(math.log(8000), 1.1), -1) or 10.0,
+                "description": f"{category.value.replace('_', ' ').title()} expense",
+                "payment_method": self._pick({"Cash": 50, "Bank Transfer": 35, "Cheque": 15}),
+                "reference_number": None,
+                "order_category": self._pick(ORDER_CATEGORIES) if self.rng.random() < 0.4 else None,
+                "expense_date": spent_at,
+                "created_at": spent_at,
+            })
+
+
+def set_order_number_counter(connection, next_value: int):
+    """Continue live order numbers after the generated ones."""
+    if connection.dialect.name == "postgresql":
+        connection.execute(text("SELECT setval('order_number_seq', :value, false)"), {"value": next_value})
+        return
+    counters = IdCounter.__table__
+    updated = connection.execute(
+        counters.update().where(counters.c.name == ORDER_NUMBER_COUNTER).values(next_value=next_value)
+    )
+    if updated.rowcount == 0:
+        connection.execute(counters.insert().values(name=ORDER_NUMBER_COUNTER, next_value=next_value))
+
+
+def generate():
+    if (args.orders or args.payments) and not args.clients:
+        parser.error("orders and payments need --clients")
+    allocated = round(args.payments * (1 - args.unallocated_share)) if args.orders else 0
+
+    started = time.perf_counter()
+    with engine.begin() as connection:
+        existing = connection.execute(sa_select(func.count()).select_from(Order.__table__)).scalar_one()
+        if existing:
+            sys.exit(f"The database already has {existing} orders; generate into an empty one.")
+
+        writer = BulkWriter(connection)
+        generator = DataGenerator(writer)
+        generator.clients(args.clients)
+        if args.orders:
+            generator.orders(args.orders, allocated)
+        generator.unallocated_payments(args.payments - allocated)
+        generator.expenses(args.expenses)
+        writer.flush()
+        if args.orders:
+            set_order_number_counter(connection, args.orders + 1)
+
+    # Fresh planner statistics, as a production database would have
+    with engine.begin() as connection:
+        connection.exec_driver_sql("ANALYZE")
+
+    for table, rows in writer.written.items():
+        print(f"  {table}: {rows} rows")
+    print(f"Generated in {time.perf_counter() - started:.1f}s (seed {args.seed}, up to {args.end_date}).")
+
+
 if __name__ == "__main__":
+    if GENERATE:
+        SQLModel.metadata.create_all(engine)
     seed()
+    if GENERATE:
+        generate()
@@ -0,0 +1,259 @@
+import calendar
+import threading
+import time
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+from sqlmodel import Session, select
+
+from config import get_settings
+from database import engine
+from models import Order, Payment
+from services.events import event_broker
+from services.metrics import cache_lookup
+
+settings = get_settings()
+
+# Payment lag buckets in days; a lag below the first edge means paid before the order date
+LAG_BUCKET_EDGES = np.array([0, 1, 8, 31, 61, 91])
+LAG_BUCKET_LABELS = ["before order", "same day", "1-7 days", "8-30 days", "31-60 days", "61-90 days", "over 90 days"]
+
+LAG_PERCENTILES = [50, 75, 90, 95]
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+NO_DATE = np.iinfo(np.int64).min
+
+
+def _days(values: Iterable[Any], count: int) -> np.ndarray:
+    """Dates or datetimes to int64 days since 1970-01-01 (None becomes NO_DATE)."""
+    # toordinal() is over ten times faster than letting NumPy parse datetime objects
+    return np.fromiter(
+        (value.toordinal() - EPOCH_ORDINAL if value is not None else NO_DATE for value in values),
+        dtype=np.int64, count=count
+    )
+
+
+def _months(days: np.ndarray) -> np.ndarray:
+    """int64 days since the epoch to int64 months since 1970-01."""
+    return days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+
+
+def _minor_units(values: List[float]) -> np.ndarray:
+    """Amounts to int64 hundredths, so sums are exact."""
+    return np.rint(np.fromiter(values, dtype=np.float64, count=len(values)) * 100).astype(np.int64)
+
+
+def month_label(month: int) -> str:
+    year, month_of_year = divmod(int(month), 12)
+    return f"{1970 + year}-{month_of_year + 1:02d}"
+
+
+def current_month() -> int:
+    today = date.today()
+    return (today.year - 1970) * 12 + today.month - 1
+
+
+class LedgerExtract:
+    """
+    Orders and payments as parallel NumPy columns.
+
+    Dates are int64 days (and months) since the epoch, amounts int64
+    hundredths, clients dense int codes. Payments carry the lag in days
+    from their order's date; ``payment_has_order`` masks payments without one.
+    """
+
+    def __init__(self, order_rows: List[tuple], payment_rows: List[tuple]):
+        client_codes: Dict[Any, int] = {}
+        self.order_client = np.fromiter(
+            (client_codes.setdefault(row[0], len(client_codes)) for row in order_rows),
+            dtype=np.int64, count=len(order_rows)
+        )
+        self.client_count = len(client_codes)
+        self.order_day = _days((row[1] for row in order_rows), len(order_rows))
+        self.order_month = _months(self.order_day)
+        self.order_amount = _minor_units([row[2] for row in order_rows])
+
+        self.payment_day = _days((row[0] for row in payment_rows), len(payment_rows))
+        self.payment_amount = _minor_units([row[1] for row in payment_rows])
+        order_day = _days((row[2] for row in payment_rows), len(payment_rows))
+        self.payment_has_order = order_day != NO_DATE
+        self.payment_lag = self.payment_day - np.where(self.payment_has_order, order_day, 0)
+
+        self.built_at = time.monotonic()
+        self.generation = 0
+
+    @classmethod
+    def load(cls, session: Session) -> "LedgerExtract":
+        """Read the needed columns (not ORM objects) in one query per table."""
+        order_rows = session.exec(
+            select(Order.client_id, Order.order_date, Order.total_amount)
+        ).all()
+        payment_rows = session.exec(
+            select(Payment.payment_date, Payment.amount, Order.order_date)
+            .outerjoin(Order, Payment.order_id == Order.id)
+        ).all()
+        return cls(order_rows, payment_rows)
+
+
+class AnalyticsService:
+    """
+    Owner analytics computed with vectorized NumPy over a cached extract.
+
+    The extract is rebuilt on first use after any change event, or once it
+    is older than ``analytics_cache_seconds`` (covering writes that publish
+    no event). Building it reads two narrow queries; the metrics themselves
+    never loop over rows in Python.
+    """
+
+    def __init__(self, max_age: int = None):
+        self.max_age = settings.analytics_cache_seconds if max_age is None else max_age
+        self._lock = threading.Lock()
+        self._extract: Optional[LedgerExtract] = None
+        self._generation = 0
+        event_broker.add_listener(self._on_event)
+
+    def _on_event(self, event: Dict[str, Any]):
+        self.invalidate()
+
+    def invalidate(self):
+        self._generation += 1
+
+    def extract(self) -> LedgerExtract:
+        with self._lock:
+            current = self._extract
+            stale = (
+                current is None
+                or current.generation != self._generation
+                or time.monotonic() - current.built_at > self.max_age
+            )
+            cache_lookup("analytics", not stale)
+            if stale:
+                # Changes made while loading bump the generation again and are picked up next time
+                generation = self._generation
+                with Session(engine) as session:
+                    current = LedgerExtract.load(session)
+                current.generation = generation
+                self._extract = current
+            return current
+
+    def retention_cohorts(self, months: int = 12, since: Optional[date] = None) -> List[Dict[str, Any]]:
+        """
+        Clients grouped by the month of their first order; ``retention[k]``
+        is the share of the cohort ordering again ``k`` months later. Months
+        that have not happened yet are left out.
+        """
+        x = self.extract()
+        if not len(x.order_client):
+            return []
+        width = months + 1
+
+        first = np.full(x.client_count, np.iinfo(np.int64).max)
+        np.minimum.at(first, x.order_client, x.order_month)
+        offset = x.order_month - first[x.order_client]
+        within = offset <= months
+        # Distinct (client, months since first order) pairs
+        active = np.unique(x.order_client[within] * width + offset[within])
+
+        cohorts, client_cohort = np.unique(first, return_inverse=True)
+        counts = np.bincount(
+            client_cohort[active // width] * width + active % width,
+            minlength=len(cohorts) * width
+        ).reshape(len(cohorts), width)
+
+        since_month = (since.year - 1970) * 12 + since.month - 1 if since else None
+        now = current_month()
+        results = []
+        for index, cohort in enumerate(cohorts):
+            if since_month is not None and cohort < since_month:
+                continue
+            size = int(counts[index, 0])
+            observed = min(months, now - int(cohort)) + 1
+            results.append({
+                "cohort": month_label(cohort),
+                "clients": size,
+                "retention": [round(float(value) / size, 4) for value in counts[index, :observed]],
+            })
+        return results
+
+    def order_value_trend(self, months: int = 24) -> List[Dict[str, Any]]:
+        """Orders, revenue and average order value for each of the last ``months`` months."""
+        x = self.extract()
+        start = current_month() - months + 1
+        recent = x.order_month >= start
+        slot = x.order_month[recent] - start
+        slot_ok = slot < months  # Ignore orders dated in the future
+        slot = slot[slot_ok]
+        counts = np.bincount(slot, minlength=months)
+        revenue = np.bincount(slot, weights=x.order_amount[recent][slot_ok], minlength=months)
+        average = np.divide(revenue, counts, out=np.zeros(months), where=counts > 0)
+        return [
+            {
+                "period": month_label(start + index),
+                "orders": int(counts[index]),
+                "revenue": float(revenue[index]) / 100,
+                "average_order_value": round(float(average[index]) / 100, 2),
+            }
+            for index in range(months)
+        ]
+
+    def payment_lag(self) -> Dict[str, Any]:
+        """Days from order date to payment date, for payments linked to an order."""
+        x = self.extract()
+        lag = x.payment_lag[x.payment_has_order]
+        amount = x.payment_amount[x.payment_has_order]
+        if not len(lag):
+            return {"payments": 0, "mean_days": None, "weighted_mean_days": None, "percentiles": {}, "buckets": []}
+
+        bucket = np.searchsorted(LAG_BUCKET_EDGES, lag, side="right")
+        bucket_counts = np.bincount(bucket, minlength=len(LAG_BUCKET_LABELS))
+        bucket_amounts = np.bincount(bucket, weights=amount, minlength=len(LAG_BUCKET_LABELS))
+        total_amount = amount.sum()
+        return {
+            "payments": int(len(lag)),
+            "mean_days": round(float(lag.mean()), 2),
+            "weighted_mean_days": round(float((lag * amount).sum() / total_amount), 2) if total_amount else None,
+            "percentiles": {
+                f"p{p}": float(value) for p, value in zip(LAG_PERCENTILES, np.percentile(lag, LAG_PERCENTILES))
+            },
+            "buckets": [
+                {"label": label, "payments": int(bucket_counts[index]), "amount": float(bucket_amounts[index]) / 100}
+                for index, label in enumerate(LAG_BUCKET_LABELS)
+            ],
+        }
+
+    def seasonality(self) -> Dict[str, Any]:
+        """
+        Seasonal index per calendar month: that month's average revenue over
+        the average month, from the first order through last month (the
+        current, incomplete month is left out). 1.0 is an average month.
+        """
+        x = self.extract()
+        end = current_month()  # Exclusive
+        included = x.order_month < end
+        if not included.any():
+            return {"months_covered": 0, "months": []}
+        start = int(x.order_month[included].min())
+        span = end - start
+        revenue = np.bincount(x.order_month[included] - start, weights=x.order_amount[included], minlength=span)
+        month_of_year = (start + np.arange(span)) % 12
+        per_month = np.bincount(month_of_year, weights=revenue, minlength=12)
+        occurrences = np.bincount(month_of_year, minlength=12)
+        average = np.divide(per_month, occurrences, out=np.zeros(12), where=occurrences > 0)
+        overall = revenue.mean()
+        return {
+            "months_covered": int(span),
+            "months": [
+                {
+                    "month": index + 1,
+                    "name": calendar.month_abbr[index + 1],
+                    "average_revenue": round(float(average[index]) / 100, 2),
+                    "index": round(float(average[index] / overall), 4) if overall and occurrences[index] else None,
+                }
+                for index in range(12)
+            ],
+        }
+
+
+# Global instance
+analytics_service = AnalyticsService()
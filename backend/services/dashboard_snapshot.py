@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from sqlmodel import Session, select
+from sqlalchemy import case, func
+from sqlalchemy.orm import joinedload
+
+from config import get_settings
+from database import engine
+from models import Client, Order, Payment, Expense, OrderStatus
+from services.events import event_broker
+from services.metrics import cache_lookup
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+def compute_dashboard_stats(session: Session) -> Dict[str, Any]:
+    """
+    Totals plus the five most recent orders and payments, as GET /dashboard/stats returns them.
+
+    Totals are SQL aggregates and the recent lists are LIMIT queries, so
+    the cost does not grow with the number of rows.
+    """
+    total_orders, total_revenue, pending_orders = session.exec(
+        select(
+            func.count(Order.id),
+            func.coalesce(func.sum(Order.total_amount), 0),
+            func.coalesce(func.sum(case((Order.status == OrderStatus.PENDING, 1), else_=0)), 0)
+        )
+    ).one()
+    total_payments = session.exec(select(func.coalesce(func.sum(Payment.amount), 0))).one()
+    total_expenses = session.exec(select(func.coalesce(func.sum(Expense.amount), 0))).one()
+    net_profit = total_revenue - total_expenses
+
+    # Recent orders (last 5) with the client name; columns only, so the
+    # order's items and payments are not loaded
+    recent_orders = []
+    for order in session.exec(
+        select(
+            Order.id, Order.order_number, Order.client_id, Order.total_amount,
+            Order.status, Order.order_date, Order.created_at, Client.name.label("client_name")
+        )
+        .outerjoin(Client, Client.id == Order.client_id)
+        .order_by(Order.created_at.desc())
+        .limit(5)
+    ).all():
+        order_dict = {
+            "id": str(order.id),
+            "orderNumber": order.order_number,
+            "leaderId": str(order.client_id),
+            "totalAmount": order.total_amount,
+            "status": order.status.value if hasattr(order.status, 'value') else str(order.status),
+            "orderDate": order.order_date.isoformat(),
+            "createdAt": order.created_at.isoformat(),
+            "leaderName": order.client_name or "N/A"
+        }
+        recent_orders.append(order_dict)
+
+    # Get recent payments (last 5) with client info
+    recent_payments_raw = session.exec(
+        select(Payment).options(joinedload(Payment.client)).order_by(Payment.created_at.desc()).limit(5)
+    ).all()
+    recent_payments = []
+    for payment in recent_payments_raw:
+        payment_dict = {
+            "id": str(payment.id),
+            "amount": payment.amount,
+            "method": payment.mode.value if hasattr(payment.mode, 'value') else str(payment.mode),
+            "status": payment.status.value if hasattr(payment.status, 'value') else str(payment.status),
+            "paymentDate": payment.payment_date.isoformat(),
+            "createdAt": payment.created_at.isoformat(),
+            "leaderId": str(payment.client_id),
+            "orderId": str(payment.order_id) if payment.order_id else None,
+            "referenceNumber": payment.reference_number,
+            "client": {
+                "id": str(payment.client.id),
+                "name": payment.client.name,
+                "type": payment.client.type.value if hasattr(payment.client.type, 'value') else str(payment.client.type),
+                "contact": payment.client.contact,
+                "address": payment.client.address
+            } if payment.client else None
+        }
+        recent_payments.append(payment_dict)
+
+    return {
+        "totalOrders": total_orders,
+        "totalRevenue": total_revenue,
+        "totalPayments": total_payments,
+        "totalExpenses": total_expenses,
+        "netProfit": net_profit,
+        "pendingOrders": pending_orders,
+        "recentOrders": recent_orders,
+        "recentPayments": recent_payments
+    }
+
+
+class DashboardSnapshot:
+    """
+    Keeps a precomputed copy of the dashboard stats, which are the same for
+    every user.
+
+    A background task started with the app recomputes it every
+    ``dashboard_snapshot_seconds`` and, through the event broker, shortly
+    after any change event; writes arriving within
+    ``dashboard_snapshot_debounce_seconds`` of each other cause a single
+    refresh. Each worker keeps its own copy (with the Redis broker, writes
+    on other workers refresh it too).
+    """
+
+    def __init__(self, interval: float = None, debounce: float = None):
+        self.interval = settings.dashboard_snapshot_seconds if interval is None else interval
+        self.debounce = settings.dashboard_snapshot_debounce_seconds if debounce is None else debounce
+        self._lock = threading.Lock()
+        self._data: Optional[Dict[str, Any]] = None
+        self._computed_at = 0.0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self.interval <= 0:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        event_broker.add_listener(self._on_event)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        event_broker.remove_listener(self._on_event)
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._loop = None
+
+    def get(self) -> Optional[Tuple[Dict[str, Any], float]]:
+        """The snapshot and its age in seconds, or None if none is being kept."""
+        with self._lock:
+            if self._task is None or self._data is None:
+                cache_lookup("dashboard_snapshot", False)
+                return None
+            cache_lookup("dashboard_snapshot", True)
+            return self._data, time.monotonic() - self._computed_at
+
+    def store(self, data: Dict[str, Any]):
+        with self._lock:
+            self._data = data
+            self._computed_at = time.monotonic()
+
+    def refresh(self) -> Dict[str, Any]:
+        """Recompute the snapshot in a session of its own (blocking)."""
+        with Session(engine) as session:
+            data = compute_dashboard_stats(session)
+        self.store(data)
+        return data
+
+    def mark_dirty(self):
+        """Schedule a refresh after the debounce delay; safe to call from any thread."""
+        if self._loop is None:
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._wake.set)
+        except RuntimeError:
+            # Loop already closed during shutdown
+            pass
+
+    def _on_event(self, event: Dict[str, Any]):
+        self.mark_dirty()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.refresh)
+            except Exception:
+                logger.exception("Dashboard snapshot refresh failed")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                continue
+            # Let a burst of writes finish; any arriving meanwhile are included
+            await asyncio.sleep(self.debounce)
+            self._wake.clear()
+
+
+# Global instance
+dashboard_snapshot = DashboardSnapshot()
@@ -0,0 +1,219 @@
+import asyncio
+import json
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Optional, Set
+
+from fastapi.encoders import jsonable_encoder
+
+from config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+EVENTS_CHANNEL = "copyapp:events"
+
+# Sent to a subscriber that cannot be caught up (fell behind or reconnected
+# with an unknown Last-Event-ID); the client should refetch its lists.
+RESYNC_EVENT = "resync"
+
+
+class Subscription:
+    """One SSE connection's queue of pending events."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, max_pending: int):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+
+    async def get(self) -> Dict[str, Any]:
+        return await self.queue.get()
+
+    def deliver(self, event: Dict[str, Any]):
+        """Queue an event; runs on the subscriber's event loop."""
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Too slow to keep up: drop the backlog and tell it to refetch
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(resync_event())
+
+
+def resync_event() -> Dict[str, Any]:
+    return {"seq": None, "type": RESYNC_EVENT, "id": None, "data": None, "at": datetime.utcnow().isoformat()}
+
+
+class EventBroker:
+    """
+    In-process fan-out of change events to SSE subscribers.
+
+    Write paths call ``publish`` after committing; every open ``/events``
+    stream in this process receives the event. Events get a per-process
+    sequence number and the last ``event_history_size`` are kept so a client
+    reconnecting with ``Last-Event-ID`` can be caught up. Used as-is in
+    development and tests; ``RedisEventBroker`` extends it across workers.
+    """
+
+    def __init__(self, history_size: int = None, max_pending: int = None):
+        self.history_size = history_size or settings.event_history_size
+        self.max_pending = max_pending or settings.event_max_pending
+        self._lock = threading.Lock()
+        self._subscribers: Set[Subscription] = set()
+        self._history: Deque[Dict[str, Any]] = deque(maxlen=self.history_size)
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self._seq = 0
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    def publish(self, event_type: str, entity_id: Any = None, data: Any = None):
+        """Announce a change, e.g. ``publish("order.updated", order.id, OrderRead)``."""
+        self._dispatch(self._build(event_type, entity_id, data))
+
+    def _build(self, event_type: str, entity_id: Any, data: Any) -> Dict[str, Any]:
+        return {
+            "type": event_type,
+            "id": str(entity_id) if entity_id is not None else None,
+            "data": jsonable_encoder(data) if data is not None else None,
+            "at": datetime.utcnow().isoformat(),
+        }
+
+    def _dispatch(self, event: Dict[str, Any]):
+        """Number the event, remember it and hand it to every subscriber."""
+        with self._lock:
+            self._seq += 1
+            event = dict(event, seq=self._seq)
+            self._history.append(event)
+            subscribers = list(self._subscribers)
+            listeners = list(self._listeners)
+
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # Loop already closed; the stream's cleanup will unsubscribe it
+                pass
+
+        for listener in listeners:
+            try:
+                listener(event)
+            except Exception:
+                logger.exception("Event listener failed for %s", event["type"])
+
+    def add_listener(self, listener: Callable[[Dict[str, Any]], None]):
+        """Call ``listener(event)`` for every event; it may run on any thread and must not block."""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[Dict[str, Any]], None]):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def subscribe(self, last_event_id: Optional[str] = None) -> Subscription:
+        """Register a subscriber; must be called from the event loop that will read it."""
+        subscription = Subscription(asyncio.get_running_loop(), self.max_pending)
+        with self._lock:
+            self._subscribers.add(subscription)
+            if last_event_id:
+                for event in self._missed_since(last_event_id):
+                    subscription.deliver(event)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def _missed_since(self, last_event_id: str):
+        """Events after ``last_event_id``, or a resync marker if they are gone."""
+        try:
+            last_seq = int(last_event_id)
+        except ValueError:
+            return [resync_event()]
+        if last_seq > self._seq:
+            # Sequence from another worker or a restarted process
+            return [resync_event()]
+        if last_seq == self._seq:
+            return []
+        missed = [event for event in self._history if event["seq"] > last_seq]
+        if not missed or missed[0]["seq"] != last_seq + 1:
+            return [resync_event()]
+        if len(missed) >= self.max_pending:
+            return [resync_event()]
+        return missed
+
+
+class RedisEventBroker(EventBroker):
+    """
+    Fans events out across workers through a Redis pub/sub channel.
+
+    ``publish`` sends to Redis; a listener task in each worker receives every
+    event (including its own) and dispatches it locally. If Redis cannot be
+    reached the event is still delivered to this worker's subscribers.
+    """
+
+    def __init__(self, redis_url: str = None, channel: str = EVENTS_CHANNEL, **kwargs):
+        super().__init__(**kwargs)
+        import redis
+
+        self.redis_url = redis_url or settings.redis_url
+        self.channel = channel
+        self._redis = redis.Redis.from_url(self.redis_url)
+        self._listener: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._listener:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    def publish(self, event_type: str, entity_id: Any = None, data: Any = None):
+        event = self._build(event_type, entity_id, data)
+        try:
+            self._redis.publish(self.channel, json.dumps(event))
+        except Exception as e:
+            logger.warning("Redis publish failed, delivering %s locally only: %s", event_type, e)
+            self._dispatch(event)
+
+    async def _listen(self):
+        import redis.asyncio as aioredis
+
+        while True:
+            client = aioredis.Redis.from_url(self.redis_url)
+            pubsub = client.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self._dispatch(json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Redis event listener error, reconnecting: %s", e)
+                # Anything published while disconnected is lost; make clients refetch
+                self._dispatch(resync_event())
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.close()
+                await client.close()
+
+
+def create_event_broker() -> EventBroker:
+    if settings.event_broker == "redis":
+        return RedisEventBroker()
+    return EventBroker()
+
+
+# Global instance
+event_broker = create_event_broker()
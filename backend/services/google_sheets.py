@@ -1,10 +1,16 @@
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 from config import get_settings
+from functools import lru_cache
+import json
+import logging
 import os
+import re
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Row number in an A1 range such as "Orders!A12:G14"
+RANGE_START_ROW = re.compile(r"![A-Z]+(\d+)")
 
 class GoogleSheetsService:
     def __init__(self):
@@ -16,22 +22,26 @@ class GoogleSheetsService:
     def _authenticate(self):
         """Authenticate with Google Sheets API using service account credentials."""
         if not os.path.exists(self.credentials_path):
-            print(f"Warning: Credentials file not found at {self.credentials_path}")
+            logger.warning("Google credentials file not found at %s", self.credentials_path)
             return
         
         try:
+            # Imported here: the Google client libraries are slow to import and only needed with credentials
+            from google.oauth2 import service_account
+            from googleapiclient.discovery import build
+
             credentials = service_account.Credentials.from_service_account_file(
                 self.credentials_path,
                 scopes=['https://www.googleapis.com/auth/spreadsheets']
             )
             self.service = build('sheets', 'v4', credentials=credentials)
         except Exception as e:
-            print(f"Error authenticating with Google Sheets: {e}")
+            logger.error("Error authenticating with Google Sheets: %s", e)
     
     def append_row(self, sheet_name: str, values: List[Any]):
         """Append a row to the specified sheet."""
         if not self.service:
-            print("Google Sheets service not available")
+            logger.warning("Google Sheets service not available")
             return False
         
         try:
@@ -44,13 +54,13 @@ class GoogleSheetsService:
             ).execute()
             return True
         except Exception as e:
-            print(f"Error appending row to Google Sheets: {e}")
+            logger.error("Error appending row to %s: %s", sheet_name, e)
             return False
     
     def update_row(self, sheet_name: str, row_index: int, values: List[Any]):
         """Update a row in the specified sheet."""
         if not self.service:
-            print("Google Sheets service not available")
+            logger.warning("Google Sheets service not available")
             return False
         
         try:
@@ -63,13 +73,13 @@ class GoogleSheetsService:
             ).execute()
             return True
         except Exception as e:
-            print(f"Error updating row in Google Sheets: {e}")
+            logger.error("Error updating row in %s: %s", sheet_name, e)
             return False
     
     def get_all_rows(self, sheet_name: str) -> List[List[Any]]:
         """Get all rows from the specified sheet."""
         if not self.service:
-            print("Google Sheets service not available")
+            logger.warning("Google Sheets service not available")
             return []
         
         try:
@@ -79,76 +89,214 @@ class GoogleSheetsService:
             ).execute()
             return result.get('values', [])
         except Exception as e:
-            print(f"Error getting rows from Google Sheets: {e}")
+            logger.error("Error getting rows from %s: %s", sheet_name, e)
             return []
     
+    def read_rows(self, sheet_name: str) -> Optional[List[List[Any]]]:
+        """All rows of a sheet with unformatted values (numbers as numbers); None on failure."""
+        if not self.service:
+            logger.warning("Google Sheets service not available")
+            return None
+        
+        try:
+            result = self.service.spreadsheets().values().get(
+                spreadsheetId=self.sheet_id,
+                range=f'{sheet_name}!A:Z',
+                valueRenderOption='UNFORMATTED_VALUE'
+            ).execute()
+            return result.get('values', [])
+        except Exception as e:
+            logger.error("Error reading rows from %s: %s", sheet_name, e)
+            return None
+    
+    def append_rows(self, sheet_name: str, rows: List[List[Any]]) -> Optional[int]:
+        """Append many rows in one API call; returns the first appended row number, or None on failure."""
+        if not self.service:
+            logger.warning("Google Sheets service not available")
+            return None
+        
+        try:
+            result = self.service.spreadsheets().values().append(
+                spreadsheetId=self.sheet_id,
+                range=f'{sheet_name}!A:Z',
+                valueInputOption='RAW',
+                insertDataOption='INSERT_ROWS',
+                body={'values': rows}
+            ).execute()
+            return int(RANGE_START_ROW.search(result['updates']['updatedRange']).group(1))
+        except Exception as e:
+            logger.error("Error appending %d rows to %s: %s", len(rows), sheet_name, e)
+            return None
+    
+    def update_rows(self, updates: List[Tuple[str, int, List[Any]]]) -> bool:
+        """Overwrite many rows, on any sheets, in one batchUpdate call: (sheet, row number, values)."""
+        if not self.service:
+            logger.warning("Google Sheets service not available")
+            return False
+        
+        try:
+            self.service.spreadsheets().values().batchUpdate(
+                spreadsheetId=self.sheet_id,
+                body={
+                    'valueInputOption': 'RAW',
+                    'data': [
+                        {'range': f'{sheet_name}!A{row_index}', 'values': [values]}
+                        for sheet_name, row_index, values in updates
+                    ]
+                }
+            ).execute()
+            return True
+        except Exception as e:
+            logger.error("Error updating %d rows in Google Sheets: %s", len(updates), e)
+            return False
+    
     def sync_client(self, client_data: Dict[str, Any]):
         """Sync client data to Google Sheets."""
-        values = [
-            str(client_data.get('id', '')),
-            client_data.get('name', ''),
-            client_data.get('type', ''),
-            client_data.get('contact', ''),
-            client_data.get('address', ''),
-            client_data.get('opening_balance', 0),
-            str(client_data.get('created_at', ''))
-        ]
-        return self.append_row('Clients', values)
+        return self.append_row('Clients', client_row(client_data))
     
     def sync_order(self, order_data: Dict[str, Any]):
         """Sync order data to Google Sheets."""
-        values = [
-            str(order_data.get('id', '')),
-            order_data.get('order_number', ''),
-            str(order_data.get('client_id', '')),
-            str(order_data.get('order_date', '')),
-            order_data.get('total_amount', 0),
-            order_data.get('status', ''),
-            str(order_data.get('created_at', ''))
-        ]
-        return self.append_row('Orders', values)
+        return self.append_row('Orders', order_row(order_data))
     
     def sync_payment(self, payment_data: Dict[str, Any]):
         """Sync payment data to Google Sheets."""
-        values = [
-            str(payment_data.get('id', '')),
-            str(payment_data.get('order_id', '')),
-            payment_data.get('amount', 0),
-            payment_data.get('mode', ''),
-            payment_data.get('status', ''),
-            payment_data.get('reference_number', ''),
-            str(payment_data.get('payment_date', '')),
-            str(payment_data.get('created_at', ''))
-        ]
-        return self.append_row('Payments', values)
+        return self.append_row('Payments', payment_row(payment_data))
     
     def sync_expense(self, expense_data: Dict[str, Any]):
         """Sync expense data to Google Sheets."""
-        values = [
-            str(expense_data.get('id', '')),
-            expense_data.get('category', ''),
-            expense_data.get('amount', 0),
-            expense_data.get('description', ''),
-            str(expense_data.get('expense_date', '')),
-            str(expense_data.get('created_at', ''))
-        ]
-        return self.append_row('Expenses', values)
+        return self.append_row('Expenses', expense_row(expense_data))
     
     def sync_product(self, product_data: Dict[str, Any]):
         """Sync product data to Google Sheets."""
-        values = [
-            str(product_data.get('id', '')),
-            product_data.get('name', ''),
-            product_data.get('category', ''),
-            product_data.get('cost_price', 0),
-            product_data.get('sale_price', 0),
-            product_data.get('stock_quantity', 0),
-            product_data.get('unit', ''),
-            str(product_data.get('created_at', '')),
-            str(product_data.get('updated_at', ''))
-        ]
-        return self.append_row('Products', values)
-
-# Global instance
-sheets_service = GoogleSheetsService()
+        return self.append_row('Products', product_row(product_data))
+
+class FakeSheetsService:
+    """
+    In-memory stand-in for ``GoogleSheetsService`` (``sheets_backend=fake``).
+
+    Keeps each tab as a list of rows and counts API calls, so tests and
+    local development can exercise the sync without credentials.
+    ``fail_next(n)`` makes the next ``n`` calls fail.
+    """
+
+    def __init__(self):
+        self.sheets: Dict[str, List[List[Any]]] = {}
+        self.calls = 0
+        self._failures = 0
+
+    def fail_next(self, count: int = 1):
+        self._failures = count
+
+    def _call(self) -> bool:
+        self.calls += 1
+        if self._failures:
+            self._failures -= 1
+            logger.warning("Fake Google Sheets call failed")
+            return False
+        return True
+
+    @staticmethod
+    def _as_sent(rows: List[List[Any]]) -> List[List[Any]]:
+        """Rows as the API would store them (JSON round trip, so enums become their values)."""
+        return json.loads(json.dumps(rows, default=str))
+
+    def append_row(self, sheet_name: str, values: List[Any]):
+        return self.append_rows(sheet_name, [values]) is not None
+
+    def append_rows(self, sheet_name: str, rows: List[List[Any]]) -> Optional[int]:
+        if not self._call():
+            return None
+        sheet = self.sheets.setdefault(sheet_name, [])
+        # Like the API, append after the last non-empty row
+        while sheet and not any(cell not in ("", None) for cell in sheet[-1]):
+            sheet.pop()
+        start = len(sheet) + 1
+        sheet.extend(self._as_sent(rows))
+        return start
+
+    def update_row(self, sheet_name: str, row_index: int, values: List[Any]):
+        return self.update_rows([(sheet_name, row_index, values)])
+
+    def update_rows(self, updates: List[Tuple[str, int, List[Any]]]) -> bool:
+        if not self._call():
+            return False
+        for sheet_name, row_index, values in updates:
+            rows = self.sheets.setdefault(sheet_name, [])
+            while len(rows) < row_index:
+                rows.append([])
+            row = rows[row_index - 1]
+            row[:len(values)] = self._as_sent([values])[0]
+        return True
+
+    def get_all_rows(self, sheet_name: str) -> List[List[Any]]:
+        return self.read_rows(sheet_name) or []
+
+    def read_rows(self, sheet_name: str) -> Optional[List[List[Any]]]:
+        if not self._call():
+            return None
+        return [list(row) for row in self.sheets.get(sheet_name, [])]
+
+def client_row(client_data: Dict[str, Any]) -> List[Any]:
+    return [
+        str(client_data.get('id', '')),
+        client_data.get('name', ''),
+        client_data.get('type', ''),
+        client_data.get('contact', ''),
+        client_data.get('address', ''),
+        client_data.get('opening_balance', 0),
+        str(client_data.get('created_at', ''))
+    ]
+
+def order_row(order_data: Dict[str, Any]) -> List[Any]:
+    return [
+        str(order_data.get('id', '')),
+        order_data.get('order_number', ''),
+        str(order_data.get('client_id', '')),
+        str(order_data.get('order_date', '')),
+        order_data.get('total_amount', 0),
+        order_data.get('status', ''),
+        str(order_data.get('created_at', ''))
+    ]
+
+def payment_row(payment_data: Dict[str, Any]) -> List[Any]:
+    return [
+        str(payment_data.get('id', '')),
+        str(payment_data.get('order_id', '')),
+        payment_data.get('amount', 0),
+        payment_data.get('mode', ''),
+        payment_data.get('status', ''),
+        payment_data.get('reference_number', ''),
+        str(payment_data.get('payment_date', '')),
+        str(payment_data.get('created_at', ''))
+    ]
+
+def expense_row(expense_data: Dict[str, Any]) -> List[Any]:
+    return [
+        str(expense_data.get('id', '')),
+        expense_data.get('category', ''),
+        expense_data.get('amount', 0),
+        expense_data.get('description', ''),
+        str(expense_data.get('expense_date', '')),
+        str(expense_data.get('created_at', ''))
+    ]
+
+def product_row(product_data: Dict[str, Any]) -> List[Any]:
+    return [
+        str(product_data.get('id', '')),
+        product_data.get('name', ''),
+        product_data.get('category', ''),
+        product_data.get('cost_price', 0),
+        product_data.get('sale_price', 0),
+        product_data.get('stock_quantity', 0),
+        product_data.get('unit', ''),
+        str(product_data.get('created_at', '')),
+        str(product_data.get('updated_at', ''))
+    ]
+
+@lru_cache()
+def get_sheets_service():
+    """The configured Sheets service, created (and authenticated) on first use."""
+    if settings.sheets_backend == "fake":
+        return FakeSheetsService()
+    return GoogleSheetsService()
 
@@ -9,6 +9,7 @@ import io
 from datetime import datetime
 from typing import Dict, Any, Optional, List
 from config import get_settings
+from services.metrics import RenderTimer
 import os
 
 settings = get_settings()
@@ -354,6 +355,7 @@ class ProfessionalInvoiceGenerator:
 
     def generate_invoice(self, order_data: Dict[str, Any], client_data: Dict[str, Any], company_settings: Optional[Dict[str, Any]] = None, payment_history: Optional[List[Dict[str, Any]]] = None) -> str:
         """Generate professional invoice PDF."""
+        timer = RenderTimer("invoice")
         invoice_number = order_data.get('order_number', '')
         invoice_date = datetime.now().strftime('%Y-%m-%d')
         
@@ -379,20 +381,21 @@ class ProfessionalInvoiceGenerator:
         
         # Footer Section (QR + Thank You + Bottom Bar)
         # QR Code
-        qr_img = None
-        try:
-            total_amount = order_data.get('total_amount', 0)
-            qr_data = f"INVOICE:{invoice_number}|AMT:{total_amount}"
-            qr = qrcode.QRCode(version=1, box_size=3, border=2)
-            qr.add_data(qr_data)
-            qr.make(fit=True)
-            img = qr.make_image(fill_color='black', back_color='white')
-            img_buffer = io.BytesIO()
-            img.save(img_buffer, format='PNG')
-            img_buffer.seek(0)
-            qr_img = Image(img_buffer, width=20*mm, height=20*mm)
-        except Exception:
-            pass
+        with timer.stage("qr"):
+            qr_img = None
+            try:
+                total_amount = order_data.get('total_amount', 0)
+                qr_data = f"INVOICE:{invoice_number}|AMT:{total_amount}"
+                qr = qrcode.QRCode(version=1, box_size=3, border=2)
+                qr.add_data(qr_data)
+                qr.make(fit=True)
+                img = qr.make_image(fill_color='black', back_color='white')
+                img_buffer = io.BytesIO()
+                img.save(img_buffer, format='PNG')
+                img_buffer.seek(0)
+                qr_img = Image(img_buffer, width=20*mm, height=20*mm)
+            except Exception:
+                pass
 
         # Thank You Message
         thank_you_text = [
@@ -433,7 +436,9 @@ class ProfessionalInvoiceGenerator:
         story.append(Spacer(1, 2*mm))
         story.append(bottom_bar)
         
-        doc.build(story)
+        with timer.stage("build"):
+            doc.build(story)
+        timer.finish()
         return filepath
 
 # Global instance
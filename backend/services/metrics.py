@@ -0,0 +1,209 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict
+
+from sqlalchemy import event, func
+from sqlmodel import Session, select
+
+from config import get_settings
+
+settings = get_settings()
+
+# prometheus_client picks its storage when first imported
+if settings.prometheus_multiproc_dir:
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", settings.prometheus_multiproc_dir)
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import multiprocess
+from prometheus_client.core import GaugeMetricFamily
+
+from database import engine
+from models import SheetsOutbox
+
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests being handled",
+    multiprocess_mode="livesum",
+)
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries",
+    "SQL statements executed per HTTP request",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144),
+)
+REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_seconds",
+    "Time spent in SQL statements per HTTP request",
+    ["route"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+N_PLUS_ONE = Counter(
+    "http_request_n_plus_one",
+    "Requests that repeated one SQL statement at least n_plus_one_threshold times",
+    ["route"],
+)
+
+DB_CONNECTIONS_OPEN = Gauge(
+    "db_pool_connections_open",
+    "Database connections held by the pool",
+    multiprocess_mode="livesum",
+)
+DB_CONNECTIONS_CHECKED_OUT = Gauge(
+    "db_pool_connections_checked_out",
+    "Database connections in use",
+    multiprocess_mode="livesum",
+)
+
+PDF_RENDER_SECONDS = Histogram(
+    "pdf_render_seconds",
+    "Time spent rendering PDFs, by document and stage (layout, qr, build)",
+    ["document", "stage"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+
+CACHE_REQUESTS = Counter(
+    "cache_requests",
+    "Cache lookups by cache and result (hit or miss)",
+    ["cache", "result"],
+)
+
+SHEETS_SYNC_LAST_SUCCESS = Gauge(
+    "sheets_sync_last_success_timestamp_seconds",
+    "When a Google Sheets drain last succeeded",
+    multiprocess_mode="max",
+)
+
+def route_template(scope) -> str:
+    """The matched route's path template; unmatched paths share one label to keep the label set small."""
+    return getattr(scope.get("route"), "path", None) or "unmatched"
+
+
+def cache_lookup(cache: str, hit: bool):
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+class RenderTimer:
+    """
+    Times one PDF render by stage. Time spent inside ``stage("qr")`` and
+    ``stage("build")`` is recorded under those names, the rest as layout.
+    """
+
+    def __init__(self, document: str):
+        self.document = document
+        self.started = time.perf_counter()
+        self.spent: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.spent[name] = self.spent.get(name, 0.0) + time.perf_counter() - started
+
+    def finish(self):
+        total = time.perf_counter() - self.started
+        PDF_RENDER_SECONDS.labels(self.document, "layout").observe(total - sum(self.spent.values()))
+        for name, seconds in self.spent.items():
+            PDF_RENDER_SECONDS.labels(self.document, name).observe(seconds)
+
+
+class SheetsOutboxCollector:
+    """Sheets sync backlog, read from the outbox when scraped."""
+
+    def collect(self):
+        pending = GaugeMetricFamily("sheets_outbox_pending", "Changes waiting to be pushed to Google Sheets")
+        lag = GaugeMetricFamily("sheets_sync_lag_seconds", "Age of the oldest change waiting to be pushed to Google Sheets")
+        if settings.sheets_sync_enabled:
+            with Session(engine) as session:
+                count, oldest = session.exec(
+                    select(func.count(SheetsOutbox.id), func.min(SheetsOutbox.created_at))
+                ).one()
+            pending.add_metric([], count)
+            lag.add_metric([], (datetime.utcnow() - oldest).total_seconds() if oldest else 0)
+        yield pending
+        yield lag
+
+
+def render_metrics() -> bytes:
+    """The text exposition of all metrics, merged across workers in multi-process mode."""
+    registry = REGISTRY
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    output = generate_latest(registry)
+    sheets = CollectorRegistry()
+    sheets.register(SheetsOutboxCollector())
+    return output + generate_latest(sheets)
+
+
+def mark_process_dead():
+    """Drop this worker's live gauges from the shared directory on shutdown."""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+@event.listens_for(engine, "connect")
+def _pool_connect(dbapi_connection, connection_record):
+    DB_CONNECTIONS_OPEN.inc()
+
+
+@event.listens_for(engine, "close")
+def _pool_close(dbapi_connection, connection_record):
+    DB_CONNECTIONS_OPEN.dec()
+
+
+@event.listens_for(engine, "checkout")
+def _pool_checkout(dbapi_connection, connection_record, connection_proxy):
+    DB_CONNECTIONS_CHECKED_OUT.inc()
+
+
+@event.listens_for(engine, "checkin")
+def _pool_checkin(dbapi_connection, connection_record):
+    DB_CONNECTIONS_CHECKED_OUT.dec()
+
+
+_in_request: ContextVar[bool] = ContextVar("in_request", default=False)
+
+
+class MetricsMiddleware:
+    """Records latency and in-flight count per route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or _in_request.get():
+            # Batch sub-requests are counted as part of the batch
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        token = _in_request.set(True)
+        REQUESTS_IN_PROGRESS.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            REQUESTS_IN_PROGRESS.dec()
+            _in_request.reset(token)
+            REQUEST_DURATION.labels(scope["method"], route_template(scope), str(status_code)).observe(elapsed)
+
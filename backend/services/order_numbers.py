@@ -0,0 +1,86 @@
+import threading
+from datetime import datetime
+from typing import Tuple
+
+from sqlalchemy import select, text, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session
+
+from config import get_settings
+from database import engine
+from models import IdCounter
+
+settings = get_settings()
+
+ORDER_NUMBER_COUNTER = "order_number"
+
+
+class OrderNumberAllocator:
+    """
+    Allocates order numbers without locking or scanning the orders table.
+
+    On PostgreSQL each number comes from ``nextval('order_number_seq')``, which
+    never blocks concurrent transactions. Other databases (SQLite in
+    development) claim blocks of ``order_number_block_size`` values from a
+    single ``id_counters`` row in a short separate transaction and hand them
+    out from memory, so the counter row is touched once per block per worker.
+
+    Numbers are unique but not gap-free: unused values in a worker's block
+    are skipped when it restarts, and sequence values are not returned on
+    rollback.
+    """
+
+    def __init__(self, number_format: str = None, block_size: int = None):
+        self.number_format = number_format or settings.order_number_format
+        self.block_size = max(1, block_size or settings.order_number_block_size)
+        self._lock = threading.Lock()
+        self._next = 0
+        self._end = 0
+
+    def allocate(self, session: Session) -> str:
+        """Return the next formatted order number."""
+        return self.format(self.next_value(session))
+
+    def format(self, seq: int, when: datetime = None) -> str:
+        when = when or datetime.utcnow()
+        return self.number_format.format(year=when.year, month=when.month, seq=seq)
+
+    def next_value(self, session: Session) -> int:
+        if session.get_bind().dialect.name == "postgresql":
+            return session.execute(text("SELECT nextval('order_number_seq')")).scalar_one()
+
+        with self._lock:
+            if self._next >= self._end:
+                self._next, self._end = self._claim_block()
+            value = self._next
+            self._next += 1
+            return value
+
+    def _claim_block(self) -> Tuple[int, int]:
+        """Reserve ``block_size`` values from the counter row; returns [start, end)."""
+        with Session(engine) as session:
+            for _ in range(2):
+                result = session.execute(
+                    update(IdCounter)
+                    .where(IdCounter.name == ORDER_NUMBER_COUNTER)
+                    .values(next_value=IdCounter.next_value + self.block_size)
+                )
+                if result.rowcount == 1:
+                    end = session.execute(
+                        select(IdCounter.next_value).where(IdCounter.name == ORDER_NUMBER_COUNTER)
+                    ).scalar_one()
+                    session.commit()
+                    return end - self.block_size, end
+
+                # First use on a database created without migrations
+                session.rollback()
+                session.add(IdCounter(name=ORDER_NUMBER_COUNTER, next_value=1))
+                try:
+                    session.commit()
+                except IntegrityError:
+                    session.rollback()
+        raise RuntimeError("Could not claim an order number block")
+
+
+# Global instance
+order_number_allocator = OrderNumberAllocator()
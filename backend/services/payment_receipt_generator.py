@@ -9,6 +9,7 @@ import io
 from datetime import datetime
 from typing import Dict, Any, Optional, List
 from config import get_settings
+from services.metrics import RenderTimer
 import os
 
 settings = get_settings()
@@ -333,6 +334,7 @@ class PaymentReceiptGenerator:
 
     def generate_receipt(self, order_data: Dict[str, Any], client_data: Dict[str, Any], payment_data: Dict[str, Any], payment_history: List[Dict[str, Any]], company_settings: Optional[Dict[str, Any]] = None) -> str:
         """Generate professional payment receipt PDF."""
+        timer = RenderTimer("receipt")
         receipt_number = f"RCPT-{payment_data.get('id', 'NEW')}"
         receipt_date = datetime.now().strftime('%Y-%m-%d')
         
@@ -359,20 +361,21 @@ class PaymentReceiptGenerator:
         
         # Footer Section (QR + Thank You + Bottom Bar)
         # QR Code
-        qr_img = None
-        try:
-            amount = payment_data.get('amount', 0)
-            qr_data = f"RECEIPT:{receipt_number}|AMT:{amount}"
-            qr = qrcode.QRCode(version=1, box_size=3, border=2)
-            qr.add_data(qr_data)
-            qr.make(fit=True)
-            img = qr.make_image(fill_color='black', back_color='white')
-            img_buffer = io.BytesIO()
-            img.save(img_buffer, format='PNG')
-            img_buffer.seek(0)
-            qr_img = Image(img_buffer, width=20*mm, height=20*mm)
-        except Exception:
-            pass
+        with timer.stage("qr"):
+            qr_img = None
+            try:
+                amount = payment_data.get('amount', 0)
+                qr_data = f"RECEIPT:{receipt_number}|AMT:{amount}"
+                qr = qrcode.QRCode(version=1, box_size=3, border=2)
+                qr.add_data(qr_data)
+                qr.make(fit=True)
+                img = qr.make_image(fill_color='black', back_color='white')
+                img_buffer = io.BytesIO()
+                img.save(img_buffer, format='PNG')
+                img_buffer.seek(0)
+                qr_img = Image(img_buffer, width=20*mm, height=20*mm)
+            except Exception:
+                pass
 
         # Thank You Message
         thank_you_text = [
@@ -413,7 +416,9 @@ class PaymentReceiptGenerator:
         story.append(Spacer(1, 2*mm))
         story.append(bottom_bar)
         
-        doc.build(story)
+        with timer.stage("build"):
+            doc.build(story)
+        timer.finish()
         return filepath
 
 # Global instance
@@ -0,0 +1,282 @@
+import contextvars
+import glob
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+
+from config import get_settings
+from services.metrics import route_template
+from utils.auth import get_current_user
+from utils.logs import request_id
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+PROFILE_ID = re.compile(r"^[0-9a-f]{32}$")
+
+# The profile of the request being handled, seen by its threadpool calls too
+_active: ContextVar[Optional["RequestProfile"]] = ContextVar("active_profile", default=None)
+
+
+class RequestProfile:
+    """
+    Wall-clock sampling profile of one request.
+
+    A sampler thread reads every thread's stack each ``interval`` seconds
+    and keeps those working for this request: the event loop thread while
+    it runs the request's coroutines, and threadpool workers running its
+    sync dependencies and endpoint (recognised by the context they were
+    handed). Ticks where neither is busy are recorded as ``(waiting)``.
+    """
+
+    def __init__(self, interval: float):
+        self.id = uuid.uuid4().hex
+        self.interval = interval
+        self.started_at = datetime.utcnow()
+        self.duration = 0.0
+        self.frames: List[Dict[str, Any]] = []
+        self.samples: List[List[int]] = []
+        self.weights: List[float] = []
+        self._frame_ids: Dict[Any, int] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample_loop, name=f"profile-{self.id[:8]}", daemon=True)
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self._started
+
+    def _sample_loop(self):
+        last = self._started
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            self._sample((now - last) * 1000)
+            last = now
+
+    def _sample(self, weight_ms: float):
+        own = threading.get_ident()
+        stacks = []
+        for ident, frame in sys._current_frames().items():
+            if ident != own:
+                stack = self._request_stack(frame)
+                if stack is not None:
+                    stacks.append(stack)
+        if not stacks:
+            stacks = [[self._frame_id("(waiting)")]]
+        for stack in stacks:
+            self.samples.append(stack)
+            self.weights.append(round(weight_ms, 3))
+
+    def _request_stack(self, frame) -> Optional[List[int]]:
+        """Frame ids from the request's entry point to ``frame``, or None if the thread is not working for it."""
+        codes = []
+        while frame is not None:
+            code = frame.f_code
+            if code is _PROFILED_CODE:
+                if frame.f_locals.get("profile") is not self:
+                    return None
+                return [self._frame_id(c) for c in reversed(codes)]
+            if code.co_name == "run" and "anyio" in code.co_filename:
+                # anyio's worker thread runs each call as context.run(func, *args)
+                context = frame.f_locals.get("context")
+                if not isinstance(context, contextvars.Context) or context.get(_active) is not self:
+                    return None
+                return [self._frame_id("(threadpool)")] + [self._frame_id(c) for c in reversed(codes)]
+            codes.append(code)
+            frame = frame.f_back
+        return None
+
+    def _frame_id(self, code) -> int:
+        index = self._frame_ids.get(code)
+        if index is None:
+            if isinstance(code, str):
+                self.frames.append({"name": code})
+            else:
+                self.frames.append({
+                    "name": getattr(code, "co_qualname", code.co_name),
+                    "file": code.co_filename,
+                    "line": code.co_firstlineno,
+                })
+            index = self._frame_ids[code] = len(self.frames) - 1
+        return index
+
+    def to_speedscope(self, name: str) -> Dict[str, Any]:
+        """The profile as a speedscope file (https://www.speedscope.app/file-format-schema.json)."""
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "activeProfileIndex": 0,
+            "shared": {"frames": self.frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": round(sum(self.weights), 3),
+                "samples": self.samples,
+                "weights": self.weights,
+            }],
+        }
+
+
+class ProfileStore:
+    """
+    Profiles saved as files in ``profile_dir``, so any worker can serve
+    them: ``<id>.speedscope.json`` and a ``<id>.meta.json`` summary. Only
+    the newest ``profile_max_stored`` are kept.
+    """
+
+    def __init__(self, directory: str = None, max_stored: int = None):
+        self.directory = directory or settings.profile_dir
+        self.max_stored = max_stored or settings.profile_max_stored
+
+    def save(self, profile: RequestProfile, meta: Dict[str, Any]):
+        os.makedirs(self.directory, exist_ok=True)
+        name = f"{meta['method']} {meta['path']} ({meta['status']})"
+        with open(self._path(profile.id, "speedscope"), "w") as f:
+            json.dump(profile.to_speedscope(name), f)
+        with open(self._path(profile.id, "meta"), "w") as f:
+            json.dump(meta, f)
+        self._prune()
+
+    def list(self) -> List[Dict[str, Any]]:
+        profiles = []
+        for path in self._meta_files():
+            try:
+                with open(path) as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue  # Deleted or still being written by another worker
+        return profiles
+
+    def path(self, profile_id: str) -> Optional[str]:
+        """The speedscope file of a stored profile, None if there is none."""
+        if not PROFILE_ID.match(profile_id):
+            return None
+        path = self._path(profile_id, "speedscope")
+        return path if os.path.exists(path) else None
+
+    def _path(self, profile_id: str, kind: str) -> str:
+        return os.path.join(self.directory, f"{profile_id}.{kind}.json")
+
+    def _meta_files(self) -> List[str]:
+        """Newest first."""
+        paths = glob.glob(os.path.join(self.directory, "*.meta.json"))
+        return sorted(paths, key=lambda p: os.path.getmtime(p) if os.path.exists(p) else 0, reverse=True)
+
+    def _prune(self):
+        for path in self._meta_files()[self.max_stored:]:
+            profile_id = os.path.basename(path).split(".", 1)[0]
+            for kind in ("meta", "speedscope"):
+                try:
+                    os.remove(self._path(profile_id, kind))
+                except FileNotFoundError:
+                    pass
+
+
+# Global instance
+profile_store = ProfileStore()
+
+
+def _is_admin(authorization: Optional[bytes]) -> bool:
+    if not authorization:
+        return False
+    scheme, _, token = authorization.decode("latin-1").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        return get_current_user(token.strip()).role == "admin"
+    except HTTPException:
+        return False
+
+
+class ProfilingMiddleware:
+    """
+    Profiles requests sent by an admin with ``X-Profile: 1``, and a
+    ``profile_sample_rate`` share of all requests. A profiled response
+    carries ``X-Profile-Id``; the profile is downloaded from
+    GET /api/v1/admin/profiles/{id}. Only installed when
+    ``profiling_enabled`` is set, so it costs nothing otherwise.
+    Batch sub-requests are profiled as part of the batch.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.sample_rate = settings.profile_sample_rate
+        self.interval = settings.profile_interval_ms / 1000
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or _active.get() is not None:
+            await self.app(scope, receive, send)
+            return
+
+        requested = False
+        authorization = None
+        for name, value in scope.get("headers", []):
+            if name == b"x-profile":
+                requested = value.strip().lower() in (b"1", b"true")
+            elif name == b"authorization":
+                authorization = value
+        trigger = "sampled" if self.sample_rate > 0 and random.random() < self.sample_rate else None
+        if trigger is None and requested and await run_in_threadpool(_is_admin, authorization):
+            trigger = "header"
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        await self._profiled(scope, receive, send, RequestProfile(self.interval), trigger)
+
+    async def _profiled(self, scope, receive, send, profile: RequestProfile, trigger: str):
+        status_code = 500
+
+        async def send_with_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile.id.encode())]
+            await send(message)
+
+        token = _active.set(profile)
+        profile.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profile.stop()
+            _active.reset(token)
+            meta = {
+                "id": profile.id,
+                "created_at": profile.started_at.isoformat(),
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": route_template(scope),
+                "status": status_code,
+                "duration_ms": round(profile.duration * 1000, 2),
+                "samples": len(profile.samples),
+                "trigger": trigger,
+                "request_id": request_id.get(),
+            }
+            try:
+                await run_in_threadpool(profile_store.save, profile, meta)
+                logger.info("Request profiled", extra={"profile_id": profile.id, "route": meta["route"], "duration_ms": meta["duration_ms"]})
+            except OSError as e:
+                logger.warning("Could not save a request profile: %s", e)
+
+
+# The sampler recognises the request's coroutine stack by this frame
+_PROFILED_CODE = ProfilingMiddleware._profiled.__code__
@@ -0,0 +1,150 @@
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+from contextvars import ContextVar
+from typing import Callable, List, Optional
+
+from sqlalchemy import event
+
+from config import get_settings
+from database import engine
+from services.metrics import N_PLUS_ONE, REQUEST_DB_SECONDS, REQUEST_QUERIES, route_template
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# A run of bind placeholders (?, %(name)s or :name), as in expanded IN lists
+PLACEHOLDER_RUN = re.compile(r"(?:\?|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|:\w+))+")
+
+
+@lru_cache(maxsize=2048)
+def statement_shape(statement: str) -> str:
+    """The statement with IN lists collapsed, so the same query with other values has the same shape."""
+    return PLACEHOLDER_RUN.sub("?...", statement)
+
+
+class QueryStats:
+    """SQL statements executed while handling one request."""
+
+    def __init__(self, scope=None):
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes: Counter = Counter()
+        self.scope = scope
+        self.route: Optional[str] = None
+
+    def current_route(self) -> str:
+        """The route template, known once the request has been routed."""
+        return self.route or (route_template(self.scope) if self.scope is not None else "unmatched")
+
+    def repeated(self, threshold: int) -> List[tuple]:
+        """(shape, times) for statements run at least ``threshold`` times, most repeated first."""
+        return [(shape, times) for shape, times in self.shapes.most_common() if times >= threshold]
+
+
+class QueryTracker:
+    """
+    Counts SQL statements and database time per request through engine events.
+
+    Statements run while no request is being tracked (background tasks,
+    startup) are ignored. When a request finishes its totals go to the
+    Prometheus histograms, and any statement shape repeated at least
+    ``n_plus_one_threshold`` times is logged as a likely N+1 query.
+    Listeners (e.g. the query budget fixture in tests) get every finished
+    request's ``QueryStats``.
+    """
+
+    def __init__(self, threshold: int = None):
+        self.threshold = settings.n_plus_one_threshold if threshold is None else threshold
+        self._current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+        self._listeners: List[Callable[[QueryStats], None]] = []
+        self._lock = threading.Lock()
+        event.listen(engine, "before_cursor_execute", self._before_execute)
+        event.listen(engine, "after_cursor_execute", self._after_execute)
+
+    def current(self) -> Optional[QueryStats]:
+        return self._current.get()
+
+    def start(self, scope=None):
+        """Track statements for the current request; returns a token for ``finish``."""
+        return self._current.set(QueryStats(scope))
+
+    def finish(self, token, route: str) -> QueryStats:
+        stats = self._current.get()
+        self._current.reset(token)
+        stats.route = route
+        REQUEST_QUERIES.labels(route).observe(stats.count)
+        REQUEST_DB_SECONDS.labels(route).observe(stats.seconds)
+        repeated = stats.repeated(self.threshold) if self.threshold > 0 else []
+        if repeated:
+            N_PLUS_ONE.labels(route).inc()
+            for shape, times in repeated:
+                logger.warning(
+                    "Likely N+1 query: same statement run %d times in one request", times,
+                    extra={"route": route, "statement": shape[:500], "queries": stats.count}
+                )
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(stats)
+        return stats
+
+    def add_listener(self, listener: Callable[[QueryStats], None]):
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[QueryStats], None]):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if self._current.get() is not None:
+            context._query_started = time.perf_counter()
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        stats = self._current.get()
+        if stats is None:
+            return
+        stats.count += 1
+        stats.seconds += time.perf_counter() - getattr(context, "_query_started", time.perf_counter())
+        stats.shapes[statement_shape(statement)] += 1
+
+
+# Global instance
+query_tracker = QueryTracker()
+
+
+class QueryStatsMiddleware:
+    """
+    Tracks SQL statements per request. In debug mode the response carries
+    ``X-DB-Queries`` and ``X-DB-Time`` (milliseconds) for the statements run
+    before it started. Batch sub-requests count toward the batch.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or query_tracker.current() is not None:
+            await self.app(scope, receive, send)
+            return
+
+        token = query_tracker.start(scope)
+        stats = query_tracker.current()
+
+        async def send_with_stats(message):
+            if message["type"] == "http.response.start" and settings.debug:
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-db-queries", str(stats.count).encode()),
+                    (b"x-db-time", f"{stats.seconds * 1000:.2f}".encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            query_tracker.finish(token, route_template(scope))
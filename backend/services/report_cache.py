@@ -0,0 +1,66 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from config import get_settings
+from services.events import event_broker
+from services.metrics import cache_lookup
+
+settings = get_settings()
+
+# Change events that make cached reports stale
+INVALIDATING_ENTITIES = ("order.", "payment.", "expense.", "resync")
+
+
+class ReportCache:
+    """
+    Small in-process cache for report results.
+
+    Entries are dropped after ``report_cache_seconds`` and all of them are
+    invalidated by any order, payment or expense change event. A result
+    computed while a write was happening is returned but not stored, so a
+    stale report never outlives the write that made it stale.
+    """
+
+    def __init__(self, max_age: int = None, max_entries: int = None):
+        self.max_age = settings.report_cache_seconds if max_age is None else max_age
+        self.max_entries = max_entries or settings.report_cache_max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._generation = 0
+        event_broker.add_listener(self._on_event)
+
+    def _on_event(self, event: Dict[str, Any]):
+        if event["type"].startswith(INVALIDATING_ENTITIES):
+            self.invalidate()
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] <= self.max_age:
+                self._entries.move_to_end(key)
+                cache_lookup("report", True)
+                return entry[1]
+            generation = self._generation
+
+        cache_lookup("report", False)
+        value = compute()
+
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = (now, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return value
+
+
+# Global instance
+report_cache = ReportCache()
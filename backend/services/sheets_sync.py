@@ -0,0 +1,416 @@
+import asyncio
+import hashlib
+import logging
+import random
+import threading
+from datetime import datetime, timedelta
+from enum import Enum
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import delete, event, insert, or_, update
+from sqlmodel import Session, select
+
+from config import get_settings
+from database import engine
+from models import Client, Expense, Order, Payment, Product, SheetRow, SheetsOutbox
+from services.google_sheets import (
+    client_row, expense_row, order_row, payment_row, product_row, get_sheets_service
+)
+from services.metrics import SHEETS_SYNC_LAST_SUCCESS
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Mirrored models: tab name and row formatter
+SHEET_TABS = {
+    Client: ("Clients", client_row),
+    Order: ("Orders", order_row),
+    Payment: ("Payments", payment_row),
+    Expense: ("Expenses", expense_row),
+    Product: ("Products", product_row),
+}
+
+# Old-style delete markers: [id, "DELETED", deleted_at]; cleared by reconciliation
+DELETED_MARKER = "DELETED"
+
+ROW_WIDTH = 26  # A:Z
+BLANK_ROW = [""] * ROW_WIDTH
+
+# Ranges per values().batchUpdate call during reconciliation
+RECONCILE_UPDATE_CHUNK = 5000
+
+
+def normalize_cell(value: Any) -> str:
+    """A cell as text, so values written and values read back from Sheets compare equal."""
+    if value is None:
+        return ""
+    if isinstance(value, Enum):
+        value = value.value
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, (int, float)):
+        return format(float(value), ".10g")
+    return str(value)
+
+
+def row_checksum(row: List[Any]) -> str:
+    cells = [normalize_cell(value) for value in row]
+    while cells and cells[-1] == "":
+        cells.pop()  # Sheets drops trailing empty cells
+    return hashlib.blake2b("\x1f".join(cells).encode(), digest_size=16).hexdigest()
+
+
+def parse_entity_id(value: Any) -> Optional[UUID]:
+    try:
+        return UUID(str(value))
+    except ValueError:
+        return None
+
+
+class SheetsSyncError(Exception):
+    pass
+
+
+class SheetsSyncWorker:
+    """
+    Drains ``sheets_outbox`` into Google Sheets in the background.
+
+    Each drain claims up to ``sheets_sync_batch_size`` outbox rows (a lease
+    committed before Google Sheets is called, so no transaction or row lock
+    is held during the HTTP calls), keeps the last action per record and
+    loads the current state of changed records with one query per table. The ``sheet_rows`` index says where each record
+    already sits and what was written there: unchanged rows are skipped,
+    changed and deleted ones are overwritten (deleted ones with blanks) in a
+    single ``values().batchUpdate`` call, and new ones are appended with one
+    ``values().append`` call per tab. Drains run every
+    ``sheets_sync_interval_seconds``, or as soon as
+    ``sheets_sync_high_water_mark`` changes have been queued in this process.
+    Failed drains release their batch and are retried with exponential
+    backoff; a batch whose drain died is taken over once its lease is older
+    than ``sheets_sync_lease_seconds``. Outbox rows are only deleted once
+    pushed, so delivery is at least once (a retried append can duplicate
+    rows, which ``reconcile`` clears).
+    """
+
+    def __init__(self, sheets=None):
+        self._sheets = sheets
+        self.interval = settings.sheets_sync_interval_seconds
+        self.high_water_mark = settings.sheets_sync_high_water_mark
+        self.batch_size = settings.sheets_sync_batch_size
+        self.max_backoff = settings.sheets_sync_max_backoff_seconds
+        self.lease = settings.sheets_sync_lease_seconds
+        self._lock = threading.Lock()  # One drain or reconciliation at a time
+        self._queued = 0
+        self._queued_lock = threading.Lock()  # note_change runs on any thread
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def sheets(self):
+        if self._sheets is None:
+            self._sheets = get_sheets_service()
+        return self._sheets
+
+    async def start(self):
+        if not settings.sheets_sync_enabled:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._loop = None
+
+    def note_change(self):
+        """Count a queued change; wakes the worker at the high-water mark. Any thread."""
+        with self._queued_lock:
+            self._queued += 1
+            wake = self._queued >= self.high_water_mark
+        if wake and self._loop is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._wake.set)
+            except RuntimeError:
+                # Loop already closed during shutdown
+                pass
+
+    def drain_once(self) -> int:
+        """Push one batch of outbox rows; returns how many were handled (blocking)."""
+        with self._lock:
+            lease = self._claim()
+            if lease is None:
+                return 0
+            claimed_at, outbox = lease
+
+            # Last action per record wins; several updates become one row
+            latest: Dict[tuple, SheetsOutbox] = {}
+            for entry in outbox:
+                latest.pop((entry.sheet, entry.entity_id), None)
+                latest[(entry.sheet, entry.entity_id)] = entry
+
+            updates: List[Tuple[str, int, List[Any]]] = []
+            index_changes: List[Tuple[str, UUID, Optional[str]]] = []  # (sheet, record, new checksum or None to drop)
+            appends: Dict[str, List[Tuple[UUID, List[Any], str]]] = {}
+            with Session(engine) as session:
+                for model, (sheet, formatter) in SHEET_TABS.items():
+                    entries = [entry for (tab, _), entry in latest.items() if tab == sheet]
+                    if not entries:
+                        continue
+                    entity_ids = [entry.entity_id for entry in entries]
+                    indexed = {
+                        row.entity_id: row
+                        for row in session.exec(
+                            select(SheetRow).where(SheetRow.sheet == sheet, SheetRow.entity_id.in_(entity_ids))
+                        ).all()
+                    }
+                    upsert_ids = [entry.entity_id for entry in entries if entry.action == "upsert"]
+                    records = {}
+                    if upsert_ids:
+                        records = {
+                            record.id: record
+                            for record in session.exec(select(model).where(model.id.in_(upsert_ids))).all()
+                        }
+
+                    for entry in entries:
+                        known = indexed.get(entry.entity_id)
+                        record = records.get(entry.entity_id)
+                        if record is None:
+                            # Deleted (possibly after this change was queued)
+                            if known is not None:
+                                updates.append((sheet, known.row_number, BLANK_ROW))
+                                index_changes.append((sheet, entry.entity_id, None))
+                            continue
+                        row = formatter(record.model_dump())
+                        checksum = row_checksum(row)
+                        if known is None:
+                            appends.setdefault(sheet, []).append((record.id, row, checksum))
+                        elif known.checksum != checksum:
+                            updates.append((sheet, known.row_number, row))
+                            index_changes.append((sheet, record.id, checksum))
+
+            # No transaction is open while Google Sheets is called
+            appended: List[Tuple[str, List[Tuple[UUID, List[Any], str]], int]] = []
+            try:
+                if updates and not self.sheets.update_rows(updates):
+                    raise SheetsSyncError(f"Updating {len(updates)} rows failed")
+                for sheet, new_rows in appends.items():
+                    appended.append((sheet, new_rows, self._append_rows(sheet, new_rows)))
+            except Exception:
+                # Index what did land, and hand the batch straight back
+                self._finish(claimed_at, outbox, [], appended, done=False)
+                raise
+            self._finish(claimed_at, outbox, index_changes, appended, done=True)
+            return len(outbox)
+
+    def _claim(self) -> Optional[Tuple[datetime, List[SheetsOutbox]]]:
+        """Lease the next batch of outbox rows: ``(claimed_at, rows)``, or None if there is nothing to push."""
+        now = datetime.utcnow()
+        expired = now - timedelta(seconds=self.lease)
+        with Session(engine, expire_on_commit=False) as session:
+            # SKIP LOCKED lets several workers claim without taking the same rows (PostgreSQL);
+            # the locks only last until the claim commits
+            outbox = session.exec(
+                select(SheetsOutbox)
+                .where(or_(SheetsOutbox.claimed_at.is_(None), SheetsOutbox.claimed_at < expired))
+                .order_by(SheetsOutbox.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            ).all()
+            if not outbox:
+                return None
+            session.execute(
+                update(SheetsOutbox)
+                .where(SheetsOutbox.id.in_([entry.id for entry in outbox]))
+                .values(claimed_at=now)
+            )
+            session.commit()
+            return now, outbox
+
+    def _finish(
+        self,
+        claimed_at: datetime,
+        outbox: List[SheetsOutbox],
+        index_changes: List[Tuple[str, UUID, Optional[str]]],
+        appended: List[Tuple[str, List[Tuple[UUID, List[Any], str]], int]],
+        done: bool
+    ):
+        """
+        Record what reached the sheet in the ``sheet_rows`` index, then delete
+        the pushed outbox rows (``done``) or release them for the next drain.
+        Rows whose lease another drain took over are left to that drain.
+        """
+        ours = (SheetsOutbox.id.in_([entry.id for entry in outbox]), SheetsOutbox.claimed_at == claimed_at)
+        with Session(engine) as session:
+            for sheet, entity_id, checksum in index_changes:
+                if checksum is None:
+                    session.execute(delete(SheetRow).where(SheetRow.sheet == sheet, SheetRow.entity_id == entity_id))
+                else:
+                    session.execute(
+                        update(SheetRow)
+                        .where(SheetRow.sheet == sheet, SheetRow.entity_id == entity_id)
+                        .values(checksum=checksum)
+                    )
+            for sheet, new_rows, start in appended:
+                self._index_appended(session, sheet, new_rows, start)
+            if done:
+                session.execute(delete(SheetsOutbox).where(*ours))
+            else:
+                session.execute(update(SheetsOutbox).where(*ours).values(claimed_at=None))
+            session.commit()
+
+    def _append_rows(self, sheet: str, new_rows: List[Tuple[UUID, List[Any], str]]) -> int:
+        """Append rows to a tab; returns the row number the first one landed on."""
+        start = self.sheets.append_rows(sheet, [row for _, row, _ in new_rows])
+        if start is None:
+            raise SheetsSyncError(f"Appending {len(new_rows)} rows to {sheet} failed")
+        return start
+
+    @staticmethod
+    def _index_appended(session: Session, sheet: str, new_rows: List[Tuple[UUID, List[Any], str]], start: int):
+        for offset, (entity_id, _, checksum) in enumerate(new_rows):
+            session.merge(SheetRow(sheet=sheet, entity_id=entity_id, row_number=start + offset, checksum=checksum))
+
+    def _append(self, session: Session, sheet: str, new_rows: List[Tuple[UUID, List[Any], str]]):
+        """Append rows to a tab and index where they landed."""
+        self._index_appended(session, sheet, new_rows, self._append_rows(sheet, new_rows))
+
+    def reconcile(self, sheets: Optional[List[str]] = None) -> Dict[str, Dict[str, int]]:
+        """
+        Compare every tab with the database and push only the differences.
+
+        Reads each tab once and checksums its rows against the database
+        rows (the database wins). Changed rows are rewritten in place, rows
+        for deleted records, duplicates and old delete markers are blanked,
+        all in batched ``values().batchUpdate`` calls; missing records are
+        appended in one call per tab. The ``sheet_rows`` index is then
+        rebuilt from what is on the sheet. Returns counts per tab.
+        """
+        with self._lock, Session(engine) as session:
+            updates: List[Tuple[str, int, List[Any]]] = []
+            appends: Dict[str, List[Tuple[UUID, List[Any], str]]] = {}
+            indexes: Dict[str, Dict[UUID, Tuple[int, str]]] = {}
+            report: Dict[str, Dict[str, int]] = {}
+
+            for model, (sheet, formatter) in SHEET_TABS.items():
+                if sheets and sheet not in sheets:
+                    continue
+                rows = self.sheets.read_rows(sheet)
+                if rows is None:
+                    raise SheetsSyncError(f"Reading {sheet} failed")
+
+                on_sheet: Dict[UUID, Tuple[int, str]] = {}
+                blank = []
+                for number, row in enumerate(rows, start=1):
+                    entity_id = parse_entity_id(row[0]) if row else None
+                    if entity_id is None:
+                        continue  # Header, blank or hand-written rows are left alone
+                    if len(row) > 1 and row[1] == DELETED_MARKER:
+                        blank.append(number)
+                        continue
+                    if entity_id in on_sheet:
+                        blank.append(on_sheet[entity_id][0])  # Keep the last copy
+                    on_sheet[entity_id] = (number, row_checksum(row))
+
+                counts = {"sheet_rows": len(on_sheet), "records": 0, "unchanged": 0, "updated": 0, "appended": 0, "cleared": 0}
+                index = {}
+                for record in session.exec(select(model)).all():
+                    counts["records"] += 1
+                    row = formatter(record.model_dump())
+                    checksum = row_checksum(row)
+                    found = on_sheet.pop(record.id, None)
+                    if found is None:
+                        appends.setdefault(sheet, []).append((record.id, row, checksum))
+                        counts["appended"] += 1
+                        continue
+                    number, sheet_checksum = found
+                    if sheet_checksum == checksum:
+                        counts["unchanged"] += 1
+                    else:
+                        updates.append((sheet, number, row))
+                        counts["updated"] += 1
+                    index[record.id] = (number, checksum)
+
+                # Whatever is left on the sheet no longer exists in the database
+                blank.extend(number for number, _ in on_sheet.values())
+                updates.extend((sheet, number, BLANK_ROW) for number in blank)
+                counts["cleared"] = len(blank)
+                indexes[sheet] = index
+                report[sheet] = counts
+
+            for start in range(0, len(updates), RECONCILE_UPDATE_CHUNK):
+                chunk = updates[start:start + RECONCILE_UPDATE_CHUNK]
+                if not self.sheets.update_rows(chunk):
+                    raise SheetsSyncError(f"Updating {len(chunk)} rows failed")
+
+            for sheet, index in indexes.items():
+                session.execute(delete(SheetRow).where(SheetRow.sheet == sheet))
+                if index:
+                    session.execute(
+                        insert(SheetRow),
+                        [
+                            {"sheet": sheet, "entity_id": entity_id, "row_number": number, "checksum": checksum}
+                            for entity_id, (number, checksum) in index.items()
+                        ]
+                    )
+            for sheet, new_rows in appends.items():
+                self._append(session, sheet, new_rows)
+            session.commit()
+            return report
+
+    async def _run(self):
+        failures = 0
+        while True:
+            try:
+                handled = await asyncio.to_thread(self.drain_once)
+            except Exception as e:
+                failures += 1
+                delay = min(self.max_backoff, self.interval * 2 ** (failures - 1))
+                delay *= random.uniform(0.5, 1.0)  # Jitter so workers do not retry in step
+                logger.warning("Google Sheets sync failed (%d in a row), retrying in %.0fs: %s", failures, delay, e)
+                await asyncio.sleep(delay)
+                continue
+            failures = 0
+            SHEETS_SYNC_LAST_SUCCESS.set_to_current_time()
+            if handled >= self.batch_size:
+                continue  # More waiting
+            with self._queued_lock:
+                self._queued = 0
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+# Global instance
+sheets_sync_worker = SheetsSyncWorker()
+
+
+def _enqueue(action: str):
+    def listener(mapper, connection, target):
+        connection.execute(
+            SheetsOutbox.__table__.insert().values(
+                sheet=SHEET_TABS[mapper.class_][0],
+                entity_id=target.id,
+                action=action,
+                created_at=datetime.utcnow()
+            )
+        )
+        sheets_sync_worker.note_change()
+    return listener
+
+
+if settings.sheets_sync_enabled:
+    # Same transaction as the change itself: rolled back together, committed together
+    for _model in SHEET_TABS:
+        event.listen(_model, "after_insert", _enqueue("upsert"))
+        event.listen(_model, "after_update", _enqueue("upsert"))
+        event.listen(_model, "after_delete", _enqueue("delete"))
@@ -0,0 +1,172 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event
+
+from config import get_settings
+from database import engine
+from services.query_stats import query_tracker, statement_shape
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Longest parameter text kept with a slow statement
+MAX_PARAMETERS_LENGTH = 1000
+
+# A statement's plan is captured again once it is older than this
+EXPLAIN_REFRESH_SECONDS = 600
+
+
+class StatementStats:
+    """Totals for one statement shape, like a pg_stat_statements row."""
+
+    def __init__(self, shape: str):
+        self.shape = shape
+        self.calls = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.slow_calls = 0
+        self.last_slow: Optional[Dict[str, Any]] = None
+        self.plan: Optional[str] = None
+        self.plan_error: Optional[str] = None
+        self.plan_captured_at = 0.0
+        self.plan_pending = False
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "statement": self.shape,
+            "calls": self.calls,
+            "total_ms": round(self.total_seconds * 1000, 2),
+            "mean_ms": round(self.total_seconds * 1000 / self.calls, 3) if self.calls else 0,
+            "max_ms": round(self.max_seconds * 1000, 2),
+            "slow_calls": self.slow_calls,
+            "last_slow": self.last_slow,
+            "plan": self.plan,
+            "plan_error": self.plan_error,
+        }
+
+
+class SlowQueryLog:
+    """
+    Times every statement run through ``database.engine``.
+
+    All statements are aggregated by shape (calls, total, mean and max
+    time), so the worst offenders can be ranked by total time. Statements
+    slower than ``slow_query_ms`` are also logged with their parameters,
+    duration and route, and their plan is captured on a background thread:
+    ``EXPLAIN QUERY PLAN`` on SQLite, ``EXPLAIN`` (``ANALYZE`` if
+    ``slow_query_explain_analyze``, in a rolled back transaction) on
+    PostgreSQL. Only SELECT statements are explained. Figures are kept
+    per worker, for at most ``slow_query_max_statements`` shapes.
+    """
+
+    def __init__(self, threshold_ms: float = None, max_statements: int = None):
+        self.threshold = (settings.slow_query_ms if threshold_ms is None else threshold_ms) / 1000
+        self.max_statements = max_statements or settings.slow_query_max_statements
+        self.analyze = settings.slow_query_explain_analyze
+        self.since = datetime.utcnow()
+        self._lock = threading.Lock()
+        self._statements: Dict[str, StatementStats] = {}
+        self._explainer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="explain")
+        self._explaining = threading.local()
+        if self.threshold > 0:
+            event.listen(engine, "before_cursor_execute", self._before_execute)
+            event.listen(engine, "after_cursor_execute", self._after_execute)
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        context._slow_log_started = time.perf_counter()
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if getattr(self._explaining, "active", False):
+            return
+        started = getattr(context, "_slow_log_started", None)
+        if started is None:
+            # Listener attached mid-statement, or a cursor we never timed
+            return
+        elapsed = time.perf_counter() - started
+        shape = statement_shape(statement)
+        slow = elapsed >= self.threshold
+        if slow:
+            request = query_tracker.current()
+            route = request.current_route() if request is not None else "background"
+            parameters_text = repr(parameters)[:MAX_PARAMETERS_LENGTH]
+            last_slow = {
+                "at": datetime.utcnow().isoformat(),
+                "duration_ms": round(elapsed * 1000, 2),
+                "route": route,
+                "parameters": parameters_text,
+            }
+        with self._lock:
+            stats = self._statements.get(shape)
+            if stats is None:
+                if len(self._statements) >= self.max_statements:
+                    # Make room by dropping the statement with the least total time
+                    del self._statements[min(self._statements.values(), key=lambda s: s.total_seconds).shape]
+                stats = self._statements[shape] = StatementStats(shape)
+            stats.calls += 1
+            stats.total_seconds += elapsed
+            stats.max_seconds = max(stats.max_seconds, elapsed)
+            if not slow:
+                return
+            stats.slow_calls += 1
+            explain = (
+                not stats.plan_pending
+                and time.monotonic() - stats.plan_captured_at > EXPLAIN_REFRESH_SECONDS
+                and statement.lstrip().upper().startswith(("SELECT", "WITH"))
+                and not executemany
+            )
+            if explain:
+                stats.plan_pending = True
+            stats.last_slow = last_slow
+
+        logger.warning(
+            "Slow query: %.1f ms", elapsed * 1000,
+            extra={"route": route, "statement": statement[:2000], "parameters": parameters_text}
+        )
+        if explain:
+            self._explainer.submit(self._capture_plan, stats, statement, parameters)
+
+    def _capture_plan(self, stats: StatementStats, statement: str, parameters):
+        self._explaining.active = True
+        try:
+            with engine.connect() as connection:
+                if connection.dialect.name == "postgresql":
+                    options = "ANALYZE, BUFFERS" if self.analyze else "COSTS"
+                    rows = connection.exec_driver_sql(f"EXPLAIN ({options}) {statement}", parameters).all()
+                    plan = "\n".join(row[0] for row in rows)
+                    connection.rollback()  # ANALYZE runs the statement; leave nothing behind
+                else:
+                    rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+                    plan = "\n".join(str(row[-1]) for row in rows)
+            stats.plan, stats.plan_error = plan, None
+        except Exception as e:
+            stats.plan_error = str(e)
+        finally:
+            stats.plan_captured_at = time.monotonic()
+            stats.plan_pending = False
+            self._explaining.active = False
+
+    def top(self, limit: int = 20, sort: str = "total", slow_only: bool = False) -> List[Dict[str, Any]]:
+        keys = {
+            "total": lambda s: s.total_seconds,
+            "mean": lambda s: s.total_seconds / s.calls,
+            "max": lambda s: s.max_seconds,
+            "calls": lambda s: s.calls,
+        }
+        with self._lock:
+            statements = [s for s in self._statements.values() if s.slow_calls or not slow_only]
+            statements.sort(key=keys[sort], reverse=True)
+            return [s.as_dict() for s in statements[:limit]]
+
+    def reset(self):
+        with self._lock:
+            self._statements.clear()
+            self.since = datetime.utcnow()
+
+
+# Global instance
+slow_query_log = SlowQueryLog()
@@ -0,0 +1,89 @@
+"""
+Shared fixtures. Tests run against a throwaway SQLite database (or
+TEST_DATABASE_URL) with tables created by the app on startup; the
+DATABASE_URL in .env is never used, and PDFs are written to a temporary
+INVOICE_DIR. The Sheets sync records changes in the outbox against the
+in-memory fake; its background worker never drains on its own, tests
+drain explicitly.
+"""
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+_database_dir = tempfile.mkdtemp(prefix="copyapp-tests-")
+os.environ["DATABASE_URL"] = os.environ.get("TEST_DATABASE_URL", f"sqlite:///{_database_dir}/test.db")
+os.environ["AUTO_CREATE_TABLES"] = "true"
+# Invoices and receipts rendered by tests stay out of the source tree
+os.environ["INVOICE_DIR"] = f"{_database_dir}/invoices"
+os.environ["SHEETS_SYNC_ENABLED"] = "true"
+os.environ["SHEETS_BACKEND"] = "fake"
+os.environ["SHEETS_SYNC_INTERVAL_SECONDS"] = "86400"
+os.environ["SHEETS_SYNC_HIGH_WATER_MARK"] = "1000000"
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    import main
+
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(scope="session")
+def auth_headers(client):
+    from sqlmodel import Session
+
+    from database import engine
+    from models import User
+    from utils.auth import create_access_token, get_password_hash
+
+    with Session(engine) as session:
+        user = User(email="admin@example.com", full_name="Test Admin", role="admin", hashed_password=get_password_hash("secret"))
+        session.add(user)
+        session.commit()
+        session.refresh(user)
+        token = create_access_token({"sub": str(user.id)})
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def query_budget():
+    """
+    Fail if a request made inside the block runs more SQL statements than allowed.
+
+        with query_budget(4):
+            client.get("/api/v1/leaders/", headers=auth_headers)
+
+    Every request in the block is checked on its own; the failure lists the
+    statements of the request that went over.
+    """
+    from services.query_stats import query_tracker
+
+    @contextmanager
+    def budget(max_queries: int):
+        finished = []
+        listener = finished.append
+        query_tracker.add_listener(listener)
+        try:
+            yield finished
+        finally:
+            query_tracker.remove_listener(listener)
+        assert finished, "No request was made inside the query budget block"
+        for stats in finished:
+            if stats.count > max_queries:
+                statements = "\n".join(f"  {times}x {shape[:200]}" for shape, times in stats.shapes.most_common())
+                pytest.fail(
+                    f"{stats.route} ran {stats.count} SQL statements, budget is {max_queries}:\n{statements}",
+                    pytrace=False
+                )
+
+    return budget
@@ -0,0 +1,48 @@
+"""
+Authentication of the event stream: browsers open it with a short-lived
+stream token, and access tokens never go in the URL.
+"""
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+from jose import jwt
+
+from utils.auth import STREAM_TOKEN_SCOPE, create_access_token, get_current_user_for_stream
+
+
+@pytest.fixture
+def stream_token(client, auth_headers):
+    response = client.post("/api/v1/events/token", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["expires_in"] == 60
+    return response.json()["stream_token"]
+
+
+def test_stream_token_opens_stream(stream_token):
+    user = get_current_user_for_stream(token=None, stream_token=stream_token)
+
+    assert user.email == "admin@example.com"
+
+
+def test_stream_token_is_not_an_access_token(client, stream_token):
+    response = client.get("/api/v1/orders/", headers={"Authorization": f"Bearer {stream_token}"})
+
+    assert response.status_code == 401
+
+
+def test_access_token_is_refused_in_the_url(client, auth_headers):
+    access_token = auth_headers["Authorization"].removeprefix("Bearer ")
+
+    assert client.get(f"/api/v1/events?stream_token={access_token}").status_code == 401
+    assert client.get(f"/api/v1/events?access_token={access_token}").status_code == 401
+
+
+def test_expired_stream_token_is_refused(stream_token):
+    user_id = jwt.get_unverified_claims(stream_token)["sub"]
+    expired = create_access_token({"sub": user_id, "scope": STREAM_TOKEN_SCOPE}, expires_delta=timedelta(seconds=-1))
+
+    with pytest.raises(HTTPException) as rejected:
+        get_current_user_for_stream(token=None, stream_token=expired)
+
+    assert rejected.value.status_code == 401
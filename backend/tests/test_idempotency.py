@@ -0,0 +1,177 @@
+"""
+Idempotency-Key handling on POST /orders: replays, conflicts, released
+keys, keys scoped per user, a failed initial payment, and a committed
+write whose response was never stored.
+"""
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+from sqlmodel import Session, func, select
+
+from database import engine
+from models import Client, ClientType, IdempotencyKey, Order, OrderCreate, Payment, User
+from utils import idempotency
+from utils.auth import create_access_token, get_password_hash
+
+
+@pytest.fixture(scope="module")
+def leader_id(client):
+    with Session(engine) as session:
+        leader = Client(name="Idempotent School", type=ClientType.SCHOOL, contact="0301", address="Lahore")
+        session.add(leader)
+        session.commit()
+        return str(leader.id)
+
+
+def order_body(leader_id: str, total: float = 500) -> dict:
+    return {
+        "leaderId": leader_id,
+        "totalAmount": total,
+        "items": [{"itemDescription": "Register", "quantity": 1, "unitPrice": total, "totalPrice": total}],
+    }
+
+
+def order_count() -> int:
+    with Session(engine) as session:
+        return session.exec(select(func.count()).select_from(Order)).one()
+
+
+def stored_key(key: str):
+    with Session(engine) as session:
+        return session.exec(select(IdempotencyKey).where(IdempotencyKey.key == key)).first()
+
+
+def post_order(client, auth_headers, key: str, body: dict):
+    return client.post("/api/v1/orders/", json=body, headers={**auth_headers, "Idempotency-Key": key})
+
+
+def test_retry_replays_stored_response(client, auth_headers, leader_id):
+    key = uuid.uuid4().hex
+    before = order_count()
+
+    first = post_order(client, auth_headers, key, order_body(leader_id))
+    retry = post_order(client, auth_headers, key, order_body(leader_id))
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.json() == first.json()
+    assert retry.headers.get(idempotency.REPLAY_HEADER) == "true"
+    assert idempotency.REPLAY_HEADER not in first.headers
+    assert order_count() == before + 1
+
+
+def test_different_body_is_rejected(client, auth_headers, leader_id):
+    key = uuid.uuid4().hex
+    assert post_order(client, auth_headers, key, order_body(leader_id, 500)).status_code == 201
+
+    response = post_order(client, auth_headers, key, order_body(leader_id, 750))
+
+    assert response.status_code == 422
+
+
+def test_concurrent_duplicate_gets_409(client, auth_headers, leader_id):
+    key = uuid.uuid4().hex
+    body = order_body(leader_id)
+    with Session(engine) as session:
+        user = session.exec(select(User).where(User.email == "admin@example.com")).one()
+        # What a request still running its write leaves behind
+        session.add(IdempotencyKey(
+            key=key,
+            user_id=user.id,
+            scope="POST /orders",
+            request_hash=idempotency.request_hash("POST /orders", OrderCreate.model_validate(body)),
+            expires_at=datetime.utcnow() + timedelta(hours=1)
+        ))
+        session.commit()
+    before = order_count()
+
+    response = post_order(client, auth_headers, key, body)
+
+    assert response.status_code == 409
+    assert response.headers["Retry-After"] == "1"
+    assert order_count() == before
+
+
+def test_failed_handler_releases_key(client, auth_headers, leader_id):
+    key = uuid.uuid4().hex
+
+    response = post_order(client, auth_headers, key, order_body(str(uuid.uuid4())))
+
+    assert response.status_code == 404
+    assert stored_key(key) is None
+    assert post_order(client, auth_headers, key, order_body(leader_id)).status_code == 201
+
+
+def test_failed_initial_payment_rolls_back_order(client, auth_headers, leader_id):
+    key = uuid.uuid4().hex
+    body = {**order_body(leader_id), "initialPayment": 200}
+    before = order_count()
+
+    def payment_insert_fails(mapper, connection, target):
+        raise RuntimeError("payment insert failed")
+
+    event.listen(Payment, "before_insert", payment_insert_fails)
+    try:
+        response = post_order(client, auth_headers, key, body)
+    finally:
+        event.remove(Payment, "before_insert", payment_insert_fails)
+
+    assert response.status_code == 400
+    assert order_count() == before
+    assert stored_key(key) is None
+
+    retry = post_order(client, auth_headers, key, body)
+
+    assert retry.status_code == 201
+    assert retry.json()["paid_amount"] == 200
+    with Session(engine) as session:
+        assert session.exec(select(Payment).where(Payment.order_id == uuid.UUID(retry.json()["id"]))).one().amount == 200
+
+
+def test_keys_are_scoped_per_user(client, auth_headers, leader_id):
+    with Session(engine) as session:
+        other = User(email="other@example.com", full_name="Other User", role="user", hashed_password=get_password_hash("secret"))
+        session.add(other)
+        session.commit()
+        other_headers = {"Authorization": f"Bearer {create_access_token({'sub': str(other.id)})}"}
+    key = uuid.uuid4().hex
+    before = order_count()
+
+    mine = post_order(client, auth_headers, key, order_body(leader_id, 500))
+    theirs = post_order(client, other_headers, key, order_body(leader_id, 750))
+
+    assert mine.status_code == theirs.status_code == 201
+    assert mine.json()["id"] != theirs.json()["id"]
+    assert idempotency.REPLAY_HEADER not in theirs.headers
+    assert order_count() == before + 2
+
+
+def test_committed_write_is_never_repeated(client, auth_headers, leader_id, monkeypatch):
+    key = uuid.uuid4().hex
+    before = order_count()
+
+    def lost_response(*args):
+        raise RuntimeError("worker died before storing the response")
+
+    monkeypatch.setattr(idempotency, "_store", lost_response)
+    with pytest.raises(RuntimeError):
+        post_order(client, auth_headers, key, order_body(leader_id))
+    monkeypatch.undo()
+
+    # The key was marked completed in the order's own transaction
+    key_row = stored_key(key)
+    assert key_row.status_code == 201 and key_row.response_body is None
+    assert order_count() == before + 1
+
+    # Even once the reservation is old enough to count as abandoned
+    with Session(engine) as session:
+        key_row = session.exec(select(IdempotencyKey).where(IdempotencyKey.key == key)).one()
+        key_row.created_at -= idempotency.IN_PROGRESS_TIMEOUT * 2
+        session.add(key_row)
+        session.commit()
+
+    retry = post_order(client, auth_headers, key, order_body(leader_id))
+
+    assert retry.status_code == 409
+    assert order_count() == before + 1
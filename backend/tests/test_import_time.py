@@ -0,0 +1,50 @@
+"""
+Import-time budget for the app.
+
+Runs ``python -X importtime -c "import main"`` in a fresh interpreter and
+checks that heavy libraries stay out of startup and that importing ``main``
+stays under ``IMPORT_BUDGET_MS`` (default 2500 ms of cumulative import time).
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Loaded on first use (PDFs, QR codes, Google Sheets, analytics), never at startup
+LAZY_MODULES = ("reportlab", "qrcode", "PIL", "googleapiclient", "google.oauth2", "numpy")
+
+IMPORT_BUDGET_MS = float(os.environ.get("IMPORT_BUDGET_MS", "2500"))
+
+
+def import_times():
+    env = dict(os.environ, DATABASE_URL="sqlite://")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    # Lines look like "import time:   self [us] |  cumulative | imported package"
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_heavy_modules_are_not_imported_at_startup():
+    times = import_times()
+    loaded = sorted(
+        name for name in times
+        if any(name == lazy or name.startswith(lazy + ".") for lazy in LAZY_MODULES)
+    )
+    assert not loaded, f"Imported at startup: {loaded}"
+
+
+def test_main_imports_within_budget():
+    milliseconds = import_times()["main"] / 1000
+    assert milliseconds <= IMPORT_BUDGET_MS, (
+        f"Importing main took {milliseconds:.0f} ms, budget is {IMPORT_BUDGET_MS:.0f} ms"
+    )
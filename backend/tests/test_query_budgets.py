@@ -0,0 +1,91 @@
+"""
+SQL statement budgets per endpoint. Each endpoint is called with enough
+rows that a per-row query (N+1) would blow its budget.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from services.query_stats import statement_shape
+
+ORDERS = 8
+PAYMENTS_PER_ORDER = 3
+
+
+@pytest.fixture(scope="module")
+def leader_id(client):
+    from sqlmodel import Session
+
+    from database import engine
+    from models import Client, ClientType, Order, OrderStatus, Payment, PaymentMode, PaymentStatus
+
+    with Session(engine) as session:
+        leader = Client(name="Budget School", type=ClientType.SCHOOL, contact="0300", address="Karachi")
+        session.add(leader)
+        session.flush()
+        start = datetime(2025, 1, 1)
+        for number in range(ORDERS):
+            order = Order(
+                order_number=f"BUDGET-{number}",
+                client_id=leader.id,
+                total_amount=1000,
+                paid_amount=PAYMENTS_PER_ORDER * 100,
+                balance=1000 - PAYMENTS_PER_ORDER * 100,
+                status=OrderStatus.PARTIALLY_PAID,
+                order_date=start + timedelta(days=number)
+            )
+            session.add(order)
+            session.flush()
+            for index in range(PAYMENTS_PER_ORDER):
+                session.add(Payment(
+                    amount=100,
+                    mode=PaymentMode.CASH,
+                    status=PaymentStatus.COMPLETED,
+                    client_id=leader.id,
+                    order_id=order.id,
+                    payment_date=start + timedelta(days=number, hours=index)
+                ))
+        session.add(Payment(
+            amount=50, mode=PaymentMode.CASH, status=PaymentStatus.COMPLETED,
+            client_id=leader.id, payment_date=start
+        ))
+        session.commit()
+        return str(leader.id)
+
+
+@pytest.mark.parametrize("path, budget", [
+    ("/api/v1/leaders/", 3),
+    ("/api/v1/leaders/{leader_id}/ledger", 8),
+    ("/api/v1/leaders/{leader_id}/payments", 6),
+    ("/api/v1/leaders/{leader_id}/payments/export", 6),
+    ("/api/v1/leaders/{leader_id}/summary", 8),
+    ("/api/v1/orders/", 5),
+    ("/api/v1/payments/", 4),
+    ("/api/v1/dashboard/stats?fresh=true", 6),
+])
+def test_endpoint_query_budget(client, auth_headers, query_budget, leader_id, path, budget):
+    with query_budget(budget):
+        response = client.get(path.format(leader_id=leader_id), headers=auth_headers)
+    assert response.status_code == 200
+
+
+def test_statement_shape_collapses_in_lists():
+    assert statement_shape("SELECT * FROM orders WHERE id IN (?, ?, ?)") == "SELECT * FROM orders WHERE id IN (?...)"
+    assert statement_shape("WHERE id IN (%(id_1_1)s, %(id_1_2)s)") == "WHERE id IN (?...)"
+    assert statement_shape("WHERE id = ?") == "WHERE id = ?"
+
+
+def test_repeated_statements_are_flagged(client, caplog):
+    from sqlalchemy import text
+
+    from database import engine
+    from services.query_stats import query_tracker
+
+    token = query_tracker.start()
+    with engine.connect() as connection:
+        for number in range(query_tracker.threshold):
+            connection.execute(text("SELECT :number"), {"number": number})
+    with caplog.at_level("WARNING", logger="services.query_stats"):
+        stats = query_tracker.finish(token, "/test")
+    assert stats.count == query_tracker.threshold
+    assert any("N+1" in record.getMessage() for record in caplog.records)
@@ -0,0 +1,229 @@
+"""
+Google Sheets sync through the outbox: changes are queued in the write's
+own transaction, and drains push them to a FakeSheetsService.
+Reconciliation repairs a sheet that drifted from the database.
+"""
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import delete, update
+from sqlmodel import Session, func, select
+
+from database import engine
+from models import Client, ClientType, Expense, ExpenseCategory, SheetRow, SheetsOutbox
+from services.google_sheets import FakeSheetsService
+from services.sheets_sync import BLANK_ROW, DELETED_MARKER, SheetsSyncError, SheetsSyncWorker, sheets_sync_worker
+
+EXPENSES_HEADER = ["ID", "Category", "Amount", "Description", "Date", "Created At"]
+
+
+@pytest.fixture
+def fake(client):
+    """A fake spreadsheet and an empty outbox (other tests' writes queue changes too)."""
+    with Session(engine) as session:
+        session.execute(delete(SheetsOutbox))
+        session.execute(delete(SheetRow))
+        session.commit()
+    return FakeSheetsService()
+
+
+@pytest.fixture
+def worker(fake):
+    return SheetsSyncWorker(sheets=fake)
+
+
+def outbox_rows():
+    with Session(engine) as session:
+        return session.exec(select(SheetsOutbox).order_by(SheetsOutbox.id)).all()
+
+
+def sheet_row_count() -> int:
+    with Session(engine) as session:
+        return session.exec(select(func.count()).select_from(SheetRow)).one()
+
+
+def add_client(name: str) -> Client:
+    with Session(engine) as session:
+        leader = Client(name=name, type=ClientType.SCHOOL, contact="0302", address="Multan")
+        session.add(leader)
+        session.commit()
+        session.refresh(leader)
+        return leader
+
+
+def rename_client(client_id, name: str):
+    with Session(engine) as session:
+        leader = session.get(Client, client_id)
+        leader.name = name
+        session.add(leader)
+        session.commit()
+
+
+def test_api_write_queues_change(client, auth_headers, fake):
+    response = client.post("/api/v1/expenses/", headers=auth_headers, json={
+        "category": "PAPER", "amount": 120, "description": "A4 reams", "expenseDate": "2025-03-01"
+    })
+    assert response.status_code == 201
+
+    queued = outbox_rows()
+    assert [(row.sheet, str(row.entity_id), row.action) for row in queued] == [
+        ("Expenses", response.json()["id"], "upsert")
+    ]
+
+
+def test_rolled_back_write_queues_nothing(fake):
+    with Session(engine) as session:
+        session.add(Expense(category=ExpenseCategory.PAPER, amount=80, description="Toner"))
+        session.flush()
+        # Queued by the flush, inside the write's transaction
+        assert session.exec(select(func.count()).select_from(SheetsOutbox)).one() == 1
+        session.rollback()
+
+    assert outbox_rows() == []
+
+
+def test_drain_collapses_updates_and_appends_once_per_tab(fake, worker):
+    first = add_client("Outbox School")
+    for name in ("Outbox School 2", "Outbox School 3"):
+        rename_client(first.id, name)
+    second = add_client("Outbox College")
+    with Session(engine) as session:
+        session.add(Expense(category=ExpenseCategory.STAFF, amount=300, description="Wages"))
+        session.commit()
+
+    assert worker.drain_once() == 5
+
+    # One append per tab, no separate update for the renames
+    assert fake.calls == 2
+    clients = fake.sheets["Clients"]
+    assert [(row[0], row[1]) for row in clients] == [
+        (str(first.id), "Outbox School 3"),
+        (str(second.id), "Outbox College"),
+    ]
+    assert len(fake.sheets["Expenses"]) == 1
+    assert outbox_rows() == []
+    assert sheet_row_count() == 3
+
+    # A later change rewrites the record's row in place
+    rename_client(second.id, "Outbox College 2")
+    assert worker.drain_once() == 1
+    assert fake.calls == 3
+    assert [row[1] for row in fake.sheets["Clients"]] == ["Outbox School 3", "Outbox College 2"]
+
+
+def test_failed_drain_keeps_outbox(fake, worker):
+    leader = add_client("Retry School")
+    queued = [row.id for row in outbox_rows()]
+    fake.fail_next()
+
+    with pytest.raises(SheetsSyncError):
+        worker.drain_once()
+
+    assert [row.id for row in outbox_rows()] == queued
+    assert "Clients" not in fake.sheets
+    assert sheet_row_count() == 0
+
+    assert worker.drain_once() == len(queued)
+    assert [row[0] for row in fake.sheets["Clients"]] == [str(leader.id)]
+    assert outbox_rows() == []
+
+
+def test_sheets_is_called_outside_the_claim_transaction(fake, worker):
+    leader = add_client("Lease School")
+    seen = {}
+
+    class ObservingSheets(FakeSheetsService):
+        def append_rows(self, sheet_name, rows):
+            # The claim is committed, so other connections see it and
+            # another drain finds nothing left to take
+            seen["claimed"] = [row.claimed_at is not None for row in outbox_rows()]
+            seen["other_drain"] = SheetsSyncWorker(sheets=FakeSheetsService()).drain_once()
+            return super().append_rows(sheet_name, rows)
+
+    sheets = ObservingSheets()
+    assert SheetsSyncWorker(sheets=sheets).drain_once() == 1
+
+    assert seen == {"claimed": [True], "other_drain": 0}
+    assert [row[0] for row in sheets.sheets["Clients"]] == [str(leader.id)]
+    assert outbox_rows() == []
+
+
+def test_expired_claim_is_taken_over(fake, worker):
+    add_client("Abandoned School")
+    with Session(engine) as session:
+        # Claimed by a drain that died before pushing
+        session.execute(update(SheetsOutbox).values(claimed_at=datetime.utcnow()))
+        session.commit()
+
+    assert worker.drain_once() == 0
+
+    with Session(engine) as session:
+        session.execute(update(SheetsOutbox).values(
+            claimed_at=datetime.utcnow() - timedelta(seconds=worker.lease + 1)
+        ))
+        session.commit()
+
+    assert worker.drain_once() == 1
+    assert len(fake.sheets["Clients"]) == 1
+    assert outbox_rows() == []
+
+
+def test_note_change_counts_from_many_threads(worker):
+    def note_changes():
+        for _ in range(5000):
+            worker.note_change()
+
+    threads = [threading.Thread(target=note_changes) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert worker._queued == 40000
+
+
+def test_reconcile_repairs_drift_with_few_calls(client, auth_headers, fake, worker, monkeypatch):
+    records = 5
+    with Session(engine) as session:
+        session.execute(delete(Expense))
+        for number in range(records):
+            session.add(Expense(category=ExpenseCategory.PAPER, amount=100 + number, description=f"Ream {number}"))
+        session.commit()
+    fake.sheets["Expenses"] = [EXPENSES_HEADER]
+    worker.drain_once()
+    synced = [list(row) for row in fake.sheets["Expenses"]]
+
+    # Drift: a hand-edited cell, a duplicated row and an old-style delete marker
+    sheet = fake.sheets["Expenses"]
+    sheet[2][3] = "Edited by hand"
+    sheet.append(list(sheet[4]))
+    sheet.append([str(uuid.uuid4()), DELETED_MARKER, "2024-01-01 00:00:00"])
+    monkeypatch.setattr(sheets_sync_worker, "_sheets", fake)
+    calls = fake.calls
+
+    response = client.post("/api/v1/sheets/reconcile?sheet=Expenses", headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.json()["sheets"] == {"Expenses": {
+        "sheet_rows": records, "records": records, "unchanged": records - 1,
+        "updated": 1, "appended": 0, "cleared": 2,
+    }}
+    # One read and one batched update, nothing appended
+    assert fake.calls == calls + 2
+    blank = [""] * len(BLANK_ROW)
+    assert fake.sheets["Expenses"] == (
+        synced[:4] + [blank] + synced[5:] + [synced[4], blank]
+    )
+    assert sheet_row_count() == records
+
+    # A second pass finds nothing to write
+    calls = fake.calls
+    again = client.post("/api/v1/sheets/reconcile?sheet=Expenses", headers=auth_headers)
+
+    assert again.json()["sheets"]["Expenses"] == {
+        "sheet_rows": records, "records": records, "unchanged": records,
+        "updated": 0, "appended": 0, "cleared": 0,
+    }
+    assert fake.calls == calls + 1
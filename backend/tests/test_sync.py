@@ -0,0 +1,96 @@
+"""
+GET /sync pages through changes by (updated_at, id): a full snapshot
+first, then deltas with deletions, until ``has_more`` is false.
+"""
+from datetime import datetime
+
+import pytest
+from sqlmodel import Session
+
+from database import engine
+from models import Client, ClientType, Order, OrderStatus
+from routers import sync
+
+ORDERS = 7
+
+
+@pytest.fixture(scope="module")
+def order_ids(client):
+    with Session(engine) as session:
+        leader = Client(name="Sync School", type=ClientType.SCHOOL, contact="0303", address="Quetta")
+        session.add(leader)
+        session.flush()
+        orders = [
+            Order(
+                order_number=f"SYNC-{number}", client_id=leader.id, total_amount=100,
+                balance=100, status=OrderStatus.PENDING, order_date=datetime(2025, 2, 1)
+            )
+            for number in range(ORDERS)
+        ]
+        session.add_all(orders)
+        session.commit()
+        return [str(order.id) for order in orders]
+
+
+@pytest.fixture
+def no_overlap(monkeypatch):
+    """Exact windows between passes, so a delta holds only what the test changed."""
+    monkeypatch.setattr(sync.settings, "sync_cursor_overlap_seconds", 0)
+
+
+def pull(client, auth_headers, cursor=None, limit=3):
+    """Every page of one pass: the pages and the cursor to catch up from next time."""
+    pages = []
+    while True:
+        params = {"limit": limit}
+        if cursor:
+            params["since"] = cursor
+        response = client.get("/api/v1/sync", params=params, headers=auth_headers)
+        assert response.status_code == 200
+        page = response.json()
+        assert all(len(page[name]) <= limit for name in ("leaders", "orders", "payments"))
+        pages.append(page)
+        cursor = page["cursor"]
+        if not page["has_more"]:
+            return pages, cursor
+
+
+def test_snapshot_is_paged(client, auth_headers, order_ids):
+    pages, _ = pull(client, auth_headers)
+
+    assert len(pages) > 1
+    assert [page["full"] for page in pages] == [True] + [False] * (len(pages) - 1)
+    sent = [order["id"] for page in pages for order in page["orders"]]
+    assert len(sent) == len(set(sent))
+    assert set(order_ids) <= set(sent)
+
+
+def test_delta_after_catching_up(client, auth_headers, order_ids, no_overlap):
+    _, cursor = pull(client, auth_headers)
+
+    assert client.patch(
+        f"/api/v1/orders/{order_ids[0]}/status", params={"new_status": "In Production"}, headers=auth_headers
+    ).status_code == 200
+    assert client.delete(f"/api/v1/orders/{order_ids[1]}", headers=auth_headers).status_code == 204
+
+    pages, cursor = pull(client, auth_headers, cursor)
+
+    assert not any(page["full"] for page in pages)
+    assert [order["id"] for page in pages for order in page["orders"]] == [order_ids[0]]
+    assert [entity_id for page in pages for entity_id in page["deleted"]["orders"]] == [order_ids[1]]
+
+    pages, _ = pull(client, auth_headers, cursor)
+    assert [len(page["orders"]) + len(page["deleted"]["orders"]) for page in pages] == [0]
+
+
+def test_old_timestamp_cursor_still_works(client, auth_headers, order_ids):
+    response = client.get("/api/v1/sync", params={"since": datetime.utcnow().isoformat()}, headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.json()["full"] is False
+
+
+def test_invalid_cursor_is_rejected(client, auth_headers):
+    response = client.get("/api/v1/sync", params={"since": "bm90IGEgY3Vyc29y"}, headers=auth_headers)
+
+    assert response.status_code == 400
@@ -1,16 +1,20 @@
+import logging
+from contextvars import ContextVar
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from sqlmodel import Session, select
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer, HTTPBearer, HTTPAuthorizationCredentials
 from models import User
 from config import get_settings
 from uuid import UUID
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login", auto_error=False)
 bearer_scheme = HTTPBearer()
 
 """
@@ -22,6 +26,13 @@ existing hashes using bcrypt will still verify.
 """
 pwd_context = CryptContext(schemes=["sha256_crypt", "bcrypt"], deprecated="auto")
 
+# Set by POST /batch after it authenticates, so sub-requests skip the JWT
+# decode and user lookup
+authenticated_user: ContextVar[Optional[User]] = ContextVar("authenticated_user", default=None)
+
+# ``scope`` claim of stream tokens; access tokens have none
+STREAM_TOKEN_SCOPE = "events"
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash."""
     return pwd_context.verify(plain_password, hashed_password)
@@ -51,8 +62,27 @@ def authenticate_user(session: Session, email: str, password: str) -> Optional[U
         return None
     return user
 
+def create_stream_token(user: User) -> str:
+    """
+    A short-lived token that only opens the event stream.
+
+    EventSource URLs end up in server and proxy logs and browser history, so
+    they carry this instead of the access token.
+    """
+    return create_access_token(
+        {"sub": str(user.id), "scope": STREAM_TOKEN_SCOPE},
+        expires_delta=timedelta(seconds=settings.stream_token_expire_seconds)
+    )
+
 def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
     """Get current user from JWT token."""
+    user = authenticated_user.get()
+    if user is not None:
+        return user
+    return _user_from_token(token)
+
+def _user_from_token(token: str, scope: Optional[str] = None) -> User:
+    """The user a JWT was issued to; its ``scope`` claim must be ``scope`` (none for access tokens)."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -62,13 +92,13 @@ def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
     try:
         payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
         user_id: str = payload.get("sub")
-        if user_id is None:
+        if user_id is None or payload.get("scope") != scope:
             raise credentials_exception
     except JWTError as e:
-        print(f"JWT Error: {e}")
+        logger.info("Rejected token: %s", e)
         raise credentials_exception
     except Exception as e:
-        print(f"Token validation error: {e}")
+        logger.warning("Token validation error: %s", e)
         raise credentials_exception
     
     # Get session from generator
@@ -89,10 +119,30 @@ def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
             
             return user
         except Exception as e:
-            print(f"Database error in get_current_user: {e}")
+            logger.warning("Could not load the current user: %s", e)
             raise credentials_exception
 
 def get_current_user_from_bearer(credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)) -> User:
     """Get current user from Bearer token (alternative method for Swagger UI)."""
     return get_current_user(credentials.credentials)
 
+def get_current_user_for_stream(
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+    stream_token: Optional[str] = Query(None)
+) -> User:
+    """
+    Get current user from the Bearer header or a ``stream_token`` query parameter.
+
+    Only for streaming endpoints: browsers' EventSource cannot send headers,
+    so they pass a token from POST /events/token. Access tokens are never
+    accepted in the query string.
+    """
+    if token:
+        return get_current_user(token)
+    if not stream_token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return _user_from_token(stream_token, STREAM_TOKEN_SCOPE)
@@ -0,0 +1,28 @@
+from typing import Any, Callable, Optional
+
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+
+
+def version_conflict(current: Any) -> HTTPException:
+    """409 carrying the record's current state so the client can merge and retry."""
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail={
+            "message": "This record was modified by someone else. Reload it and try again.",
+            "current": jsonable_encoder(current)
+        }
+    )
+
+
+def check_version(expected: Optional[int], record: Any, serialize: Callable[[Any], Any]) -> None:
+    """
+    Reject an update made against a stale copy of ``record``.
+
+    ``expected`` is the version the client read; ``None`` skips the check for
+    clients that do not send one. Writes that race between this check and the
+    commit are still caught by the version check in the UPDATE's WHERE clause
+    (SQLAlchemy raises ``StaleDataError``).
+    """
+    if expected is not None and expected != record.version:
+        raise version_conflict(serialize(record))
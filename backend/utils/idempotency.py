@@ -0,0 +1,213 @@
+import hashlib
+import json
+from datetime import datetime, timedelta
+from typing import Any, Callable, Optional, Tuple
+
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy import delete, event, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+
+from config import get_settings
+from database import engine
+from models import IdempotencyKey, User
+
+settings = get_settings()
+
+# A reservation whose write never committed (e.g. the worker died before it
+# did) can be taken over by a retry once it is this old. Reservations whose
+# write committed are never taken over.
+IN_PROGRESS_TIMEOUT = timedelta(minutes=5)
+
+# Expired keys are purged at most this often per process.
+PURGE_INTERVAL = timedelta(minutes=5)
+
+REPLAY_HEADER = "Idempotent-Replayed"
+
+_last_purge = datetime.min
+
+
+def request_hash(scope: str, payload: Any) -> str:
+    """Hash the endpoint scope and the canonical JSON of the request body."""
+    body = json.dumps(jsonable_encoder(payload), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(f"{scope}\n{body}".encode("utf-8")).hexdigest()
+
+
+def run_idempotent(
+    key: Optional[str],
+    user: User,
+    scope: str,
+    payload: Any,
+    handler: Callable[[], Any],
+    session: Session,
+    status_code: int = status.HTTP_200_OK,
+):
+    """
+    Execute ``handler`` at most once per Idempotency-Key of ``user``.
+
+    Without a key the handler simply runs. With a key, the first request
+    reserves it, runs the handler and stores the serialized response; later
+    requests with the same key and body get that stored response back without
+    re-running the write. Failed requests release the key so they can be retried.
+
+    ``session`` is the session the handler writes through, with a single
+    commit. That commit also sets the key's ``status_code``, so once the
+    write is committed the key counts as completed even if storing the
+    response body fails afterwards; such a key is never handed to a retry.
+    """
+    if not key:
+        return handler()
+
+    if len(key) > 255:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Idempotency-Key must be at most 255 characters"
+        )
+
+    digest = request_hash(scope, payload)
+    reserved_at, replay = _reserve(key, user, scope, digest)
+    if replay is not None:
+        return replay
+
+    reservation = (
+        IdempotencyKey.user_id == user.id,
+        IdempotencyKey.key == key,
+        IdempotencyKey.created_at == reserved_at
+    )
+
+    def mark_committed(write_session: Session):
+        write_session.execute(update(IdempotencyKey).where(*reservation).values(status_code=status_code))
+
+    event.listen(session, "before_commit", mark_committed)
+    try:
+        result = handler()
+    except Exception:
+        _release(reservation)
+        raise
+    finally:
+        event.remove(session, "before_commit", mark_committed)
+
+    body = jsonable_encoder(result)
+    _store(reservation, status_code, json.dumps(body))
+    return JSONResponse(status_code=status_code, content=body)
+
+
+def _reserve(key: str, user: User, scope: str, digest: str) -> Tuple[Optional[datetime], Optional[Response]]:
+    """
+    Reserve the key, returning when it was reserved; or return the stored
+    response if it already completed.
+    """
+    now = datetime.utcnow()
+    expires_at = now + timedelta(hours=settings.idempotency_key_ttl_hours)
+
+    with Session(engine) as session:
+        _purge_expired(session, now)
+
+        session.add(IdempotencyKey(
+            key=key,
+            user_id=user.id,
+            scope=scope,
+            request_hash=digest,
+            created_at=now,
+            expires_at=expires_at
+        ))
+        try:
+            session.commit()
+            return now, None
+        except IntegrityError:
+            session.rollback()
+
+        existing = session.exec(
+            select(IdempotencyKey).where(IdempotencyKey.user_id == user.id, IdempotencyKey.key == key)
+        ).first()
+        if existing is None:
+            # Evicted between our insert and lookup; let the client retry
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Idempotency-Key is being recycled, please retry",
+                headers={"Retry-After": "1"}
+            )
+
+        abandoned = existing.status_code is None and existing.created_at <= now - IN_PROGRESS_TIMEOUT
+        if existing.expires_at <= now or abandoned:
+            # Take over only if nobody else did in the meantime
+            result = session.execute(
+                update(IdempotencyKey)
+                .where(
+                    IdempotencyKey.user_id == user.id,
+                    IdempotencyKey.key == key,
+                    IdempotencyKey.created_at == existing.created_at
+                )
+                .values(
+                    scope=scope,
+                    request_hash=digest,
+                    status_code=None,
+                    response_body=None,
+                    created_at=now,
+                    expires_at=expires_at
+                )
+            )
+            session.commit()
+            if result.rowcount == 1:
+                return now, None
+            session.refresh(existing)
+
+        if existing.scope != scope or existing.request_hash != digest:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Idempotency-Key was already used with a different request"
+            )
+
+        if existing.response_body is None:
+            if existing.status_code is not None and existing.created_at <= now - IN_PROGRESS_TIMEOUT:
+                # The write committed but its response was never stored
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="A request with this Idempotency-Key already completed but its response "
+                           "was not recorded; fetch the created resource instead of retrying"
+                )
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="A request with this Idempotency-Key is still being processed",
+                headers={"Retry-After": "1"}
+            )
+
+        return None, Response(
+            content=existing.response_body,
+            status_code=existing.status_code,
+            media_type="application/json",
+            headers={REPLAY_HEADER: "true"}
+        )
+
+
+def _store(reservation: tuple, status_code: int, response_body: str):
+    """Record the response for a completed request, unless the reservation was replaced."""
+    with Session(engine) as session:
+        session.execute(
+            update(IdempotencyKey)
+            .where(*reservation)
+            .values(status_code=status_code, response_body=response_body)
+        )
+        session.commit()
+
+
+def _release(reservation: tuple):
+    """Drop a reservation whose write did not commit, so the request can be retried."""
+    with Session(engine) as session:
+        session.execute(
+            delete(IdempotencyKey)
+            .where(*reservation, IdempotencyKey.status_code.is_(None))
+        )
+        session.commit()
+
+
+def _purge_expired(session: Session, now: datetime):
+    """Delete expired keys, at most once per PURGE_INTERVAL in this process."""
+    global _last_purge
+    if now - _last_purge < PURGE_INTERVAL:
+        return
+    _last_purge = now
+    session.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at < now))
+    session.commit()
@@ -0,0 +1,198 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import traceback
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from config import get_settings
+
+settings = get_settings()
+
+# Set for the duration of each HTTP request by RequestContextMiddleware
+request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+# Whether this request's DEBUG lines are kept (see log_debug_sample_rate)
+debug_sampled: ContextVar[Optional[bool]] = ContextVar("debug_sampled", default=None)
+
+# LogRecord attributes that are not ``extra=`` fields
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+
+def parse_levels(spec: str) -> Dict[str, str]:
+    """'routers.payments=DEBUG, sqlalchemy.engine=INFO' to {logger: level}."""
+    levels = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+class RequestContextFilter(logging.Filter):
+    """
+    Tags records with the current request id and samples DEBUG records.
+
+    DEBUG lines are kept or dropped per request, so a sampled request keeps
+    its whole trace. Outside a request each DEBUG line is sampled on its own.
+    """
+
+    def __init__(self, sample_rate: float):
+        super().__init__()
+        self.sample_rate = sample_rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id.get()
+        if record.levelno > logging.DEBUG or self.sample_rate >= 1:
+            return True
+        sampled = debug_sampled.get()
+        if sampled is None:
+            sampled = random.random() < self.sample_rate
+        return sampled
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; ``extra=`` fields become top-level keys."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s [%(request_id)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        if not hasattr(record, "request_id"):
+            record.request_id = None
+        return super().format(record)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to the writer thread without blocking the caller.
+
+    The message is rendered here (arguments may not be safe to use from
+    another thread later) but JSON encoding and the write happen on the
+    writer thread. When the queue is full the record is dropped and counted.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = "".join(traceback.format_exception(*record.exc_info)).rstrip()
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class BlockingStopQueueListener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        # Wait for room rather than fail when stopping with a full queue
+        self.queue.put(self._sentinel)
+
+
+_listener: Optional[BlockingStopQueueListener] = None
+queue_handler: Optional[DroppingQueueHandler] = None
+
+
+def configure_logging():
+    """
+    Route all logging through a queue to a single writer thread.
+
+    Levels come from ``log_level`` and the per-logger ``log_levels``
+    overrides. Safe to call more than once; later calls do nothing.
+    """
+    global _listener, queue_handler
+    if _listener is not None:
+        return
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter() if settings.log_format == "json" else TextFormatter())
+    queue_handler = DroppingQueueHandler(queue.Queue(maxsize=settings.log_queue_size))
+    queue_handler.addFilter(RequestContextFilter(settings.log_debug_sample_rate))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(settings.log_level.upper())
+    for name, level in parse_levels(settings.log_levels).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = BlockingStopQueueListener(queue_handler.queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Write out queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+class RequestContextMiddleware:
+    """
+    Gives each request an id (the incoming X-Request-ID, or a new one),
+    returns it in the response and decides whether its DEBUG lines are kept.
+    Sub-requests of POST /batch keep the id of the batch.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or request_id.get() is not None:
+            await self.app(scope, receive, send)
+            return
+
+        incoming = None
+        for name, value in scope.get("headers", []):
+            if name == b"x-request-id":
+                incoming = value.decode("latin-1")[:64]
+                break
+        current = incoming or uuid.uuid4().hex
+        id_token = request_id.set(current)
+        sampled_token = debug_sampled.set(random.random() < settings.log_debug_sample_rate)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-request-id", current.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id.reset(id_token)
+            debug_sampled.reset(sampled_token)
@@ -0,0 +1,63 @@
+from datetime import date, datetime, timedelta
+from enum import Enum
+from typing import Iterator, Union
+
+from sqlalchemy import Date, cast, func
+from sqlalchemy.sql.elements import ColumnElement
+
+
+class Granularity(str, Enum):
+    DAY = "day"
+    WEEK = "week"  # ISO weeks, starting on Monday
+    MONTH = "month"
+
+
+def time_bucket(column, granularity: Granularity, dialect_name: str) -> ColumnElement:
+    """
+    SQL expression truncating ``column`` to the start of its bucket.
+
+    Uses ``date_trunc`` on PostgreSQL and ``date``/``strftime`` on SQLite.
+    Results come back as dates (PostgreSQL) or 'YYYY-MM-DD' strings (SQLite);
+    pass them through ``bucket_key`` to compare them.
+    """
+    if dialect_name == "postgresql":
+        return cast(func.date_trunc(granularity.value, column), Date)
+    if granularity == Granularity.DAY:
+        return func.date(column)
+    if granularity == Granularity.WEEK:
+        # Forward to Sunday (or stay on it), then back to that week's Monday
+        return func.date(column, "weekday 0", "-6 days")
+    return func.strftime("%Y-%m-01", column)
+
+
+def bucket_key(value: Union[str, date, datetime]) -> date:
+    """Normalize a bucket value returned by the database to a date."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def bucket_start(day: date, granularity: Granularity) -> date:
+    """The bucket a calendar day falls in, matching ``time_bucket``."""
+    if granularity == Granularity.WEEK:
+        return day - timedelta(days=day.weekday())
+    if granularity == Granularity.MONTH:
+        return day.replace(day=1)
+    return day
+
+
+def iter_buckets(start: date, end: date, granularity: Granularity) -> Iterator[date]:
+    """Every bucket start from the one containing ``start`` through the one containing ``end``."""
+    current = bucket_start(start, granularity)
+    while current <= end:
+        yield current
+        if granularity == Granularity.DAY:
+            current += timedelta(days=1)
+        elif granularity == Granularity.WEEK:
+            current += timedelta(days=7)
+        elif current.month == 12:
+            current = current.replace(year=current.year + 1, month=1)
+        else:
+            current = current.replace(month=current.month + 1)
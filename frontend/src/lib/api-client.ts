@@ -7,6 +7,12 @@ import type {
   DashboardData,
   Settings,
   SettingsUpdate,
+  ChangeEvent,
+  SyncResponse,
+  BatchItem,
+  BatchResult,
+  ExpenseFilters,
+  ExpensePage,
   QueryParams,
   ApiResponse
 } from './api-types';
@@ -38,6 +44,13 @@ if (import.meta.env.PROD) {
   console.log('[API] Using base URL:', API_BASE);
 }
 
+const CHANGE_EVENT_TYPES = [
+  'order.created', 'order.updated', 'order.deleted',
+  'payment.created', 'payment.updated', 'payment.deleted',
+  'expense.created', 'expense.updated', 'expense.deleted',
+  'resync',
+];
+
 class ApiError extends Error {
   constructor(
     public status: number,
@@ -120,7 +133,8 @@ class ApiClient {
     }
 
     if (!response.ok) {
-      const errorMessage = data?.detail || data?.message || response.statusText;
+      // 409 version conflicts carry { message, current } in detail
+      const errorMessage = data?.detail?.message || data?.detail || data?.message || response.statusText;
       console.error('[API Error]', {
         status: response.status,
         message: errorMessage,
@@ -382,6 +396,17 @@ class ApiClient {
     };
   }
 
+  // Filtered, paginated expenses with totals; category may hold several values
+  async queryExpenses(filters: ExpenseFilters = {}): Promise<ExpensePage> {
+    const params = new URLSearchParams();
+    Object.entries(filters).forEach(([key, value]) => {
+      if (value === undefined || value === null || value === '') return;
+      (Array.isArray(value) ? value : [value]).forEach(v => params.append(key, String(v)));
+    });
+    params.set('totals', 'true');
+    return await this.fetchJson<ExpensePage>(`/expenses/?${params.toString()}`);
+  }
+
   async createExpense(data: any): Promise<any> {
     return this.fetchJson<any>('/expenses/', {
       method: 'POST',
@@ -423,6 +448,76 @@ class ApiClient {
       body: JSON.stringify(data),
     });
   }
+
+  // Run several GETs (paths under /api/v1) in one round trip
+  async batch(requests: BatchItem[]): Promise<BatchResult[]> {
+    const response = await this.fetchJson<{ responses: BatchResult[] }>('/batch', {
+      method: 'POST',
+      body: JSON.stringify({ requests }),
+    });
+    return response.responses;
+  }
+
+  // Delta sync: one page of rows changed since the cursor from the previous call
+  async getChanges(since?: string): Promise<SyncResponse> {
+    const qs = since ? `?since=${encodeURIComponent(since)}` : '';
+    return await this.fetchJson<SyncResponse>(`/sync${qs}`);
+  }
+
+  // Pulls pages until caught up, handing each to onPage in order; returns
+  // the cursor to start from next time
+  async syncChanges(since: string | undefined, onPage: (page: SyncResponse) => void): Promise<string> {
+    let cursor = since;
+    for (;;) {
+      const page = await this.getChanges(cursor);
+      onPage(page);
+      cursor = page.cursor;
+      if (!page.has_more) return cursor;
+    }
+  }
+
+  // Change events (server-sent). Returns a function that closes the stream.
+  // The URL carries a short-lived stream token, never the access token, so
+  // every (re)connect fetches a new one and resumes after the last event seen.
+  subscribeToEvents(onEvent: (event: ChangeEvent) => void): () => void {
+    let source: EventSource | null = null;
+    let retry: ReturnType<typeof setTimeout> | undefined;
+    let lastSeq: number | null = null;
+    let closed = false;
+
+    const handler = (message: MessageEvent) => {
+      const event: ChangeEvent = JSON.parse(message.data);
+      if (event.seq !== null) lastSeq = event.seq;
+      onEvent(event);
+    };
+
+    const connect = async () => {
+      try {
+        const { stream_token } = await this.fetchJson<{ stream_token: string }>('/events/token', { method: 'POST' });
+        if (closed) return;
+        const params = new URLSearchParams({ stream_token });
+        if (lastSeq !== null) params.set('after', String(lastSeq));
+        source = new EventSource(`${API_BASE}/events?${params.toString()}`);
+        for (const type of CHANGE_EVENT_TYPES) {
+          source.addEventListener(type, handler as EventListener);
+        }
+        source.onerror = () => {
+          // The browser would retry with the same, soon expired, token
+          source?.close();
+          if (!closed) retry = setTimeout(connect, 5000);
+        };
+      } catch {
+        if (!closed) retry = setTimeout(connect, 5000);
+      }
+    };
+
+    connect();
+    return () => {
+      closed = true;
+      clearTimeout(retry);
+      source?.close();
+    };
+  }
 }
 
 export const api = new ApiClient();
\ No newline at end of file
@@ -7,6 +7,7 @@ export interface Leader {
   address: string;
   openingBalance: number;
   opening_balance: number;
+  version?: number;
 }
 
 export interface Order {
@@ -18,6 +19,7 @@ export interface Order {
   totalAmount?: number;
   status?: string;
   createdAt?: string;
+  version?: number;
 }
 
 export interface Product {
@@ -49,6 +51,36 @@ export interface Payment {
   orderId?: string;
   referenceNumber?: string;
   client?: ClientInfo | null;
+  version?: number;
+}
+
+export interface ChangeEvent {
+  type: string;  // e.g. 'order.updated', or 'resync' when lists must be refetched
+  id: string | null;
+  data: any | null;  // The record as its read endpoint returns it; null for deletes
+  at: string;
+  seq: number | null;
+}
+
+export interface BatchItem {
+  id?: string;
+  path: string;  // e.g. '/dashboard/stats', relative to /api/v1
+}
+
+export interface BatchResult {
+  id: string | null;
+  status: number;
+  body: any;
+}
+
+export interface SyncResponse {
+  cursor: string;  // Pass back as `since` on the next call
+  full: boolean;  // true: clear the cache before applying this page
+  has_more: boolean;  // true: call again right away, the client is not caught up yet
+  leaders: any[];
+  orders: any[];
+  payments: any[];
+  deleted: { leaders: string[]; orders: string[]; payments: string[] };
 }
 
 export interface PaymentCreate {
@@ -84,6 +116,28 @@ export interface ExpenseCreate {
   orderCategory?: string;
 }
 
+export interface ExpenseFilters {
+  date_from?: string;
+  date_to?: string;
+  category?: ExpenseCategory[];
+  order_category?: string;
+  payment_method?: string;
+  min_amount?: number;
+  max_amount?: number;
+  skip?: number;
+  limit?: number;
+}
+
+// GET /expenses/?totals=true: one page plus totals over every match
+export interface ExpensePage {
+  items: any[]; // Same shape as GET /expenses/
+  total: number;
+  skip: number;
+  limit: number;
+  total_amount: number;
+  by_category: { category: ExpenseCategory; amount: number; count: number }[];
+}
+
 export interface DashboardData {
   totalOrders: number;
   totalRevenue: number;
@@ -43,6 +43,7 @@ interface Order {
   pages?: number;
   paper?: string;
   items?: OrderItem[];
+  version?: number;
 }
 
 
@@ -210,11 +211,6 @@ export default function Orders() {
 
   const handleSubmit = async (e: React.FormEvent) => {
     e.preventDefault();
-    if (!formData.orderNumber.trim()) {
-      toast.error('Please enter an order number');
-      return;
-    }
-
     if (!formData.leaderId) {
       toast.error('Please select a leader');
       return;
@@ -425,7 +421,7 @@ export default function Orders() {
 
     setIsProcessing(true);
     try {
-      await api.updateOrder(editingOrder.id, editFormData);
+      await api.updateOrder(editingOrder.id, { ...editFormData, version: editingOrder.version });
       toast.success('Order updated successfully');
       setEditDialogOpen(false);
       setEditingOrder(null);
@@ -492,13 +488,12 @@ export default function Orders() {
             </DialogHeader>
             <form onSubmit={handleSubmit} className="space-y-4">
               <div>
-                <Label htmlFor="orderNumber">Order Number *</Label>
+                <Label htmlFor="orderNumber">Order Number</Label>
                 <Input
                   id="orderNumber"
                   value={formData.orderNumber}
                   onChange={(e) => setFormData({ ...formData, orderNumber: e.target.value })}
-                  required
-                  placeholder="ORD-001"
+                  placeholder="Auto-generated if left blank"
                 />
               </div>
               <div>
@@ -208,7 +208,7 @@ export default function Payments() {
 
     try {
       setEditLoading(true);
-      await api.updatePayment(editingPayment.id, editFormData);
+      await api.updatePayment(editingPayment.id, { ...editFormData, version: editingPayment.version });
       toast.success('Payment updated successfully');
       setEditDialogOpen(false);
       setEditingPayment(null);